@@ -0,0 +1,188 @@
+"""
+This module contains the branch matrix: which branches exist, locally or on \
+    the remote, in each local repository.
+
+The branches of a repository are listed with a single git for-each-ref, run \
+    in all the repositories concurrently. A repository is listed again only \
+    when its .git/refs changed (see app.repo_state.get_signature), so asking \
+    which repositories have a branch is answered from memory.
+
+The remote branches are the remote-tracking branches of origin, they are as \
+    recent as the last fetch, or the last refresh of the mirror.
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+
+from app.logger import logger
+from app.process_runner import as_completed_results, run_command_async
+from app.repo_state import REPOSITORIES_FOLDER, get_signature
+
+# Number of repositories listed at the same time by a refresh
+REFRESH_CONCURRENCY = 16
+
+# Where a branch exists in a repository
+LOCAL = "local"
+REMOTE = "remote"
+BOTH = "both"
+
+REMOTE_PREFIX = "refs/remotes/origin/"
+LOCAL_PREFIX = "refs/heads/"
+
+
+@dataclass
+class RepositoryBranches:
+    """
+    This class holds the branches of a local repository.
+
+    :param local: The names of the local branches
+
+    :param remote: The names of the branches of origin
+
+    :param signature: The modification times the branches were listed at
+    """
+
+    local: set = field(default_factory=set)
+    remote: set = field(default_factory=set)
+    signature: list = field(default_factory=list)
+
+
+async def list_branches_async(directory):
+    """
+    This function lists the local and remote branches of a working copy.
+
+    :param directory: The path of the working copy
+
+    :return: The RepositoryBranches of the working copy, None if git failed
+    """
+    # Taken first, a ref changed during the listing makes the next refresh list again
+    signature = get_signature(directory)
+    result = await run_command_async(
+        [
+            "git",
+            "for-each-ref",
+            "--format=%(refname)",
+            LOCAL_PREFIX,
+            REMOTE_PREFIX,
+        ],
+        cwd=directory,
+        full_output=True,
+    )
+    if not result.ok:
+        return None
+    branches = RepositoryBranches(signature=signature)
+    for ref in result.output:
+        ref = ref.strip()
+        if ref.startswith(LOCAL_PREFIX):
+            branches.local.add(ref[len(LOCAL_PREFIX) :])
+        elif ref.startswith(REMOTE_PREFIX) and ref != f"{REMOTE_PREFIX}HEAD":
+            branches.remote.add(ref[len(REMOTE_PREFIX) :])
+    return branches
+
+
+class BranchMatrix:
+    """
+    This class caches the branches of the local repositories.
+
+    :param root_directory: The folder of the working copies
+    """
+
+    def __init__(self, root_directory=REPOSITORIES_FOLDER):
+        self.root_directory = root_directory
+        self._branches = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, repo_names, force=False):
+        """
+        This method lists again, concurrently, the branches of the \
+            repositories whose refs changed since they were last listed.
+
+        :param repo_names: The names of the repositories
+
+        :param force: True to list all the repositories again. Default is False
+
+        :return: A dict mapping the name of each git repository to its \
+            RepositoryBranches
+        """
+        if not isinstance(force, bool):
+            raise TypeError("Invalid type for force")
+        branches = {}
+        stale = {}
+        with self._lock:
+            for repo_name in repo_names:
+                directory = os.path.join(self.root_directory, repo_name)
+                signature = get_signature(directory)
+                if signature is None:
+                    self._branches.pop(repo_name, None)
+                    continue
+                repo_branches = self._branches.get(repo_name)
+                if (
+                    force
+                    or repo_branches is None
+                    or repo_branches.signature != signature
+                ):
+                    stale[repo_name] = directory
+                else:
+                    branches[repo_name] = repo_branches
+
+        for repo_name, repo_branches, error in as_completed_results(
+            {
+                repo_name: list_branches_async(directory)
+                for repo_name, directory in stale.items()
+            },
+            limit=REFRESH_CONCURRENCY,
+        ):
+            if error is not None or repo_branches is None:
+                logger(f"Failed to list the branches of {repo_name}", "warn")
+                continue
+            branches[repo_name] = repo_branches
+            with self._lock:
+                self._branches[repo_name] = repo_branches
+        return branches
+
+    def matrix(self, repo_names):
+        """
+        This method builds the branch matrix of the repositories.
+
+        :param repo_names: The names of the repositories
+
+        :return: A dict mapping each branch to a dict mapping the \
+            repositories having it to LOCAL, REMOTE or BOTH
+        """
+        matrix = {}
+        for repo_name, repo_branches in self.refresh(repo_names).items():
+            for branch in repo_branches.local | repo_branches.remote:
+                if branch not in repo_branches.remote:
+                    where = LOCAL
+                elif branch not in repo_branches.local:
+                    where = REMOTE
+                else:
+                    where = BOTH
+                matrix.setdefault(branch, {})[repo_name] = where
+        return dict(sorted(matrix.items()))
+
+    def repositories_with(self, branch, repo_names, local=True, remote=True):
+        """
+        This method tells which repositories have a branch.
+
+        :param branch: The name of the branch
+
+        :param repo_names: The names of the repositories
+
+        :param local: True to count the local branches. Default is True
+
+        :param remote: True to count the branches of origin. Default is True
+
+        :return: The sorted list of the repositories having the branch
+        """
+        if not isinstance(branch, str):
+            raise TypeError("Invalid type for branch")
+        return sorted(
+            repo_name
+            for repo_name, repo_branches in self.refresh(repo_names).items()
+            if (local and branch in repo_branches.local)
+            or (remote and branch in repo_branches.remote)
+        )
+
+
+branch_matrix = BranchMatrix()
@@ -0,0 +1,142 @@
+"""
+This module contains the build cache of the documentation: the key of the \
+    modules of each repository currently in local_modules.
+
+The key of a repository is made of its name, the SHA of its package tree at \
+    the exported ref and the hash of the documentation settings (conf.py, \
+    index.rst, templates and static files). When the documentation of a new \
+    ref is built, the repositories whose key did not change are not exported \
+    again: their modules, their generated .rst files and their doctrees stay \
+    as they are in the docs workspace, so Sphinx does not read them again. \
+    Sphinx keeps a single environment for the whole documentation, the \
+    outputs of a repository cannot be restored on their own, the cache only \
+    tells which repositories can be left untouched.
+"""
+import hashlib
+import json
+import os
+import threading
+
+script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+BUILD_CACHE_FILE = os.path.join(script_path, "app", "build_cache.json")
+
+# Files copied to the Sphinx project, a change invalidates every repository
+DOCS_SETTINGS_FOLDERS = [
+    os.path.join(script_path, "assets", "source"),
+    os.path.join(script_path, "assets", "templates"),
+    os.path.join(script_path, "assets", "static"),
+]
+
+
+def docs_settings_hash(folders=None):
+    """
+    This function hashes the files copied to the Sphinx project.
+
+    :param folders: The folders to hash. Default is DOCS_SETTINGS_FOLDERS
+
+    :return: The hexadecimal SHA-256 of the names and contents of the files
+    """
+    digest = hashlib.sha256()
+    for folder in folders or DOCS_SETTINGS_FOLDERS:
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for file in sorted(files):
+                file_path = os.path.join(root, file)
+                digest.update(os.path.relpath(file_path, folder).encode("utf-8"))
+                with open(file_path, "rb") as settings_file:
+                    digest.update(settings_file.read())
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    This class remembers the key of the modules of each repository \
+        in local_modules.
+
+    :param cache_file: The JSON file the cache is saved to
+    """
+
+    def __init__(self, cache_file=BUILD_CACHE_FILE):
+        self.cache_file = cache_file
+        self._keys = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.cache_file, "r") as cache_file:
+                self._keys = json.load(cache_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._keys = {}
+
+    @staticmethod
+    def key(repo_name, tree_sha, settings_hash):
+        """
+        :param repo_name: The name of the repository
+
+        :param tree_sha: The SHA of the package tree of the repository
+
+        :param settings_hash: The hash returned by docs_settings_hash
+
+        :return: The key of the modules of the repository
+        """
+        return hashlib.sha256(
+            f"{repo_name}\0{tree_sha}\0{settings_hash}".encode("utf-8")
+        ).hexdigest()
+
+    def is_fresh(self, repo_name, tree_sha, settings_hash):
+        """
+        This method tells if the modules of a repository in local_modules \
+            are the ones of this package tree with these settings.
+
+        :param repo_name: The name of the repository
+
+        :param tree_sha: The SHA of the package tree of the repository
+
+        :param settings_hash: The hash returned by docs_settings_hash
+
+        :return: True if the repository does not have to be exported again
+        """
+        with self._lock:
+            cached_key = self._keys.get(repo_name)
+        return cached_key == self.key(repo_name, tree_sha, settings_hash)
+
+    def store(self, repo_name, tree_sha, settings_hash):
+        """
+        This method records the modules of a repository just exported.
+
+        :param repo_name: The name of the repository
+
+        :param tree_sha: The SHA of the package tree of the repository
+
+        :param settings_hash: The hash returned by docs_settings_hash
+
+        :return: None
+        """
+        with self._lock:
+            self._keys[repo_name] = self.key(repo_name, tree_sha, settings_hash)
+
+    def forget(self, repo_name=None):
+        """
+        This method forgets the modules of a repository, e.g. when they \
+            are copied from its working copy or failed to be exported.
+
+        :param repo_name: The name of the repository, None for all of them
+
+        :return: None
+        """
+        with self._lock:
+            if repo_name is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(repo_name, None)
+
+    def save(self):
+        """
+        This method saves the cache to its JSON file.
+
+        :param: None
+
+        :returns: None
+        """
+        with self._lock:
+            with open(self.cache_file, "w") as cache_file:
+                json.dump(self._keys, cache_file, indent=4)
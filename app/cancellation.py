@@ -0,0 +1,89 @@
+"""
+This module contains the cancellation token of the long operations started \
+    from the popups.
+
+The operation checks the token between its steps, and the commands it runs \
+    on the command runner are registered with it: cancelling the token \
+    cancels their coroutines, which terminates their processes. Nothing is \
+    traced or polled, an operation that is not cancelled pays nothing.
+"""
+import threading
+
+
+class OperationCancelled(Exception):
+    """
+    This exception is raised by an operation stopped by its cancellation token.
+
+    :param partial_result: What the operation completed before it was \
+        cancelled, e.g. the repositories already cloned. Default is None
+    """
+
+    def __init__(self, partial_result=None):
+        super().__init__()
+        self.partial_result = partial_result
+
+
+class CancellationToken:
+    """
+    This class is shared by an operation and the button cancelling it.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._futures = set()
+
+    @property
+    def cancelled(self):
+        """
+        :return: True if the operation has been cancelled
+        """
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """
+        This method cancels the operation and the commands it is running.
+
+        :param: None
+
+        :return: None
+        """
+        with self._lock:
+            self._cancelled.set()
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+    def raise_if_cancelled(self):
+        """
+        This method stops the operation, between two steps, if it has been \
+            cancelled.
+
+        :param: None
+
+        :return: None
+        """
+        if self._cancelled.is_set():
+            raise OperationCancelled()
+
+    def register(self, future):
+        """
+        This method cancels a future of the command runner with the operation.
+
+        :param future: The concurrent.futures.Future of a coroutine
+
+        :return: None
+        """
+        with self._lock:
+            cancelled = self._cancelled.is_set()
+            if not cancelled:
+                self._futures.add(future)
+        if cancelled:
+            future.cancel()
+        else:
+            # Outside of the lock, the callback runs at once if the future is done
+            future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        with self._lock:
+            self._futures.discard(future)
@@ -0,0 +1,215 @@
+"""
+This module contains the clone strategies that can be chosen per \
+    repository in repos.json.
+
+An entry of repos.json is either the URL of the repository, or a dict::
+
+    "my_repo": {
+        "url": "https://host/group/my_repo.git",
+        "clone": "blobless"
+    }
+
+where "clone" is the name of a strategy of CLONE_STRATEGIES, or a dict of \
+    clone options::
+
+    "clone": {
+        "strategy": "shallow",
+        "depth": 50,
+        "branch": "dev",
+        "reference": "C:/mirrors/my_repo.git"
+    }
+
+The available options are "filter" (partial clone filter, e.g. \
+    "blob:none"), "depth" (shallow clone depth), "single_branch", \
+    "branch" and "reference" (path of a local repository sharing its objects).
+"""
+import json
+import os
+
+from app.logger import logger
+
+script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CLONE_STRATEGIES = {
+    "full": {},
+    "blobless": {"filter": "blob:none"},
+    "shallow": {"depth": 1, "single_branch": True},
+}
+
+DEFAULT_CLONE_STRATEGY = "full"
+
+CLONE_OPTIONS = ("filter", "depth", "single_branch", "branch", "reference")
+
+# Measures of the last clone of each repository, used to report the savings
+CLONE_STATS_FILE = os.path.join(script_path, "app", "clone_stats.json")
+
+
+def get_url(repo_entry):
+    """
+    This function returns the URL of an entry of repos.json.
+
+    :param repo_entry: The value stored in repos.json for a repository
+
+    :return: The URL of the repository, None if the entry has no URL
+    """
+    if isinstance(repo_entry, dict):
+        return repo_entry.get("url")
+    return repo_entry
+
+
+def get_clone_options(repo_entry):
+    """
+    This function returns the clone options of an entry of repos.json.
+
+    :param repo_entry: The value stored in repos.json for a repository, \
+        None for a repository not yet registered
+
+    :return: A dict of clone options
+    """
+    clone = DEFAULT_CLONE_STRATEGY
+    if isinstance(repo_entry, dict):
+        clone = repo_entry.get("clone", DEFAULT_CLONE_STRATEGY)
+    if isinstance(clone, str):
+        clone = {"strategy": clone}
+    if not isinstance(clone, dict):
+        raise TypeError("Invalid type for the clone strategy")
+
+    strategy = clone.get("strategy", DEFAULT_CLONE_STRATEGY)
+    if strategy not in CLONE_STRATEGIES:
+        raise ValueError(
+            f"Unknown clone strategy {strategy}, "
+            f"expected one of {', '.join(CLONE_STRATEGIES)}"
+        )
+    options = dict(CLONE_STRATEGIES[strategy])
+    for option in CLONE_OPTIONS:
+        if option in clone:
+            options[option] = clone[option]
+    return options
+
+
+def describe_clone_options(options):
+    """
+    This function describes clone options for the logs.
+
+    :param options: The dict of clone options
+
+    :return: A short description, "full" when there is no option
+    """
+    if not options:
+        return "full"
+    return " ".join(f"{option}={value}" for option, value in options.items())
+
+
+def clone_command(repo_url, options):
+    """
+    This function builds the git clone command for the given options.
+
+    :param repo_url: The URL of the repository to clone
+
+    :param options: The dict of clone options
+
+    :return: The git clone command
+    """
+    if not isinstance(repo_url, str):
+        raise TypeError("Invalid type for repo_url")
+    command = ["git", "clone"]
+    if options.get("filter"):
+        command.append(f"--filter={options['filter']}")
+    if options.get("depth"):
+        command.extend(["--depth", str(options["depth"])])
+    if options.get("single_branch"):
+        command.append("--single-branch")
+    elif options.get("depth"):
+        # --depth implies --single-branch unless told otherwise
+        command.append("--no-single-branch")
+    if options.get("branch"):
+        command.extend(["--branch", options["branch"]])
+    if options.get("reference"):
+        # Falls back to a normal clone, with a warning, if the path is missing
+        command.extend(["--reference-if-able", options["reference"]])
+    command.append(repo_url)
+    return command
+
+
+def directory_size(directory):
+    """
+    This function computes the size on disk of a directory.
+
+    :param directory: The directory to measure
+
+    :return: The size in bytes
+    """
+    size = 0
+    for root, _, files in os.walk(directory):
+        for file in files:
+            try:
+                size += os.lstat(os.path.join(root, file)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def record_clone_stats(clone_results):
+    """
+    This function saves the measures of the clones and logs the time and \
+        disk saved compared with the last full clone of each repository.
+
+    The clones from a local mirror cost no network, they are only \
+        compared with the last full clone from the mirror.
+
+    :param clone_results: A dict mapping a repository name to a dict with \
+        the "options", "duration" (seconds) and "size" (bytes) of its clone, \
+        and "mirror", True if it was cloned from the mirror cache
+
+    :return: None
+    """
+    if not clone_results:
+        return
+    try:
+        with open(CLONE_STATS_FILE, "r") as stats_file:
+            clone_stats = json.load(stats_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        clone_stats = {}
+
+    total_duration = sum(clone["duration"] for clone in clone_results.values())
+    total_size = sum(clone["size"] for clone in clone_results.values())
+    saved_duration = 0.0
+    saved_size = 0
+    nb_compared = 0
+    for repo_name, clone in clone_results.items():
+        repo_stats = clone_stats.setdefault(repo_name, {})
+        prefix = "mirror_" if clone.get("mirror") else ""
+        full_clone = repo_stats.get(f"{prefix}full")
+        if clone["options"]:
+            repo_stats[f"{prefix}last"] = clone
+            if full_clone:
+                nb_compared += 1
+                saved_duration += full_clone["duration"] - clone["duration"]
+                saved_size += full_clone["size"] - clone["size"]
+                logger(
+                    f"{repo_name} cloned with "
+                    f"{describe_clone_options(clone['options'])}: "
+                    f"{clone['duration']:.1f}s and {_mib(clone['size'])}, "
+                    f"full clone took {full_clone['duration']:.1f}s "
+                    f"and {_mib(full_clone['size'])}"
+                )
+        else:
+            repo_stats[f"{prefix}full"] = clone
+
+    logger(
+        f"Cloned {len(clone_results)} repositories: {total_duration:.1f}s "
+        f"of clone time, {_mib(total_size)} on disk"
+    )
+    if nb_compared:
+        logger(
+            f"Clone strategies saved {saved_duration:.1f}s and "
+            f"{_mib(saved_size)} on the {nb_compared} repositories with a "
+            "previous full clone"
+        )
+
+    with open(CLONE_STATS_FILE, "w") as stats_file:
+        json.dump(clone_stats, stats_file, indent=4)
+
+
+def _mib(size):
+    return f"{size / 2**20:.1f} MiB"
@@ -1,32 +1,197 @@
 import datetime
+import filecmp
 import os
+import re
 import shutil
+import sys
 import zipfile
 
+from app.build_cache import BuildCache
+from app.cancellation import OperationCancelled
 from app.logger import logger
+from app.process_runner import as_completed_results
+from app.sphinx_worker import sphinx_worker
 from app.utils import (
     change_version,
     copy_file,
     copy_modules,
+    export_modules,
     log_and_process,
-    remove_file_batch,
+    log_and_process_async,
+    remove_file,
+    sync_directory,
 )
 
 script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
 print(script_path)
 
+# Share of the progress bar of each phase of sphinx-build, the phases print
+# their progress as "reading sources... [ 42%] document"
+SPHINX_PHASES = {
+    "reading sources": (0.0, 0.45),
+    "writing output": (0.45, 0.9),
+    "highlighting module code": (0.9, 1.0),
+}
 
-def remove_docs():
+SPHINX_PROGRESS_PATTERN = re.compile(
+    r"^(?P<phase>[a-z ]+)\.\.\. \[\s*(?P<percent>\d+)%\]"
+)
+
+
+class SphinxBuildProgress:
     """
-    This function removes the docs folder.
+    This class updates a progress bar from the output lines of sphinx-build, \
+        as they are printed.
+
+    :param progress_bar: The progress bar to update
+    """
+
+    def __init__(self, progress_bar):
+        self.progress_bar = progress_bar
+        self.value = 0.0
+
+    def __call__(self, line):
+        """
+        :param line: An output line of sphinx-build
+
+        :return: None
+        """
+        match = SPHINX_PROGRESS_PATTERN.match(line)
+        if match is None or match["phase"] not in SPHINX_PHASES:
+            return
+        start, end = SPHINX_PHASES[match["phase"]]
+        value = start + (end - start) * int(match["percent"]) / 100
+        # The phases only move forward, a repeated line does not redraw the bar
+        if value > self.value:
+            self.value = value
+            self.progress_bar.set(value)
+
+
+# Output fragments (lower case) of the failures of a parallel build only,
+# a build failing for another reason fails serially as well
+PARALLEL_BUILD_ERRORS = (
+    "sphinx parallel build error",
+    "not safe for parallel",
+    "pickl",
+    "brokenprocesspool",
+    "cannot allocate memory",
+    "resource temporarily unavailable",
+)
+
+# Appended to the index of the project when each repository is built apart
+SHARED_INDEX_TEMPLATE = """
+
+Repositories
+------------
+
+"""
+
+# Index of the project of a repository, the package page lists its modules
+SHARD_INDEX_TEMPLATE = """{title}
+{underline}
+
+.. toctree::
+   :maxdepth: 2
+
+   local_modules.{repo_name}
+"""
+
+# Appended to conf.py in the project of a repository
+SHARD_CONF_TEMPLATE = """
+
+# -- Project of a single repository, written by the documentation generator --
+sys.path.insert(0, {project_folder!r})
+project = {repo_name!r}
+html_title = f"{{project}} {{html_context['release']}} documentation"
+extensions.append("sphinx.ext.intersphinx")
+# Only the other repositories, no inventory is downloaded
+intersphinx_mapping = {intersphinx_mapping!r}
+"""
+
+
+def warm_up_sphinx():
+    """
+    This function starts the Sphinx worker process, e.g. while the user \
+        fills the popup, so the first build does not wait for the imports \
+        of Sphinx.
 
     :param: None
 
     :return: None
     """
+    sphinx_worker.start()
+
+
+def preparing_files_and_folders_sphinx(
+    all_repositories, model_progress_bar, cancel_token=None, force=False, ref=None
+):
+    """
+    This function prepares the files and folders for the documentation generation.
+
+    The docs folder is kept between two runs, so that sphinx-build finds \
+        its environment and doctrees in docs/build/.doctrees and only reads \
+        the modules that changed again.
+
+    :param all_repositories: The list of all repositories.
+
+    :param model_progress_bar: The progress bar to update.
+
+    :param cancel_token: The CancellationToken stopping the preparation. \
+        Default is None.
+
+    :param force: True to remove the docs and local_modules folders and \
+        rebuild everything. Default is False.
+
+    :param ref: The branch or tag whose modules are documented, exported \
+        from the git objects of each repository without any checkout. The \
+        repositories whose package did not change since the last export \
+        are skipped. Default is None, the working copies are documented \
+        as they are.
+
+    :return: The path of the zip file.
+    """
+    if force and os.path.exists(os.path.join(script_path, "local_modules")):
+        shutil.rmtree(os.path.join(script_path, "local_modules"))
+    # Not documented, never copied
+    exclude = ("__pycache__", "pipeline.py", "setup.py")
+    build_cache = BuildCache()
+    if force or not ref:
+        # The modules are not the ones of the package trees cached any more
+        build_cache.forget()
+        build_cache.save()
+    if ref:
+        logger(f"Exporting modules at {ref} ...")
+        export_modules(
+            os.path.join(script_path, "remote_repositories"),
+            all_repositories,
+            os.path.join(script_path, "local_modules"),
+            ref,
+            model_progress_bar,
+            cancel_token,
+            exclude=exclude,
+            build_cache=build_cache,
+        )
+    else:
+        logger("Copying modules ...")
+        copy_modules(
+            os.path.join(script_path, "remote_repositories"),
+            all_repositories,
+            os.path.join(script_path, "local_modules"),
+            model_progress_bar,
+            cancel_token,
+            exclude=exclude,
+        )
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
     # Create a docs folder in the current directory
     docs_folder_path = os.path.join(script_path, "docs")
 
+    conf_file_path = os.path.join(docs_folder_path, "source", "conf.py")
+    if not force and os.path.exists(conf_file_path):
+        logger(f"Reusing the 'docs' folder in {script_path}, incremental build")
+        return
+
     try:
         # Remove the folder if it exists
         shutil.rmtree(docs_folder_path)
@@ -37,144 +202,549 @@ def remove_docs():
         logger(f"An error occurred: {str(e)}", "critical")
     os.mkdir(docs_folder_path)
     os.mkdir(os.path.join(docs_folder_path, "source"))
-    os.mkdir(os.path.join(docs_folder_path, "build"))
     logger(f"Created 'docs' folder in {script_path}")
 
 
-def preparing_files_and_folders_sphinx(all_repositories, model_progress_bar):
+def sync_apidoc_sources(
+    apidoc_folder_path, docs_folder_path, file_names=None, build_folder_path=None
+):
     """
-    This function prepares the files and folders for the documentation generation.
+    This function copies the files generated by sphinx-apidoc to the docs \
+        sources, only when their content changed, and removes the sources \
+        and pages of the modules that no longer exist. The unchanged sources \
+        keep their modification time, so Sphinx does not read them again.
 
-    :param all_repositories: The list of all repositories.
+    :param apidoc_folder_path: The folder where sphinx-apidoc wrote the files.
 
-    :param model_progress_bar: The progress bar to update.
+    :param docs_folder_path: The docs folder, holding source and build.
 
-    :return: The path of the zip file.
+    :param file_names: The generated files to copy, e.g. those of a \
+        repository. Default is None, all of them.
+
+    :param build_folder_path: The folder of the pages. Default is None, \
+        the build folder of the docs folder.
+
+    :return: None
     """
-    logger("Copying modules ...")
-    copy_modules(
-        os.path.join(script_path, "remote_repositories"),
-        all_repositories,
-        os.path.join(script_path, "local_modules"),
-        model_progress_bar,
+    source_folder_path = os.path.join(docs_folder_path, "source")
+    if build_folder_path is None:
+        build_folder_path = os.path.join(docs_folder_path, "build")
+    generated = set(
+        os.listdir(apidoc_folder_path) if file_names is None else file_names
+    )
+    nb_changed = 0
+    for file_name in generated:
+        source_file = os.path.join(apidoc_folder_path, file_name)
+        destination_file = os.path.join(source_folder_path, file_name)
+        if not os.path.exists(destination_file) or not filecmp.cmp(
+            source_file, destination_file, shallow=False
+        ):
+            shutil.copyfile(source_file, destination_file)
+            nb_changed += 1
+
+    nb_removed = 0
+    for file_name in os.listdir(source_folder_path):
+        if (
+            file_name.endswith(".rst")
+            and file_name != "index.rst"
+            and file_name not in generated
+        ):
+            remove_file(os.path.join(source_folder_path, file_name))
+            page = os.path.join(build_folder_path, f"{file_name[:-4]}.html")
+            if os.path.exists(page):
+                remove_file(page)
+            nb_removed += 1
+    logger(
+        f"{nb_changed} documentation sources written, {nb_removed} removed, "
+        f"{len(generated) - nb_changed} unchanged"
     )
 
-    logger("Removing pipeline.py ...")
-    remove_file_batch(os.path.join(script_path, "local_modules"), "pipeline.py")
 
-    logger("Removing setup.py ...")
-    remove_file_batch(os.path.join(script_path, "local_modules"), "setup.py")
+def write_if_changed(file_path, content):
+    """
+    This function writes a text file only if its content changed, so \
+        Sphinx does not read an unchanged document again.
 
-    # Create a docs folder in the current directory
-    docs_folder_path = os.path.join(script_path, "docs")
+    :param file_path: The path of the file
 
+    :param content: The content of the file
+
+    :return: True if the file was written
+    """
     try:
-        # Remove the folder if it exists
-        shutil.rmtree(docs_folder_path)
-        logger(f"Folder '{docs_folder_path}' removed successfully.")
+        with open(file_path, "r") as file:
+            if file.read() == content:
+                return False
     except FileNotFoundError:
-        logger(f"Folder '{docs_folder_path}' not found.", "warn")
-    except Exception as e:
-        logger(f"An error occurred: {str(e)}", "critical")
-    os.mkdir(docs_folder_path)
-    os.mkdir(os.path.join(docs_folder_path, "source"))
-    logger(f"Created 'docs' folder in {script_path}")
+        pass
+    with open(file_path, "w") as file:
+        file.write(content)
+    return True
 
 
-def launch_sphinx_api(version_mip):
+def create_sphinx_project(docs_folder_path, version_mip, repositories=None):
     """
-    This function launches the sphinx API.
+    This function creates the Sphinx project from the files of assets, \
+        instead of sphinx-quickstart whose files were replaced by them anyway.
+
+    :param docs_folder_path: The docs folder, holding source and build.
 
     :param version_mip: The version of the MIP.
 
+    :param repositories: The repositories built apart, linked from the \
+        index. Default is None, the modules are part of the project.
+
     :return: None
     """
-    docs_folder_path = os.path.join(script_path, "docs")
-    print(docs_folder_path)
-    os.chdir(docs_folder_path)
-    # Run the 'sphinx-quickstart' command
-    try:
-        log_and_process(
-            [
-                "sphinx-quickstart",
-                "--sep",
-                "-d",
-                os.path.join(docs_folder_path, "source"),
-                "-q",
-                "-p",
-                "Project Reloaded",
-                "-a",
-                "Project",
-                "-v",
-                version_mip,
-                "-r",
-                version_mip,
-                "-l",
-                "en",
-                ".",
-            ]
-        )
-    except Exception as e:
-        logger(f"Error while generating documentation: {e}", "error")
-        logger(e, "critical")
-
-    os.chdir(script_path)
-    try:
-        log_and_process(
-            ["sphinx-apidoc", "-e", "-d", "1", "-o", "docs/source", "local_modules/."]
-        )
-        logger("Documentation generated successfully")
-    except Exception as e:
-        logger(f"Error while generating documentation: {e}", "error")
-        logger(e, "critical")
+    source_folder_path = os.path.join(docs_folder_path, "source")
+    os.makedirs(os.path.join(source_folder_path, "_templates"), exist_ok=True)
+    os.makedirs(os.path.join(source_folder_path, "_static"), exist_ok=True)
+    os.makedirs(os.path.join(docs_folder_path, "build"), exist_ok=True)
 
     copy_file(
         os.path.join(script_path, "assets", "source", "conf.py"),
-        os.path.join(docs_folder_path, "source", "conf.py"),
+        os.path.join(source_folder_path, "conf.py"),
     )
 
-    copy_file(
-        os.path.join(script_path, "assets", "source", "index.rst"),
-        os.path.join(docs_folder_path, "source", "index.rst"),
-    )
+    with open(os.path.join(script_path, "assets", "source", "index.rst"), "r") as file:
+        index = file.read()
+    if repositories:
+        index += SHARED_INDEX_TEMPLATE + "".join(
+            f"- `{repo_name} <{repo_name}/index.html>`__\n"
+            for repo_name in repositories
+        )
+    # Written, not copied: the index of the other mode has a newer mtime
+    write_if_changed(os.path.join(source_folder_path, "index.rst"), index)
 
     copy_file(
         os.path.join(script_path, "assets", "templates", "layout.html"),
-        os.path.join(docs_folder_path, "source", "_templates", "layout.html"),
+        os.path.join(source_folder_path, "_templates", "layout.html"),
     )
 
     copy_file(
         os.path.join(script_path, "assets", "templates", "module.rst"),
-        os.path.join(docs_folder_path, "source", "_templates", "module.rst"),
+        os.path.join(source_folder_path, "_templates", "module.rst"),
     )
 
     copy_file(
         os.path.join(script_path, "assets", "static", "my_theme.css"),
-        os.path.join(docs_folder_path, "source", "_static", "my_theme.css"),
+        os.path.join(source_folder_path, "_static", "my_theme.css"),
     )
 
     copy_file(
         os.path.join(script_path, "assets", "static", "logo.png"),
-        os.path.join(docs_folder_path, "source", "_static", "logo.png"),
+        os.path.join(source_folder_path, "_static", "logo.png"),
+    )
+
+    change_version(os.path.join(source_folder_path, "conf.py"), version_mip)
+
+
+def run_sphinx_apidoc(apidoc_folder_path, modules_folder_path):
+    """
+    This function writes the .rst files of the modules, as sphinx-apidoc \
+        but in the Sphinx worker process.
+
+    :param apidoc_folder_path: The folder where the files are written.
+
+    :param modules_folder_path: The folder of the modules to document.
+
+    :return: None
+    """
+    logger(f"sphinx-apidoc -f -e -d 1 -o {apidoc_folder_path} {modules_folder_path}")
+    success, output_tail = sphinx_worker.run(
+        "apidoc", (apidoc_folder_path, modules_folder_path)
+    )
+    if not success:
+        raise RuntimeError(f"sphinx-apidoc failed: {output_tail}")
+
+
+def sphinx_build_command(docs_folder_path, jobs=1):
+    """
+    This function builds the sphinx-build command of the HTML documentation.
+
+    :param docs_folder_path: The docs folder, holding source and build.
+
+    :param jobs: The number of processes of the build. Default is 1.
+
+    :return: The command to execute
+    """
+    return [
+        sys.executable,
+        "-m",
+        "sphinx",
+        "-b",
+        "html",
+        "-j",
+        str(jobs),
+        os.path.join(docs_folder_path, "source"),
+        os.path.join(docs_folder_path, "build"),
+    ]
+
+
+def is_parallel_failure(result):
+    """
+    This function tells if a parallel sphinx-build failed because of the \
+        parallel build itself, and is worth doing again serially.
+
+    :param result: The CommandResult of sphinx-build
+
+    :return: True if the output shows a parallel build error
+    """
+    if result.ok:
+        return False
+    output = result.output_tail.lower()
+    return any(error in output for error in PARALLEL_BUILD_ERRORS)
+
+
+def run_sphinx_build(docs_folder_path, cancel_token=None, on_line=None, jobs=None):
+    """
+    This function builds the HTML documentation.
+
+    By default the build is serial and runs in the Sphinx worker process: \
+        Sphinx and the extensions are only imported once for all the builds \
+        of the GUI. With jobs, the build runs sphinx-build -j in its own \
+        process, Sphinx forks its workers and the GUI process, with its \
+        threads, must not be forked. It pays for a new interpreter and the \
+        imports of Sphinx, run python benchmark_docs.py to know from how \
+        many modules it is worth it. A parallel build is only done again \
+        serially when it failed because of the parallel build itself.
+
+    :param docs_folder_path: The docs folder, holding source and build.
+
+    :param cancel_token: The CancellationToken terminating the Sphinx \
+        worker or sphinx-build. Default is None.
+
+    :param on_line: A function called with each output line of Sphinx. \
+        Default is None.
+
+    :param jobs: The number of processes of the build. Default is None, \
+        a serial build in the Sphinx worker.
+
+    :return: True if the documentation was built
+    """
+    if jobs is not None and not isinstance(jobs, int):
+        raise TypeError("Invalid type for jobs")
+    jobs = 1 if jobs is None else max(1, jobs)
+    # As sphinx.util.parallel.parallel_available, Sphinx is not imported here
+    if jobs > 1 and os.name != "posix":
+        logger("Sphinx cannot fork on this platform, serial Sphinx build")
+        jobs = 1
+    if jobs > 1:
+        result = log_and_process(
+            sphinx_build_command(docs_folder_path, jobs),
+            cwd=script_path,
+            cancel_token=cancel_token,
+            on_line=on_line,
+        )
+        if result.ok:
+            return True
+        if not is_parallel_failure(result):
+            logger(
+                f"sphinx-build failed in {docs_folder_path}:\n{result.output_tail}",
+                "warn",
+            )
+            return False
+        logger("Parallel Sphinx build failed, building serially", "warn")
+    return run_sphinx_build_in_worker(docs_folder_path, cancel_token, on_line)
+
+
+def run_sphinx_build_in_worker(docs_folder_path, cancel_token=None, on_line=None):
+    """
+    This function builds the HTML documentation serially, as sphinx-build \
+        but in the Sphinx worker process, where Sphinx is already imported.
+
+    :param docs_folder_path: The docs folder, holding source and build.
+
+    :param cancel_token: The CancellationToken terminating the worker. \
+        Default is None.
+
+    :param on_line: A function called with each output line of Sphinx. \
+        Default is None.
+
+    :return: True if the documentation was built
+    """
+    source_folder_path = os.path.join(docs_folder_path, "source")
+    build_folder_path = os.path.join(docs_folder_path, "build")
+    logger(f"sphinx-build -b html {source_folder_path} {build_folder_path}")
+    success, output_tail = sphinx_worker.run(
+        "build", (docs_folder_path,), cancel_token, on_line
     )
+    if not success:
+        logger(f"sphinx-build failed in {source_folder_path}:\n{output_tail}", "warn")
+        return False
+    logger("sphinx-build finished")
+    return True
+
 
-    change_version(
-        os.path.join(docs_folder_path, "source", "conf.py"),
-        version_mip,
+def sphinx_shard_repositories(apidoc_folder_path):
+    """
+    This function lists the repositories documented by sphinx-apidoc.
+
+    :param apidoc_folder_path: The folder where sphinx-apidoc wrote the files.
+
+    :return: The sorted names of the repositories
+    """
+    return sorted(
+        {
+            file_name.split(".")[1]
+            for file_name in os.listdir(apidoc_folder_path)
+            if file_name.startswith("local_modules.") and file_name.count(".") >= 2
+        }
     )
 
-    log_and_process(
-        [
-            "sphinx-build",
-            "-b",
-            "html",
-            os.path.join(docs_folder_path, "source"),
-            os.path.join(docs_folder_path, "build"),
-        ]
+
+def remove_sphinx_shards(docs_folder_path, keep=()):
+    """
+    This function removes the projects and pages of the repositories built \
+        apart that are not kept.
+
+    :param docs_folder_path: The docs folder, holding source, build and shards.
+
+    :param keep: The repositories whose project is kept. Default is none.
+
+    :return: None
+    """
+    shards_folder_path = os.path.join(docs_folder_path, "shards")
+    if not os.path.exists(shards_folder_path):
+        return
+    for repo_name in os.listdir(shards_folder_path):
+        if repo_name not in keep:
+            shutil.rmtree(os.path.join(shards_folder_path, repo_name))
+            shutil.rmtree(
+                os.path.join(docs_folder_path, "build", repo_name), ignore_errors=True
+            )
+            logger(f"Removed the documentation project of {repo_name}")
+    if not os.listdir(shards_folder_path):
+        os.rmdir(shards_folder_path)
+
+
+def remove_monolithic_build(docs_folder_path):
+    """
+    This function removes the outputs of the single project documenting \
+        all the modules from docs/build: the pages of the modules, their \
+        sources and highlighted code, and its environment, so they are not \
+        zipped with the pages of the repositories built apart.
+
+    :param docs_folder_path: The docs folder, holding source, build and shards.
+
+    :return: None
+    """
+    build_folder_path = os.path.join(docs_folder_path, "build")
+    if not os.path.exists(build_folder_path):
+        return
+    pages = [
+        os.path.join(folder_path, file_name)
+        for folder_path in (
+            build_folder_path,
+            os.path.join(build_folder_path, "_sources"),
+        )
+        if os.path.isdir(folder_path)
+        for file_name in os.listdir(folder_path)
+        if file_name.startswith("local_modules")
+    ]
+    modules_folder_path = os.path.join(build_folder_path, "_modules")
+    if not pages and not os.path.exists(modules_folder_path):
+        return
+    for page in pages:
+        remove_file(page)
+    shutil.rmtree(modules_folder_path, ignore_errors=True)
+    # Its environment still holds all the modules, the index is read again
+    shutil.rmtree(os.path.join(build_folder_path, ".doctrees"), ignore_errors=True)
+    logger(f"Removed {len(pages)} pages of the single documentation project")
+
+
+def prepare_sphinx_shards(docs_folder_path, apidoc_folder_path, repositories):
+    """
+    This function creates the Sphinx project of each repository in \
+        docs/shards, from the project in docs/source and the files \
+        generated by sphinx-apidoc. Each project links the others with \
+        intersphinx, its pages are written to docs/build/<repository>.
+
+    :param docs_folder_path: The docs folder, holding source, build and shards.
+
+    :param apidoc_folder_path: The folder where sphinx-apidoc wrote the files.
+
+    :param repositories: The repositories to build apart.
+
+    :return: None
+    """
+    source_folder_path = os.path.join(docs_folder_path, "source")
+    build_folder_path = os.path.join(docs_folder_path, "build")
+    remove_sphinx_shards(docs_folder_path, keep=repositories)
+    remove_monolithic_build(docs_folder_path)
+    with open(os.path.join(source_folder_path, "conf.py"), "r") as file:
+        conf = file.read()
+    generated = os.listdir(apidoc_folder_path)
+    for repo_name in repositories:
+        shard_folder_path = os.path.join(docs_folder_path, "shards", repo_name)
+        shard_source_folder_path = os.path.join(shard_folder_path, "source")
+        for folder in ("_templates", "_static"):
+            sync_directory(
+                os.path.join(source_folder_path, folder),
+                os.path.join(shard_source_folder_path, folder),
+            )
+        # The inventories of the other repositories are read from the disk,
+        # those not built yet are linked from the next build
+        intersphinx_mapping = {
+            other_repo: (
+                f"../{other_repo}",
+                os.path.join(build_folder_path, other_repo, "objects.inv"),
+            )
+            for other_repo in repositories
+            if other_repo != repo_name
+        }
+        write_if_changed(
+            os.path.join(shard_source_folder_path, "conf.py"),
+            conf
+            + SHARD_CONF_TEMPLATE.format(
+                project_folder=os.path.abspath(script_path),
+                repo_name=repo_name,
+                intersphinx_mapping=intersphinx_mapping,
+            ),
+        )
+        write_if_changed(
+            os.path.join(shard_source_folder_path, "index.rst"),
+            SHARD_INDEX_TEMPLATE.format(
+                title=repo_name, underline="=" * len(repo_name), repo_name=repo_name
+            ),
+        )
+        sync_apidoc_sources(
+            apidoc_folder_path,
+            shard_folder_path,
+            [
+                file_name
+                for file_name in generated
+                if file_name.startswith(f"local_modules.{repo_name}.")
+            ],
+            os.path.join(build_folder_path, repo_name),
+        )
+
+
+def build_sphinx_shards(
+    docs_folder_path, repositories, cancel_token=None, progress_bar=None, jobs=None
+):
+    """
+    This function builds the project of each repository in its own \
+        sphinx-build process, several at the same time. A repository that \
+        fails does not stop the others, the next build only reads again \
+        the repositories that changed.
+
+    :param docs_folder_path: The docs folder, holding source, build and shards.
+
+    :param repositories: The repositories to build.
+
+    :param cancel_token: The CancellationToken terminating the builds. \
+        Default is None.
+
+    :param progress_bar: The progress bar to update. Default is None.
+
+    :param jobs: The number of builds at the same time. Default is None, \
+        one per CPU.
+
+    :return: The list of the repositories whose build failed
+    """
+    build_folder_path = os.path.join(docs_folder_path, "build")
+    completed = as_completed_results(
+        {
+            repo_name: log_and_process_async(
+                [
+                    sys.executable,
+                    "-m",
+                    "sphinx",
+                    "-b",
+                    "html",
+                    "-d",
+                    os.path.join(docs_folder_path, "shards", repo_name, ".doctrees"),
+                    os.path.join(docs_folder_path, "shards", repo_name, "source"),
+                    os.path.join(build_folder_path, repo_name),
+                ],
+                cwd=script_path,
+            )
+            for repo_name in repositories
+        },
+        limit=jobs or os.cpu_count() or 1,
+        track=True,
+        cancel_token=cancel_token,
     )
+    failed = []
+    for nb_completed, (repo_name, result, error) in enumerate(completed, start=1):
+        if error is not None:
+            logger(f"{repo_name}: {error}", "error")
+        if error is not None or not result.ok:
+            failed.append(repo_name)
+        if progress_bar is not None:
+            progress_bar.set(0.9 * nb_completed / len(repositories))
+    if failed:
+        logger(f"The documentation of {', '.join(failed)} failed", "warn")
+    return failed
+
+
+def launch_sphinx_api(
+    version_mip, cancel_token=None, progress_bar=None, jobs=None, sharded=False
+):
+    """
+    This function launches the sphinx API.
+
+    :param version_mip: The version of the MIP.
+
+    :param cancel_token: The CancellationToken stopping the generation \
+        between two steps, and terminating the Sphinx build. Default is None.
+
+    :param progress_bar: The progress bar following the output of \
+        Sphinx. Default is None.
+
+    :param jobs: The number of processes of the Sphinx build. \
+        Default is None, a serial build in the Sphinx worker.
+
+    :param sharded: True to build each repository as its own Sphinx \
+        project, in docs/build/<repository>, linked from the index. \
+        Default is False, a single project documents all the modules.
+
+    :return: None
+    """
+    docs_folder_path = os.path.join(script_path, "docs")
+    apidoc_folder_path = os.path.join(docs_folder_path, "apidoc")
 
+    try:
+        # Generated apart, only the sources that changed are copied
+        if os.path.exists(apidoc_folder_path):
+            shutil.rmtree(apidoc_folder_path)
+        run_sphinx_apidoc(
+            apidoc_folder_path, os.path.join(script_path, "local_modules", ".")
+        )
+        logger("Documentation generated successfully")
+    except Exception as e:
+        logger(f"Error while generating documentation: {e}", "error")
+        logger(e, "critical")
 
-def create_zip_file_sphinx_build(password, self_progress):
+    repositories = sphinx_shard_repositories(apidoc_folder_path) if sharded else None
+    create_sphinx_project(docs_folder_path, version_mip, repositories)
+    if sharded:
+        # The modules are only documented by the projects of the repositories
+        sync_apidoc_sources(apidoc_folder_path, docs_folder_path, [])
+        prepare_sphinx_shards(docs_folder_path, apidoc_folder_path, repositories)
+    else:
+        remove_sphinx_shards(docs_folder_path)
+        sync_apidoc_sources(apidoc_folder_path, docs_folder_path)
+
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+    if sharded:
+        build_sphinx_shards(
+            docs_folder_path, repositories, cancel_token, progress_bar, jobs
+        )
+        run_sphinx_build(docs_folder_path, cancel_token, jobs=1)
+    else:
+        run_sphinx_build(
+            docs_folder_path,
+            cancel_token,
+            SphinxBuildProgress(progress_bar) if progress_bar else None,
+            jobs,
+        )
+
+
+def create_zip_file_sphinx_build(password, self_progress, cancel_token=None):
     """
     This function creates a ZIP file with password protection.
 
@@ -182,6 +752,9 @@ def create_zip_file_sphinx_build(password, self_progress):
 
     :param self_progress: The progress bar to update.
 
+    :param cancel_token: The CancellationToken stopping the compression \
+        between two files, the partial ZIP file is removed. Default is None.
+
     :return: None
     """
     if not isinstance(password, str):
@@ -209,6 +782,8 @@ def create_zip_file_sphinx_build(password, self_progress):
             # Add all files and subdirectories in the directory to the ZIP file
             for foldername, subfolders, filenames in os.walk(source_directory):
                 for filename in filenames:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
                     file_path = os.path.join(foldername, filename)
                     arcname = os.path.relpath(file_path, source_directory)
                     zipf.write(
@@ -221,5 +796,8 @@ def create_zip_file_sphinx_build(password, self_progress):
         zipf.setpassword(bytes(password, "utf-8"))
         logger(f'ZIP file "{destination_directory}" created with password protection.')
         return destination_directory, os.path.join(script_path, "builds")
+    except OperationCancelled:
+        os.remove(destination_directory)
+        raise
     except Exception as e:
         logger(f"An error occurred: {str(e)}", "critical")
@@ -4,9 +4,13 @@ import tkinter as tk
 
 import customtkinter as ctk
 from app.logger import logger
+from app.prefetcher import Prefetcher
+from app.ui_bus import UiBus
 from app.up.add_repository_popup import AddRepository
 from app.up.branch_commit_popup import CommitRepository
 from app.up.branch_creator_popup import AddBranchToAllRepositories
+from app.up.branch_matrix_popup import BranchMatrixPopup
+from app.up.dashboard_popup import Dashboard
 from app.up.repo_updater_popup import UpdateRepositories
 from app.up.show_repo_popup import ShowActifRepositories
 from app.up.sphinx_creator_popup import SphinxCreatorPopup
@@ -37,12 +41,17 @@ class MultiRepoManager(ctk.CTk):
         ctk.set_default_color_theme("dark-blue")
         ctk.set_appearance_mode("dark")
 
+        # The worker threads of the popups update their widgets through the bus
+        self.ui_bus = UiBus(self)
+
         self.title("Multi Repository Handler")
-        self.geometry("420x350")
+        self.geometry("420x480")
         self.resizable(False, False)
         self.add_repository_popup = None
         self.branch_commit_popup = None
         self.branch_creator_popup = None
+        self.branch_matrix_popup = None
+        self.dashboard_popup = None
         self.repo_updater_popup = None
         self.show_repo_popup = None
         self.sphinx_creator_popup = None
@@ -55,6 +64,15 @@ class MultiRepoManager(ctk.CTk):
         ).pack(pady=5, ipady=5)
         self.main_window()
 
+        # Fetch all repositories in the background, so the updates are local
+        self.prefetcher = Prefetcher()
+        self.prefetcher.start()
+        self.prefetch_switch = ctk.CTkSwitch(
+            self, text="Background prefetch", command=self.toggle_prefetch
+        )
+        self.prefetch_switch.select()
+        self.prefetch_switch.pack(pady=5)
+
     def run(self) -> None:
         """
         This method is used to run the application
@@ -65,6 +83,21 @@ class MultiRepoManager(ctk.CTk):
         """
         self.mainloop()
 
+    def toggle_prefetch(self):
+        """
+        This method is used to pause or resume the background prefetcher
+
+        :param: None
+
+        :returns: None
+        """
+        if self.prefetch_switch.get():
+            logger("Background prefetch resumed")
+            self.prefetcher.resume()
+        else:
+            logger("Background prefetch paused")
+            self.prefetcher.pause()
+
     def open_add_repository_popup(self):
         if (
             self.add_repository_popup is None
@@ -95,6 +128,23 @@ class MultiRepoManager(ctk.CTk):
         else:
             self.branch_creator_popup.focus()
 
+    def open_branch_matrix_popup(self):
+        if (
+            self.branch_matrix_popup is None
+            or not self.branch_matrix_popup.winfo_exists()
+        ):
+            self.withdraw()
+            self.branch_matrix_popup = BranchMatrixPopup(self)
+        else:
+            self.branch_matrix_popup.focus()
+
+    def open_dashboard_popup(self):
+        # The dashboard stays open next to the main window and the other popups
+        if self.dashboard_popup is None or not self.dashboard_popup.winfo_exists():
+            self.dashboard_popup = Dashboard(self)
+        else:
+            self.dashboard_popup.focus()
+
     def open_branch_commit_popup(self):
         if (
             self.branch_commit_popup is None
@@ -208,6 +258,30 @@ class MultiRepoManager(ctk.CTk):
 
         create_sphinx_doc.grid(row=4, column=2, padx=10, pady=10)
 
+        branch_matrix_button = ctk.CTkButton(
+            frame,
+            text="Branch matrix",
+            width=150,
+            height=70,
+            command=self.open_branch_matrix_popup,
+            font=("Inter", 15),
+            corner_radius=10,
+        )
+
+        branch_matrix_button.grid(row=5, column=1, padx=10, pady=10)
+
+        dashboard_button = ctk.CTkButton(
+            frame,
+            text="Dashboard",
+            width=150,
+            height=70,
+            command=self.open_dashboard_popup,
+            font=("Inter", 15),
+            corner_radius=10,
+        )
+
+        dashboard_button.grid(row=5, column=2, padx=10, pady=10)
+
     def show_alert(self, message):
         """
         This function shows an alert message.
@@ -0,0 +1,152 @@
+"""
+This module contains the helpers of the local bare-mirror cache.
+
+Each registered repository has a bare mirror in the mirrors folder, \
+    refreshed with a single fetch from the server. The working copies in \
+    remote_repositories are cloned from their mirror and fetch from it, \
+    while their pushes still go to the server. Removing and re-adding a \
+    working copy therefore costs no network.
+
+The cache is used by default; a repository opts out with \
+    "mirror": false in its entry of repos.json. A working copy cloned \
+    before the cache keeps fetching from the server, unless its entry \
+    opts in with "attach_mirror": true.
+"""
+import os
+import time
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MIRRORS_FOLDER = os.path.join(script_path, "mirrors")
+
+USE_MIRROR_CACHE = True
+
+# A mirror fetched less than MIRROR_MAX_AGE seconds ago is not fetched again
+# before cloning a working copy from it
+MIRROR_MAX_AGE = 600
+
+# The working copies cloned from the server are not switched to their
+# mirror, unless their entry in repos.json asks for it
+ATTACH_WORKING_COPIES = False
+
+
+def get_mirror_path(repo_name):
+    """
+    This function returns the path of the bare mirror of a repository.
+
+    :param repo_name: The name of the repository
+
+    :return: The path of the mirror
+    """
+    if not isinstance(repo_name, str):
+        raise TypeError("Invalid type for repo_name")
+    # Normalized, the path is written to the config of the working copies
+    return os.path.abspath(os.path.join(MIRRORS_FOLDER, f"{repo_name}.git"))
+
+
+def uses_mirror(repo_entry, repo_url):
+    """
+    This function tells if a repository should use the mirror cache.
+
+    :param repo_entry: The value stored in repos.json for the repository, \
+        None for a repository not yet registered
+
+    :param repo_url: The URL of the repository
+
+    :return: True if the repository uses the mirror cache
+    """
+    if not repo_url or is_mirror_url(repo_url):
+        return False
+    if isinstance(repo_entry, dict):
+        return bool(repo_entry.get("mirror", USE_MIRROR_CACHE))
+    return USE_MIRROR_CACHE
+
+
+def attaches_mirror(repo_entry, repo_url):
+    """
+    This function tells if a working copy fetching from the server should \
+        be switched to its mirror.
+
+    :param repo_entry: The value stored in repos.json for the repository
+
+    :param repo_url: The URL of the repository
+
+    :return: True if the working copy is switched to its mirror
+    """
+    if not uses_mirror(repo_entry, repo_url):
+        return False
+    if isinstance(repo_entry, dict):
+        return bool(repo_entry.get("attach_mirror", ATTACH_WORKING_COPIES))
+    return ATTACH_WORKING_COPIES
+
+
+def is_mirror_url(url):
+    """
+    This function tells if a remote URL points to the mirror cache.
+
+    :param url: The URL of the remote
+
+    :return: True if the URL is a mirror of the cache
+    """
+    if not url:
+        return False
+    mirrors_folder = os.path.normcase(os.path.abspath(MIRRORS_FOLDER))
+    path = os.path.normcase(os.path.abspath(get_mirror_dir(url)))
+    return path.startswith(mirrors_folder + os.sep)
+
+
+def get_mirror_dir(url):
+    """
+    This function returns the path of a mirror from the URL of a remote, \
+        which is a file:// URL for the partial and shallow clones.
+
+    :param url: The URL of the remote
+
+    :return: The path of the mirror, usable with git --git-dir
+    """
+    if not url.startswith("file://"):
+        return url
+    path = unquote(urlparse(url).path)
+    if os.name == "nt":
+        # file:///C:/mirrors/repo.git
+        path = path.lstrip("/")
+    return path
+
+
+def get_mirror_source(mirror_path, clone_options):
+    """
+    This function returns the source to clone a working copy from a mirror.
+
+    Partial and shallow clones only work through a file:// URL, a plain \
+        path makes a local clone that hardlinks all the objects of the \
+        mirror and ignores --filter and --depth. The filter is only applied \
+        because the mirror sets uploadpack.allowFilter, see \
+        configure_mirror_async in app.utils.
+
+    :param mirror_path: The path of the mirror
+
+    :param clone_options: The dict of clone options
+
+    :return: The path or URL to clone
+    """
+    if clone_options.get("filter") or clone_options.get("depth"):
+        return Path(mirror_path).resolve().as_uri()
+    return mirror_path
+
+
+def get_mirror_age(mirror_path):
+    """
+    This function returns the number of seconds since the last fetch of a mirror.
+
+    :param mirror_path: The path of the mirror
+
+    :return: The age in seconds, None if the mirror does not exist
+    """
+    for marker in ("FETCH_HEAD", "HEAD"):
+        try:
+            return time.time() - os.path.getmtime(os.path.join(mirror_path, marker))
+        except OSError:
+            continue
+    return None
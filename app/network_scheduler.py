@@ -0,0 +1,259 @@
+"""
+This module contains the scheduler placed in front of the git network \
+    commands (pull, push, clone and fetch).
+
+The scheduler caps the number of connections opened at the same time to \
+    each remote host, retries the transient failures with an exponential \
+    backoff and jitter, and measures the aggregate throughput of a batch.
+"""
+import asyncio
+import contextlib
+import contextvars
+import random
+import re
+import time
+from dataclasses import dataclass
+
+from app.logger import logger
+from app.process_runner import runner
+
+# Maximum number of git network commands running at the same time per host
+MAX_CONNECTIONS_PER_HOST = 4
+
+# Number of attempts made for a command failing with a transient error
+RETRY_ATTEMPTS = 4
+
+# Delay in seconds before the first retry, doubled at each new attempt
+RETRY_BASE_DELAY = 1.0
+
+# Upper bound in seconds of the delay between two attempts
+RETRY_MAX_DELAY = 30.0
+
+# Host used for the repositories whose URL is unknown
+UNKNOWN_HOST = "unknown"
+
+# Output fragments (lower case) of the failures worth retrying
+TRANSIENT_ERRORS = (
+    "could not resolve host",
+    "connection reset",
+    "connection refused",
+    "failed to connect to",
+    "couldn't connect to server",
+    "connection timed out",
+    "operation timed out",
+    "early eof",
+    "rpc failed",
+    "the remote end hung up unexpectedly",
+    "unexpected disconnect",
+    "too many requests",
+    "service unavailable",
+    "bad gateway",
+    "gateway time-out",
+    "the requested url returned error: 429",
+    "the requested url returned error: 502",
+    "the requested url returned error: 503",
+    "the requested url returned error: 504",
+    "kex_exchange_identification",
+    "ssh_exchange_identification",
+    "temporary failure in name resolution",
+    "gnutls_handshake",
+)
+
+# Stats of the batches measuring the commands of the current thread or task,
+# the commands started elsewhere, e.g. by the prefetcher, are not counted
+_current_batches = contextvars.ContextVar("network_batches", default=())
+
+# scp-like syntax used by ssh remotes, e.g. git@host:group/repo.git
+# (a single letter before the colon is a Windows drive, not a host)
+SCP_LIKE_URL = re.compile(r"^(?:[^@/]+@)?(?P<host>[^:/\\]{2,}):(?!//)")
+
+# URL syntax, e.g. https://user@host:443/group/repo.git
+SCHEME_URL = re.compile(r"^[a-z][a-z0-9+.-]*://(?:[^@/]+@)?(?P<host>[^:/]+)", re.I)
+
+
+def host_from_url(url):
+    """
+    This function extracts the remote host from a git URL.
+
+    :param url: The URL of the repository, as stored in repos.json
+
+    :return: The lower case host name, or UNKNOWN_HOST if it cannot be parsed
+    """
+    if not isinstance(url, str):
+        return UNKNOWN_HOST
+    url = url.strip()
+    match = SCHEME_URL.match(url) or SCP_LIKE_URL.match(url)
+    return match.group("host").lower() if match else UNKNOWN_HOST
+
+
+def is_transient_failure(result):
+    """
+    This function tells if a failed command is worth retrying.
+
+    :param result: The CommandResult of the command
+
+    :return: True if the command timed out or failed with a network error
+    """
+    if result.ok:
+        return False
+    if result.timed_out:
+        return True
+    output = result.output_tail.lower()
+    return any(error in output for error in TRANSIENT_ERRORS)
+
+
+@dataclass
+class NetworkStats:
+    """
+    This class accumulates the throughput of the network commands of a batch.
+    """
+
+    operations: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retries: int = 0
+    busy_time: float = 0.0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    def record(self, result, attempts):
+        """
+        This method records the final result of a network command.
+
+        :param result: The CommandResult of the last attempt
+
+        :param attempts: The number of attempts made
+
+        :return: None
+        """
+        self.operations += 1
+        self.retries += attempts - 1
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def report(self):
+        """
+        :return: A human readable summary of the throughput of the batch
+        """
+        elapsed = max((self.finished_at or time.perf_counter()) - self.started_at, 1e-9)
+        return (
+            f"{self.operations} network operations in {elapsed:.1f}s "
+            f"({self.operations / elapsed:.2f} ops/s, "
+            f"{self.busy_time / elapsed:.1f} connections busy on average), "
+            f"{self.succeeded} succeeded, {self.failed} failed, "
+            f"{self.retries} retries"
+        )
+
+
+class NetworkScheduler:
+    """
+    This class schedules the git network commands on the command runner.
+
+    :param max_per_host: The maximum number of commands running at the \
+        same time against one host
+
+    :param attempts: The maximum number of attempts for a transient failure
+
+    :param base_delay: The delay before the first retry in seconds
+
+    :param max_delay: The upper bound of the delay between two attempts
+    """
+
+    def __init__(
+        self,
+        max_per_host=MAX_CONNECTIONS_PER_HOST,
+        attempts=RETRY_ATTEMPTS,
+        base_delay=RETRY_BASE_DELAY,
+        max_delay=RETRY_MAX_DELAY,
+    ):
+        if not isinstance(max_per_host, int) or max_per_host < 1:
+            raise ValueError("max_per_host must be a positive integer")
+        if not isinstance(attempts, int) or attempts < 1:
+            raise ValueError("attempts must be a positive integer")
+        self.max_per_host = max_per_host
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Only used from the runner loop, so no lock is needed
+        self._host_limits = {}
+
+    def backoff_delay(self, attempt):
+        """
+        This method computes the delay before a new attempt, \
+            an exponential backoff with full jitter.
+
+        :param attempt: The number of attempts already made
+
+        :return: The delay in seconds
+        """
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        This method measures the throughput of the network commands \
+            run inside the with block. Only the commands started from this \
+            thread, on the command runner, are counted: a batch running in \
+            another thread and the background prefetch are left out.
+
+        :return: The NetworkStats of the batch
+        """
+        stats = NetworkStats(started_at=time.perf_counter())
+        token = _current_batches.set(_current_batches.get() + (stats,))
+        try:
+            yield stats
+        finally:
+            _current_batches.reset(token)
+            stats.finished_at = time.perf_counter()
+
+    async def run(self, command, cwd=None, url=None, timeout=None, low_priority=False):
+        """
+        This method runs a git network command once a connection slot to \
+            its host is free, retrying the transient failures.
+
+        :param command: The command to execute
+
+        :param cwd: The directory in which the command is executed
+
+        :param url: The URL of the remote repository, used to find its host
+
+        :param timeout: The number of seconds after which an attempt is killed
+
+        :param low_priority: True to run the command with the lowest priority
+
+        :return: The CommandResult of the last attempt
+        """
+        host = host_from_url(url)
+        batches = _current_batches.get()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            async with self._host_limits[host]:
+                result = await runner.run_async(
+                    command, cwd=cwd, timeout=timeout, low_priority=low_priority
+                )
+            for stats in batches:
+                stats.busy_time += result.duration
+            if attempt >= self.attempts or not is_transient_failure(result):
+                break
+            delay = self.backoff_delay(attempt)
+            logger(
+                f"{' '.join(command)} failed on {host} "
+                f"(attempt {attempt}/{self.attempts}), retrying in {delay:.1f}s",
+                "warn",
+            )
+            await asyncio.sleep(delay)
+
+        for stats in batches:
+            stats.record(result, attempt)
+        return result
+
+
+network_scheduler = NetworkScheduler()
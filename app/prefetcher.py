@@ -0,0 +1,188 @@
+"""
+This module contains the background prefetcher started by the main window.
+
+The prefetcher periodically fetches all the registered repositories with \
+    the lowest priority, so a later "Update & Checkout" only needs a local \
+    checkout and fast-forward. The interactive operations preempt it: the \
+    running fetches are killed and the prefetcher waits until they are over.
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import os
+import threading
+
+from app.logger import logger
+from app.process_runner import runner
+from app.utils import get_json_data, git_fetch_async
+
+script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Number of seconds between two prefetches of all the repositories
+PREFETCH_INTERVAL = 300
+
+# A fetch younger than PREFETCH_MAX_AGE seconds is recent enough for an update
+PREFETCH_MAX_AGE = 2 * PREFETCH_INTERVAL
+
+# Number of repositories fetched at the same time by the prefetcher
+PREFETCH_CONCURRENCY = 2
+
+
+class Prefetcher(threading.Thread):
+    """
+    This class fetches all the registered repositories in the background.
+
+    :param interval: The number of seconds between two prefetches
+    """
+
+    def __init__(self, interval=PREFETCH_INTERVAL):
+        super().__init__(name="prefetcher", daemon=True)
+        self.interval = interval
+        self.enabled = threading.Event()
+        self.enabled.set()
+        self._stopped = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+        self._nb_interactive = 0
+        self._future = None
+
+    def run(self):
+        """
+        This method prefetches all the repositories every interval seconds.
+
+        :param: None
+
+        :return: None
+        """
+        while not self._stopped.is_set():
+            self.enabled.wait()
+            self._idle.wait()
+            if self._stopped.is_set():
+                return
+            self.prefetch_all()
+            self._stopped.wait(self.interval)
+
+    def prefetch_all(self):
+        """
+        This method fetches all the registered repositories once, \
+            unless an interactive operation preempts it.
+
+        :param: None
+
+        :return: None
+        """
+        repos_data, _ = get_json_data()
+        root_directory = os.path.join(script_path, "remote_repositories")
+        directories = [
+            os.path.join(root_directory, repo)
+            for repo in repos_data
+            if os.path.exists(os.path.join(root_directory, repo, ".git"))
+        ]
+        if not directories:
+            return
+
+        with self._lock:
+            if not self._idle.is_set() or not self.enabled.is_set():
+                return
+            self._future = runner.submit(_fetch_all(directories))
+        try:
+            nb_fetched = self._future.result()
+            logger(f"Prefetched {nb_fetched}/{len(directories)} repositories")
+        except concurrent.futures.CancelledError:
+            logger("Prefetch preempted by an interactive operation")
+        except Exception as e:
+            logger(f"Prefetch failed: {e}", "warn")
+        finally:
+            with self._lock:
+                self._future = None
+
+    @contextlib.contextmanager
+    def interactive(self):
+        """
+        This method preempts the prefetcher during the with block: \
+            the running fetches are killed and no new one starts.
+
+        :return: None
+        """
+        with self._lock:
+            self._nb_interactive += 1
+            self._idle.clear()
+            if self._future is not None:
+                self._future.cancel()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._nb_interactive -= 1
+                if self._nb_interactive == 0:
+                    self._idle.set()
+
+    def max_age(self):
+        """
+        This method returns how old a fetch can be for an update to \
+            skip the network.
+
+        :return: PREFETCH_MAX_AGE when the prefetcher runs, 0 otherwise
+        """
+        if self.is_alive() and self.enabled.is_set():
+            return PREFETCH_MAX_AGE
+        return 0
+
+    def pause(self):
+        """
+        This method pauses the prefetcher and kills its running fetches.
+
+        :param: None
+
+        :return: None
+        """
+        self.enabled.clear()
+        with self._lock:
+            if self._future is not None:
+                self._future.cancel()
+
+    def resume(self):
+        """
+        This method resumes the prefetcher.
+
+        :param: None
+
+        :return: None
+        """
+        self.enabled.set()
+
+    def stop(self):
+        """
+        This method stops the prefetcher and kills its running fetches.
+
+        :param: None
+
+        :return: None
+        """
+        self._stopped.set()
+        self.enabled.set()
+        self._idle.set()
+        with self._lock:
+            if self._future is not None:
+                self._future.cancel()
+
+
+async def _fetch_all(directories):
+    """
+    This function fetches the working copies, PREFETCH_CONCURRENCY at a time, \
+        with the lowest priority.
+
+    :param directories: The paths of the working copies
+
+    :return: The number of working copies fetched successfully
+    """
+    limiter = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+
+    async def fetch(directory):
+        async with limiter:
+            result = await git_fetch_async(directory, low_priority=True)
+            return result is None or result.ok
+
+    results = await asyncio.gather(*(fetch(directory) for directory in directories))
+    return sum(results)
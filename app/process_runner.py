@@ -0,0 +1,444 @@
+"""
+This module contains the asyncio subprocess runner used to execute the git \
+    and sphinx commands.
+
+All the commands run on a single event loop living in a background thread, \
+    so the bulk operations can start hundreds of commands without creating \
+    one thread per repository. A global semaphore caps the number of \
+    processes running at the same time.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import contextvars
+import os
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+
+from app import repo_events
+from app.cancellation import OperationCancelled
+
+# Maximum number of child processes running at the same time
+MAX_CONCURRENT_PROCESSES = 16
+
+# Number of output lines kept for each command
+OUTPUT_TAIL_LINES = 50
+
+# Size of the chunks read from the output of the commands
+READ_CHUNK_SIZE = 4096
+
+# Number of seconds a cancelled process has to exit before being killed
+TERMINATE_TIMEOUT = 5
+
+
+@dataclass
+class CommandResult:
+    """
+    This class holds the result of a command executed by the runner.
+
+    :param command: The command that was executed
+
+    :param cwd: The directory in which the command was executed
+
+    :param returncode: The exit code of the command, -1 if it timed out
+
+    :param duration: The wall-clock duration of the command in seconds
+
+    :param output: The last lines of the merged stdout and stderr
+
+    :param timed_out: True if the command was killed after its timeout
+    """
+
+    command: list
+    cwd: str = None
+    returncode: int = None
+    duration: float = 0.0
+    output: list = field(default_factory=list)
+    timed_out: bool = False
+
+    @property
+    def ok(self):
+        """
+        :return: True if the command exited with code 0
+        """
+        return self.returncode == 0
+
+    @property
+    def output_tail(self):
+        """
+        :return: The last lines of the output joined in a single string
+        """
+        return "\n".join(self.output)
+
+
+class CommandRunner:
+    """
+    This class runs commands as asyncio subprocesses on an event loop \
+        owned by a daemon thread.
+
+    :param max_concurrent_processes: The maximum number of processes \
+        running at the same time
+
+    :param tail_lines: The number of output lines kept for each command
+    """
+
+    def __init__(
+        self,
+        max_concurrent_processes=MAX_CONCURRENT_PROCESSES,
+        tail_lines=OUTPUT_TAIL_LINES,
+    ):
+        if not isinstance(max_concurrent_processes, int):
+            raise TypeError("Invalid type for max_concurrent_processes")
+        if max_concurrent_processes < 1:
+            raise ValueError("max_concurrent_processes must be positive")
+        self.max_concurrent_processes = max_concurrent_processes
+        self.tail_lines = tail_lines
+        self._loop = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """
+        This property starts the event loop thread on first use.
+
+        :return: The event loop of the runner
+        """
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="command-runner", daemon=True
+                ).start()
+                self._semaphore = asyncio.Semaphore(self.max_concurrent_processes)
+                self._loop = loop
+        return self._loop
+
+    def submit(self, coroutine):
+        """
+        This method schedules a coroutine on the event loop of the runner. \
+            The coroutine sees the context variables of the calling thread, \
+            e.g. the network batch it belongs to.
+
+        :param coroutine: The coroutine to schedule
+
+        :return: A concurrent.futures.Future holding the result of the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(
+            _run_in_context(contextvars.copy_context(), coroutine), self.loop
+        )
+
+    def run(self, coroutine, cancel_token=None):
+        """
+        This method runs a coroutine on the event loop and waits for its result.
+
+        :param coroutine: The coroutine to run
+
+        :param cancel_token: The CancellationToken cancelling the coroutine, \
+            which terminates its processes. Default is None
+
+        :return: The result of the coroutine
+        """
+        future = self.submit(coroutine)
+        if cancel_token is None:
+            return future.result()
+        cancel_token.register(future)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            raise OperationCancelled() from None
+
+    async def run_async(
+        self,
+        command,
+        cwd=None,
+        timeout=None,
+        low_priority=False,
+        full_output=False,
+        on_line=None,
+    ):
+        """
+        This method executes a command once a process slot is free.
+
+        If the coroutine is cancelled, the process is terminated.
+
+        :param command: The command to execute
+
+        :param cwd: The directory in which the command is executed
+
+        :param timeout: The number of seconds after which the command is killed. \
+            Default is no timeout
+
+        :param low_priority: True to run the command with the lowest CPU \
+            priority. Default is False
+
+        :param full_output: True to keep every line of the output instead \
+            of its tail, for the commands whose output is parsed. \
+            Default is False
+
+        :param on_line: A function called with each output line as soon as \
+            it is read, on the runner loop, so it must not block. \
+            Default is None
+
+        :return: The CommandResult of the command
+        """
+        if not isinstance(command, list):
+            raise TypeError("Invalid type for command")
+        # The runner loop is started before any coroutine can run on it
+        async with self._semaphore:
+            result = CommandResult(command=command, cwd=cwd)
+            tail = collections.deque(maxlen=None if full_output else self.tail_lines)
+            start = time.perf_counter()
+            repo_events.post_line(f"$ {' '.join(command)}")
+            process = await asyncio.create_subprocess_exec(
+                *_with_priority(command, low_priority),
+                cwd=cwd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                **_priority_flags(low_priority),
+            )
+            reading = asyncio.gather(
+                _read_lines(process.stdout, tail, on_line), process.wait()
+            )
+            # wait_for does not retrieve the error of the gather it cancels
+            reading.add_done_callback(
+                lambda future: future.cancelled() or future.exception()
+            )
+            try:
+                await asyncio.wait_for(reading, timeout)
+                result.returncode = process.returncode
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                result.returncode = -1
+                result.timed_out = True
+            except asyncio.CancelledError:
+                await _terminate(process)
+                raise
+            result.duration = time.perf_counter() - start
+            result.output = list(tail)
+            return result
+
+
+async def _terminate(process):
+    """
+    This function stops a process, letting it clean up (git removes its \
+        lock files) before killing it if it does not exit in time.
+
+    :param process: The asyncio process to stop
+
+    :return: None
+    """
+    if process.returncode is not None:
+        return
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+def _with_priority(command, low_priority):
+    """
+    This function prefixes a command with nice on POSIX systems when it \
+        has to run with a low priority.
+
+    :param command: The command to execute
+
+    :param low_priority: True to run the command with the lowest priority
+
+    :return: The command to execute
+    """
+    if low_priority and os.name == "posix" and shutil.which("nice"):
+        return ["nice", "-n", "19", *command]
+    return command
+
+
+def _priority_flags(low_priority):
+    """
+    This function returns the process creation flags lowering the \
+        priority of a command on Windows.
+
+    :param low_priority: True to run the command with the lowest priority
+
+    :return: The keyword arguments of create_subprocess_exec
+    """
+    if low_priority and os.name == "nt":
+        return {"creationflags": subprocess.IDLE_PRIORITY_CLASS}
+    return {}
+
+
+async def _run_in_context(context, coroutine):
+    """
+    This function runs a coroutine in its task with the context variables \
+        of the thread that submitted it.
+
+    :param context: The contextvars.Context of the submitting thread
+
+    :param coroutine: The coroutine to run
+
+    :return: The result of the coroutine
+    """
+    # The task has its own copy of the context, the values only live in it
+    for variable, value in context.items():
+        variable.set(value)
+    return await coroutine
+
+
+async def _read_lines(stream, tail, on_line=None):
+    """
+    This function reads a stream until its end and keeps its last lines.
+
+    Git reports its progress with carriage returns, so both '\\r' and '\\n' \
+        end a line.
+
+    :param stream: The asyncio stream to read
+
+    :param tail: The bounded deque receiving the lines
+
+    :param on_line: A function called with each line. Default is None
+
+    :return: None
+    """
+    pending = ""
+    while chunk := await stream.read(READ_CHUNK_SIZE):
+        pending += chunk.decode("utf-8", errors="replace").replace("\r", "\n")
+        *lines, pending = pending.split("\n")
+        lines = [line for line in lines if line.strip()]
+        tail.extend(lines)
+        if lines:
+            repo_events.post_line(lines[-1])
+            if on_line is not None:
+                for line in lines:
+                    on_line(line)
+    if pending.strip():
+        tail.append(pending)
+        repo_events.post_line(pending)
+        if on_line is not None:
+            on_line(pending)
+
+
+runner = CommandRunner()
+
+
+def run_command(
+    command,
+    cwd=None,
+    timeout=None,
+    low_priority=False,
+    cancel_token=None,
+    on_line=None,
+):
+    """
+    This function executes a command on the shared runner and waits for it.
+
+    :param command: The command to execute
+
+    :param cwd: The directory in which the command is executed
+
+    :param timeout: The number of seconds after which the command is killed
+
+    :param low_priority: True to run the command with the lowest priority
+
+    :param cancel_token: The CancellationToken terminating the command
+
+    :param on_line: A function called with each output line, on the runner loop
+
+    :return: The CommandResult of the command
+    """
+    return runner.run(
+        runner.run_async(
+            command,
+            cwd=cwd,
+            timeout=timeout,
+            low_priority=low_priority,
+            on_line=on_line,
+        ),
+        cancel_token,
+    )
+
+
+async def run_command_async(
+    command, cwd=None, timeout=None, low_priority=False, full_output=False
+):
+    """
+    This function executes a command on the shared runner from a coroutine \
+        already running on the runner loop.
+
+    :param command: The command to execute
+
+    :param cwd: The directory in which the command is executed
+
+    :param timeout: The number of seconds after which the command is killed
+
+    :param low_priority: True to run the command with the lowest priority
+
+    :param full_output: True to keep every line of the output
+
+    :return: The CommandResult of the command
+    """
+    return await runner.run_async(
+        command,
+        cwd=cwd,
+        timeout=timeout,
+        low_priority=low_priority,
+        full_output=full_output,
+    )
+
+
+def as_completed_results(coroutines, limit=None, track=False, cancel_token=None):
+    """
+    This function runs coroutines concurrently on the shared runner and \
+        yields their results as soon as each one finishes.
+
+    :param coroutines: A dict mapping a key to the coroutine to run
+
+    :param limit: The maximum number of coroutines running at the same time. \
+        Default is no limit other than the process semaphore
+
+    :param track: True if the keys are repositories whose status and output \
+        are posted to app.repo_events. Default is False
+
+    :param cancel_token: The CancellationToken cancelling the coroutines \
+        not finished yet. OperationCancelled is raised once they are all \
+        over. Default is None
+
+    :return: A generator of (key, result, error) tuples, \
+        error being None when the coroutine succeeded
+    """
+    if not isinstance(coroutines, dict):
+        raise TypeError("Invalid type for coroutines")
+    limiter = asyncio.Semaphore(limit) if limit else None
+
+    async def limited(key, coroutine):
+        if track:
+            coroutine = repo_events.track_async(key, coroutine)
+        if limiter is None:
+            return await coroutine
+        async with limiter:
+            return await coroutine
+
+    if track:
+        for key in coroutines:
+            repo_events.post(key, repo_events.QUEUED)
+    futures = {
+        runner.submit(limited(key, coroutine)): key
+        for key, coroutine in coroutines.items()
+    }
+    if cancel_token is not None:
+        for future in futures:
+            cancel_token.register(future)
+    for future in concurrent.futures.as_completed(futures):
+        if future.cancelled():
+            continue
+        try:
+            yield futures[future], future.result(), None
+        except Exception as e:
+            yield futures[future], None, e
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
@@ -0,0 +1,125 @@
+"""
+This module contains the events sent by the bulk operations about each \
+    repository: queued, running, done, failed or cancelled, and the last \
+    output line.
+
+The bulk operations run their repositories through \
+    as_completed_results(..., track=True), which posts the status changes, \
+    and the runner posts each output line of the commands started for a \
+    repository. The events are only queued while a window listens to them, \
+    so the bulk operations pay nothing when no window is open.
+"""
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Repository whose commands are running in the current asyncio task
+current_repository = contextvars.ContextVar("current_repository", default=None)
+
+_subscribers = []
+_subscribers_lock = threading.Lock()
+
+
+def subscribe():
+    """
+    This function starts queuing the events for a listener.
+
+    :return: The queue.SimpleQueue receiving the (repository, status, line, \
+        timestamp) events, status or line being None
+    """
+    events = queue.SimpleQueue()
+    with _subscribers_lock:
+        _subscribers.append(events)
+    return events
+
+
+def unsubscribe(events):
+    """
+    This function stops queuing the events for a listener.
+
+    :param events: The queue returned by subscribe
+
+    :return: None
+    """
+    with _subscribers_lock:
+        if events in _subscribers:
+            _subscribers.remove(events)
+
+
+def post(repository, status=None, line=None):
+    """
+    This function sends an event to all the listeners.
+
+    :param repository: The name of the repository
+
+    :param status: The new status of the repository, None if unchanged
+
+    :param line: The last output line of the repository, None if unchanged
+
+    :return: None
+    """
+    # Read without the lock, a listener subscribing now misses nothing useful
+    if not _subscribers:
+        return
+    event = (repository, status, line, time.monotonic())
+    for events in list(_subscribers):
+        events.put(event)
+
+
+def post_line(line):
+    """
+    This function sends an output line of the repository of the current \
+        asyncio task, if any.
+
+    :param line: The output line
+
+    :return: None
+    """
+    if _subscribers and (repository := current_repository.get()) is not None:
+        post(repository, line=line)
+
+
+def is_failure(result):
+    """
+    This function tells if the result of a repository coroutine is a failure: \
+        False, FAILED or a CommandResult that is not ok.
+
+    :param result: The result of the coroutine
+
+    :return: True if the result is a failure
+    """
+    return result is False or result == FAILED or getattr(result, "ok", True) is False
+
+
+async def track_async(repository, coroutine):
+    """
+    This function runs the coroutine of a repository, posting its status \
+        and the output lines of its commands.
+
+    :param repository: The name of the repository
+
+    :param coroutine: The coroutine processing the repository
+
+    :return: The result of the coroutine
+    """
+    # Each coroutine runs in its own task, the variable is local to it
+    current_repository.set(repository)
+    post(repository, RUNNING)
+    try:
+        result = await coroutine
+    except asyncio.CancelledError:
+        post(repository, CANCELLED)
+        raise
+    except BaseException:
+        post(repository, FAILED)
+        raise
+    post(repository, FAILED if is_failure(result) else DONE)
+    return result
@@ -0,0 +1,294 @@
+"""
+This module contains the cache of the git state of the local repositories: \
+    current branch, HEAD SHA, upstream, ahead/behind counts and dirty state.
+
+The state of a repository is read again only when the modification time of \
+    .git/HEAD, .git/index, .git/packed-refs or of a folder of .git/refs has \
+    changed, so querying hundreds of up to date repositories spawns no git \
+    process. The cache is kept in memory and saved in STATE_CACHE_FILE \
+    between two runs of the application.
+
+Editing a file does not touch .git, so the dirty state of a repository is \
+    the one of its last refresh or git command; refresh(force=True) reads \
+    every repository again. The bulk operations therefore do not trust it: \
+    commit_push still runs git status in every repository. They only read \
+    the current branch from .git/HEAD, which is always exact, to skip the \
+    checkouts of the repositories already on their branch.
+"""
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+
+from app.logger import logger
+from app.process_runner import as_completed_results, run_command_async
+
+script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+STATE_CACHE_FILE = os.path.join(script_path, "app", "repo_state.json")
+
+REPOSITORIES_FOLDER = os.path.join(script_path, "remote_repositories")
+
+# Number of repositories read at the same time by a refresh
+REFRESH_CONCURRENCY = 16
+
+
+@dataclass
+class RepositoryState:
+    """
+    This class holds the git state of a local repository.
+
+    :param branch: The current branch, None if HEAD is detached
+
+    :param head: The SHA of HEAD, None if the repository has no commit
+
+    :param upstream: The upstream of the current branch, e.g. "origin/dev"
+
+    :param ahead: The number of commits not pushed to the upstream
+
+    :param behind: The number of commits of the upstream not merged
+
+    :param dirty: True if the working copy had changes at the last refresh
+
+    :param signature: The modification times the state was read at
+    """
+
+    branch: str = None
+    head: str = None
+    upstream: str = None
+    ahead: int = 0
+    behind: int = 0
+    dirty: bool = False
+    signature: list = field(default_factory=list)
+
+    def describe(self):
+        """
+        :return: A short description for the GUI, e.g. "dev* +1 -2"
+        """
+        text = self.branch or (self.head or "")[:8] or "?"
+        if self.dirty:
+            text += "*"
+        if self.ahead:
+            text += f" +{self.ahead}"
+        if self.behind:
+            text += f" -{self.behind}"
+        return text
+
+
+def get_signature(directory):
+    """
+    This function returns the modification times of the files that git \
+        updates whenever the branch, HEAD, the index or a ref changes.
+
+    :param directory: The path of the working copy
+
+    :return: A list of modification times in nanoseconds, \
+        None if the directory is not a git repository
+    """
+    git_dir = os.path.join(directory, ".git")
+    if not os.path.isdir(git_dir):
+        return None
+    signature = []
+    for name in ("HEAD", "index", "packed-refs"):
+        try:
+            signature.append(os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+        except OSError:
+            signature.append(0)
+    # A ref is written to a lock file renamed over it, which changes the
+    # modification time of its folder
+    for root, folders, _ in os.walk(os.path.join(git_dir, "refs")):
+        folders.sort()
+        signature.append(os.stat(root).st_mtime_ns)
+    return signature
+
+
+def read_head(directory):
+    """
+    This function reads the current branch of a working copy from .git/HEAD, \
+        without spawning git.
+
+    :param directory: The path of the working copy
+
+    :return: A tuple (branch, sha), the branch being None if HEAD is detached \
+        and the sha None if HEAD points to a branch
+    """
+    with open(os.path.join(directory, ".git", "HEAD"), "r") as head_file:
+        head = head_file.read().strip()
+    if head.startswith("ref: refs/heads/"):
+        return head[len("ref: refs/heads/") :], None
+    return None, head
+
+
+def read_current_branch(directory):
+    """
+    This function returns the current branch of a working copy without \
+        spawning git, for the bulk operations.
+
+    :param directory: The path of the working copy
+
+    :return: The name of the branch, None if HEAD is detached or cannot be read
+    """
+    try:
+        branch, _ = read_head(directory)
+    except OSError:
+        # e.g. a .git file pointing to the git directory of a worktree
+        return None
+    return branch
+
+
+async def read_state_async(directory):
+    """
+    This function reads the git state of a working copy.
+
+    :param directory: The path of the working copy
+
+    :return: The RepositoryState of the working copy
+    """
+    branch, head = read_head(directory)
+    state = RepositoryState(branch=branch, head=head)
+
+    if branch is not None:
+        refs = await run_command_async(
+            [
+                "git",
+                "for-each-ref",
+                "--format=%(objectname) %(upstream:short) "
+                "%(upstream:track,nobracket)",
+                f"refs/heads/{branch}",
+            ],
+            cwd=directory,
+        )
+        if refs.ok and refs.output:
+            # e.g. "<sha> origin/dev ahead 1, behind 2"
+            head, upstream, *track = refs.output[-1].split(" ", 2) + [""]
+            state.head = head
+            state.upstream = upstream or None
+            for part in track[0].split(","):
+                counter, _, count = part.strip().partition(" ")
+                if counter in ("ahead", "behind") and count.isdigit():
+                    setattr(state, counter, int(count))
+
+    status = await run_command_async(["git", "status", "--porcelain"], cwd=directory)
+    state.dirty = status.ok and bool(status.output)
+    # Taken last, git status refreshes the index
+    state.signature = get_signature(directory)
+    return state
+
+
+class RepositoryStateCache:
+    """
+    This class caches the git state of the local repositories and refreshes \
+        only the ones whose .git changed.
+
+    :param cache_file: The JSON file the cache is saved to
+
+    :param root_directory: The folder of the working copies
+    """
+
+    def __init__(self, cache_file=STATE_CACHE_FILE, root_directory=REPOSITORIES_FOLDER):
+        self.cache_file = cache_file
+        self.root_directory = root_directory
+        self._states = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        """
+        This method reads the cache saved by a previous run, once.
+
+        :param: None
+
+        :returns: None
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.cache_file, "r") as cache_file:
+                states = json.load(cache_file)
+            self._states = {
+                repo: RepositoryState(**state) for repo, state in states.items()
+            }
+        except (FileNotFoundError, json.JSONDecodeError, TypeError):
+            self._states = {}
+
+    def save(self):
+        """
+        This method saves the cache to its JSON file.
+
+        :param: None
+
+        :returns: None
+        """
+        with self._lock:
+            states = {repo: asdict(state) for repo, state in self._states.items()}
+            with open(self.cache_file, "w") as cache_file:
+                json.dump(states, cache_file, indent=4)
+
+    def get(self, repo_name):
+        """
+        This method returns the cached state of a repository, without \
+            checking if it is up to date.
+
+        :param repo_name: The name of the repository
+
+        :return: The RepositoryState, None if the repository was never read
+        """
+        with self._lock:
+            self._load()
+            return self._states.get(repo_name)
+
+    def refresh(self, repo_names, force=False):
+        """
+        This method brings the state of the repositories up to date, reading \
+            concurrently only the ones whose .git changed since their last read.
+
+        :param repo_names: The names of the repositories
+
+        :param force: True to read all the repositories again. Default is False
+
+        :return: A dict mapping the name of each git repository to its \
+            RepositoryState
+        """
+        if not isinstance(force, bool):
+            raise TypeError("Invalid type for force")
+        states = {}
+        stale = {}
+        with self._lock:
+            self._load()
+            for repo_name in repo_names:
+                directory = os.path.join(self.root_directory, repo_name)
+                signature = get_signature(directory)
+                if signature is None:
+                    self._states.pop(repo_name, None)
+                    continue
+                state = self._states.get(repo_name)
+                if force or state is None or state.signature != signature:
+                    stale[repo_name] = directory
+                else:
+                    states[repo_name] = state
+
+        if not stale:
+            return states
+        nb_unchanged = len(states)
+        for repo_name, state, error in as_completed_results(
+            {
+                repo_name: read_state_async(directory)
+                for repo_name, directory in stale.items()
+            },
+            limit=REFRESH_CONCURRENCY,
+        ):
+            if error is not None:
+                logger(f"Failed to read the state of {repo_name}: {error}", "warn")
+                continue
+            states[repo_name] = state
+            with self._lock:
+                self._states[repo_name] = state
+        logger(
+            f"Read the state of {len(stale)} repositories, " f"{nb_unchanged} unchanged"
+        )
+        self.save()
+        return states
+
+
+repository_states = RepositoryStateCache()
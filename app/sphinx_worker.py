@@ -0,0 +1,279 @@
+"""
+This module contains the worker process running Sphinx for the application.
+
+Sphinx changes the working directory to read conf.py, and autodoc imports \
+    the documented modules, running their module level code. Neither may \
+    happen in the GUI process, whose threads keep running git commands in \
+    the meantime, so sphinx-apidoc and the serial builds run in a process \
+    of their own. The worker is spawned, never forked since the GUI has \
+    threads, when the documentation popup is opened: Sphinx is imported \
+    once and reused by the next builds. Cancelling a task terminates the \
+    worker, the next task spawns a new one.
+"""
+import collections
+import importlib
+import multiprocessing
+import os
+import re
+import sys
+import threading
+
+from app.cancellation import OperationCancelled
+from app.process_runner import OUTPUT_TAIL_LINES, TERMINATE_TIMEOUT
+
+# Imported once by the worker, the next builds reuse them
+SPHINX_MODULES = (
+    "sphinx.application",
+    "sphinx.builders.html",
+    "sphinx.ext.apidoc",
+    "sphinx.ext.autodoc",
+    "sphinx.ext.autosummary",
+    "sphinx.ext.viewcode",
+)
+
+# Colours and line erasing of the Sphinx messages
+ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+# Number of seconds between two checks of the cancellation during a task
+POLL_INTERVAL = 0.1
+
+
+class SphinxOutput:
+    """
+    This class is the status and warning stream of the Sphinx application: \
+        it splits the messages in lines, keeps the last ones and gives them \
+        to on_line, as sphinx-build printed them.
+
+    :param on_line: A function called with each output line. Default is None
+    """
+
+    def __init__(self, on_line=None):
+        self.on_line = on_line
+        self.tail = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+        self._buffer = ""
+
+    def write(self, data):
+        """
+        :param data: A message of Sphinx, possibly part of a line
+
+        :return: None
+        """
+        # A progress line ends with \r when Sphinx thinks it is in a terminal
+        *lines, self._buffer = re.split(
+            r"[\r\n]", self._buffer + ANSI_ESCAPE_PATTERN.sub("", data)
+        )
+        for line in lines:
+            if line.strip():
+                self.tail.append(line)
+                if self.on_line is not None:
+                    self.on_line(line)
+
+    def flush(self):
+        """
+        :param: None
+
+        :return: None
+        """
+
+    @property
+    def output_tail(self):
+        """
+        :return: The last lines printed by Sphinx
+        """
+        return "\n".join(self.tail)
+
+
+def run_apidoc(apidoc_folder_path, modules_folder_path, output):
+    """
+    This function writes the .rst files of the modules, as sphinx-apidoc. \
+        It runs in the worker.
+
+    :param apidoc_folder_path: The folder where the files are written
+
+    :param modules_folder_path: The folder of the modules to document
+
+    :param output: The SphinxOutput of the task
+
+    :return: A (success, output tail) tuple
+    """
+    from sphinx.ext.apidoc import main as apidoc_main
+
+    status = apidoc_main(
+        ["-f", "-e", "-d", "1", "-o", apidoc_folder_path, modules_folder_path]
+    )
+    return status == 0, output.output_tail
+
+
+def run_build(docs_folder_path, output):
+    """
+    This function builds the HTML documentation serially, as sphinx-build. \
+        It runs in the worker.
+
+    :param docs_folder_path: The docs folder, holding source and build
+
+    :param output: The SphinxOutput of the task
+
+    :return: A (success, output tail) tuple
+    """
+    from sphinx.application import Sphinx
+    from sphinx.pycode import ModuleAnalyzer
+
+    source_folder_path = os.path.join(docs_folder_path, "source")
+    build_folder_path = os.path.join(docs_folder_path, "build")
+    # The modules of the previous build are imported again by autodoc,
+    # so it documents the ones just copied
+    for module_name in list(sys.modules):
+        if module_name.split(".")[0] == "local_modules":
+            del sys.modules[module_name]
+    ModuleAnalyzer.cache.clear()
+    # conf.py inserts the project folder at each build
+    sys_path = list(sys.path)
+    try:
+        app = Sphinx(
+            source_folder_path,
+            source_folder_path,
+            build_folder_path,
+            os.path.join(build_folder_path, ".doctrees"),
+            "html",
+            status=output,
+            warning=output,
+        )
+        app.build()
+    finally:
+        sys.path[:] = sys_path
+    return app.statuscode == 0, output.output_tail
+
+
+TASKS = {"apidoc": run_apidoc, "build": run_build}
+
+
+def serve(connection):
+    """
+    This function is the main loop of the worker: it runs the tasks sent \
+        by the application and sends back their output lines and result.
+
+    :param connection: The end of the pipe shared with the application
+
+    :return: None
+    """
+    for module_name in SPHINX_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            # Reported by the first task needing it
+            pass
+    while True:
+        try:
+            task, args = connection.recv()
+        except EOFError:
+            return
+        output = SphinxOutput(lambda line: connection.send(("line", line)))
+        try:
+            result = TASKS[task](*args, output=output)
+        except Exception as e:
+            result = False, f"{type(e).__name__}: {e}\n{output.output_tail}"
+        connection.send(("done", result))
+
+
+class SphinxWorker:
+    """
+    This class owns the worker process and runs the Sphinx tasks in it, \
+        one at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process = None
+        self._connection = None
+
+    def start(self):
+        """
+        This method spawns the worker if it is not running, e.g. while the \
+            user fills the popup, so the first task does not wait for the \
+            imports of Sphinx.
+
+        :param: None
+
+        :return: None
+        """
+        with self._lock:
+            self._start()
+
+    def stop(self):
+        """
+        This method terminates the worker, the next task spawns a new one.
+
+        :param: None
+
+        :return: None
+        """
+        with self._lock:
+            self._stop()
+
+    def run(self, task, args, cancel_token=None, on_line=None):
+        """
+        This method runs a task in the worker and waits for its result.
+
+        :param task: The name of the task, "apidoc" or "build"
+
+        :param args: The arguments of the task
+
+        :param cancel_token: The CancellationToken terminating the worker. \
+            Default is None
+
+        :param on_line: A function called with each output line of Sphinx, \
+            in the calling thread. Default is None
+
+        :return: A (success, output tail) tuple
+        """
+        if task not in TASKS:
+            raise ValueError(f"Unknown Sphinx task {task}")
+        with self._lock:
+            self._start()
+            self._connection.send((task, args))
+            while True:
+                if cancel_token is not None and cancel_token.cancelled:
+                    self._stop()
+                    raise OperationCancelled()
+                try:
+                    if not self._connection.poll(POLL_INTERVAL):
+                        continue
+                    kind, value = self._connection.recv()
+                except (EOFError, OSError):
+                    # e.g. a documented module ending the process
+                    self._process.join(TERMINATE_TIMEOUT)
+                    exitcode = self._process.exitcode
+                    self._stop()
+                    return False, f"The Sphinx worker exited with code {exitcode}"
+                if kind == "done":
+                    return value
+                if on_line is not None:
+                    on_line(value)
+
+    def _start(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self._stop()
+        context = multiprocessing.get_context("spawn")
+        self._connection, worker_connection = context.Pipe()
+        self._process = context.Process(
+            target=serve, args=(worker_connection,), name="sphinx-worker", daemon=True
+        )
+        self._process.start()
+        # Only the worker holds its end, so its exit closes the pipe
+        worker_connection.close()
+
+    def _stop(self):
+        if self._process is None:
+            return
+        self._process.terminate()
+        self._process.join(TERMINATE_TIMEOUT)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._connection.close()
+        self._process = None
+        self._connection = None
+
+
+sphinx_worker = SphinxWorker()
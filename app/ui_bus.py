@@ -0,0 +1,146 @@
+"""
+This module contains the bridge between the worker threads and the Tk \
+    main loop.
+
+Tk widgets must only be touched by the thread running the main loop. The \
+    worker threads post their updates to the UiBus instead, which the main \
+    loop applies at a fixed frame rate. The updates of a widget posted during \
+    a frame are coalesced: a progress bar set a thousand times between two \
+    frames is redrawn once, with the last value.
+"""
+import threading
+import tkinter as tk
+
+# Number of milliseconds between two frames, about 30 frames per second
+FRAME_INTERVAL_MS = 33
+
+
+class UiBus:
+    """
+    This class queues the widget updates of the worker threads and applies \
+        them from the Tk main loop.
+
+    :param root: The main window, whose main loop applies the updates
+
+    :param interval_ms: The number of milliseconds between two frames
+    """
+
+    def __init__(self, root, interval_ms=FRAME_INTERVAL_MS):
+        if not isinstance(interval_ms, int) or interval_ms < 1:
+            raise ValueError("interval_ms must be a positive integer")
+        self.root = root
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        # (widget, method) -> keyword arguments, the last one wins
+        self._updates = {}
+        # Calls applied in order, after the updates
+        self._calls = []
+        self.root.after(self.interval_ms, self._drain)
+
+    def set(self, widget, value):
+        """
+        This method posts a set(value), e.g. of a progress bar.
+
+        :param widget: The widget to update
+
+        :param value: The value to set
+
+        :return: None
+        """
+        with self._lock:
+            self._updates[(widget, "set")] = value
+
+    def configure(self, widget, **options):
+        """
+        This method posts a configure(**options) of a widget.
+
+        :param widget: The widget to update
+
+        :param options: The options to configure
+
+        :return: None
+        """
+        with self._lock:
+            self._updates.setdefault((widget, "configure"), {}).update(options)
+
+    def call(self, function, *args, **kwargs):
+        """
+        This method posts a call to run in the main loop, e.g. pack, \
+            geometry, destroy or a message box. The calls are not coalesced \
+            and run in the order they were posted.
+
+        :param function: The function to call
+
+        :return: None
+        """
+        with self._lock:
+            self._calls.append((function, args, kwargs))
+
+    def proxy(self, widget):
+        """
+        This method wraps a widget for the worker threads.
+
+        :param widget: The widget to wrap
+
+        :return: A WidgetProxy posting the set and configure of the widget
+        """
+        return WidgetProxy(self, widget)
+
+    def _drain(self):
+        """
+        This method applies the updates posted since the last frame.
+
+        :param: None
+
+        :returns: None
+        """
+        with self._lock:
+            updates, self._updates = self._updates, {}
+            calls, self._calls = self._calls, []
+        # Scheduled first, a message box opened by a call runs its own loop
+        self.root.after(self.interval_ms, self._drain)
+        for (widget, method), value in updates.items():
+            try:
+                if method == "set":
+                    widget.set(value)
+                else:
+                    widget.configure(**value)
+            except tk.TclError:
+                # The widget has been destroyed in the meantime
+                pass
+        for function, args, kwargs in calls:
+            try:
+                function(*args, **kwargs)
+            except tk.TclError:
+                pass
+
+
+class WidgetProxy:
+    """
+    This class gives the worker threads a widget whose set and configure \
+        are posted to a UiBus.
+
+    :param bus: The UiBus applying the updates
+
+    :param widget: The widget to update
+    """
+
+    def __init__(self, bus, widget):
+        self.bus = bus
+        self.widget = widget
+
+    def set(self, value):
+        """
+        :param value: The value to set
+
+        :return: None
+        """
+        self.bus.set(self.widget, value)
+
+    def configure(self, **options):
+        """
+        :param options: The options to configure
+
+        :return: None
+        """
+        self.bus.configure(self.widget, **options)
@@ -1,10 +1,13 @@
 import json
 import os
 import threading
+import tkinter as tk
 
 import customtkinter as ctk
+from app.cancellation import CancellationToken, OperationCancelled
+from app.clone_strategy import get_url
 from app.logger import logger
-from app.utils import clone_repository_git, get_json_data
+from app.utils import clone_repositories, get_json_data, read_repository_urls
 
 script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..\..")
 
@@ -16,67 +19,156 @@ class AddRepository(ctk.CTkToplevel):
         self.root = root
         self.after(100, self.lift)
         self.title("Add Repository")
-        self.geometry("600x130")
+        self.geometry("600x260")
         self.protocol("WM_DELETE_WINDOW", self.close_popup)
 
-        ctk.CTkLabel(self, text="Enter Repository URL:").pack(pady=5)
-        self.repo_entry = ctk.CTkEntry(self, width=550, height=30)
+        ctk.CTkLabel(self, text="Enter Repository URLs (one per line):").pack(pady=5)
+        self.repo_entry = ctk.CTkTextbox(self, width=550, height=120)
         self.repo_entry.pack(pady=5)
 
+        self.labled_add = ctk.CTkLabel(self, text="Cloning repositories")
+        self.progress_bar_add = ctk.CTkProgressBar(self, width=550)
+
+        self.cancel_token = CancellationToken()
+        self.button_cancel = ctk.CTkButton(
+            self, text="Cancel", command=self.cancel_operation
+        )
+
+        self.buttons_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.buttons_frame.pack(pady=5)
+
+        self.button_load = ctk.CTkButton(
+            self.buttons_frame, text="Load from file", command=self.load_urls
+        )
+        self.button_load.grid(row=0, column=0, padx=5)
+
         thread_perform_add = threading.Thread(target=self.perform_add)
         self.button_add = ctk.CTkButton(
-            self, text="Add", command=lambda: thread_perform_add.start()
+            self.buttons_frame, text="Add", command=lambda: thread_perform_add.start()
         )
-        self.button_add.pack(pady=5)
+        self.button_add.grid(row=0, column=1, padx=5)
 
     def close_popup(self):
+        self.cancel_token.cancel()
         self.root.deiconify()
         self.destroy()
         logger("Add repository Destroyed")
 
-    def perform_add(self) -> None:
+    def cancel_operation(self) -> None:
         """
-        This method is used to add a repository to the application
+        This method is used to stop the clones, the running git commands \
+            are terminated
 
         :param: None
 
         :returns: None
         """
-        if repo_url := self.repo_entry.get():
-            self.button_add.configure(state="disabled")
-            self.repo_entry.configure(state="disabled")
-            # Extract the repository name from the URL
-            repo_name = repo_url.split("/")[-1]
-
-            # Check if repo_name contains ".git" and remove it
-            if ".git" in repo_name:
-                repo_name = repo_name.replace(".git", "")
+        logger("Cancelling the clones", "warn")
+        self.button_cancel.configure(state="disabled")
+        self.cancel_token.cancel()
 
-            # Ensure 'remote_repositories' folder exists
-            os.makedirs("remote_repositories", exist_ok=True)
+    def load_urls(self) -> None:
+        """
+        This method is used to load a list of repository URLs from a text file
 
-            # Clone the repository into the 'remote_repositories' folder
-            clone_folder = os.path.join(script_path, "remote_repositories")
-            os.chdir(clone_folder)
+        :param: None
 
-            try:
-                clone_repository_git(repo_url, clone_folder)
-            except Exception as e:
-                logger(f"{e} local repo already exists {repo_name}", "warn")
+        :returns: None
+        """
+        filepath = tk.filedialog.askopenfilename(
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not filepath:
+            return
+        with open(filepath, "r", encoding="utf-8") as urls_file:
+            self.repo_entry.insert("end", f"\n{urls_file.read()}")
+        logger(f"Loaded repository URLs from {filepath}")
 
-            os.chdir(script_path)
-            # Add repository data to JSON file
+    def register_repositories(self, added_repositories) -> None:
+        """
+        This method adds the cloned repositories to repos.json, once for the \
+            whole batch
 
-            repos_data, f_repo_json = get_json_data()
+        :param added_repositories: A dict mapping the name of each cloned \
+            repository to its URL
 
+        :returns: None
+        """
+        repos_data, f_repo_json = get_json_data()
+        for repo_name, repo_url in added_repositories.items():
+            # Keep the entries holding a clone strategy for this URL
+            if get_url(repos_data.get(repo_name)) != repo_url:
+                repos_data[repo_name] = repo_url
+        with open(f_repo_json, "w") as json_file:
+            json.dump(repos_data, json_file, indent=4)
+        for repo_name in added_repositories:
             logger(f"The repo {repo_name} have been added!")
-            repos_data[repo_name] = repo_url
-            with open(f_repo_json, "w") as json_file:
-                json.dump(repos_data, json_file, indent=4)
 
-            self.close_popup()
-            self.root.show_alert("Repository added successfully!")
+    def perform_add(self) -> None:
+        """
+        This method is used to add one or several repositories to the application
+
+        :param: None
+
+        :returns: None
+        """
+        # This method runs in a worker thread, the widgets are updated
+        # through the bus of the main window
+        bus = self.root.ui_bus
+        if repo_urls := read_repository_urls(self.repo_entry.get("1.0", "end")):
+            bus.configure(self.button_add, state="disabled")
+            bus.configure(self.button_load, state="disabled")
+            bus.configure(self.repo_entry, state="disabled")
+
+            bus.call(self.geometry, "600x360")
+            bus.call(self.labled_add.pack, pady=5)
+            bus.call(self.progress_bar_add.pack, pady=5)
+            bus.call(self.button_cancel.pack, pady=5)
+
+            # Clone all the repositories into the 'remote_repositories' folder
+            clone_folder = os.path.join(script_path, "remote_repositories")
+            try:
+                with self.root.prefetcher.interactive():
+                    added_repositories = clone_repositories(
+                        repo_urls,
+                        clone_folder,
+                        bus.proxy(self.progress_bar_add),
+                        cancel_token=self.cancel_token,
+                    )
+            except OperationCancelled as cancelled:
+                # The repositories cloned before the cancellation are kept
+                self.register_repositories(cancelled.partial_result or {})
+                logger("The clones have been cancelled", "warn")
+                bus.call(self.close_popup)
+                bus.call(self.root.show_alert, "Operation cancelled!")
+                return
+            except Exception as e:
+                # e.g. an invalid clone strategy in repos.json
+                logger("Failed to add the repositories!", "error")
+                logger(e, "error")
+                bus.call(self.close_popup)
+                bus.call(
+                    self.root.show_alert,
+                    "Failed to add the repositories, check the log!",
+                )
+                return
+
+            self.register_repositories(added_repositories)
+
+            bus.configure(self.progress_bar_add, progress_color="green")
+            bus.call(self.close_popup)
+            if len(added_repositories) == len(repo_urls):
+                bus.call(
+                    self.root.show_alert,
+                    f"{len(added_repositories)} repositories added successfully!",
+                )
+            else:
+                bus.call(
+                    self.root.show_alert,
+                    f"{len(added_repositories)}/{len(repo_urls)} repositories "
+                    "added, check the log for the failed ones!",
+                )
         else:
-            self.close_popup()
-            self.root.show_alert("Please add a non empty repository URL!")
-            return
\ No newline at end of file
+            bus.call(self.close_popup)
+            bus.call(self.root.show_alert, "Please add a non empty repository URL!")
+            return
@@ -2,8 +2,17 @@ import os
 import threading
 
 import customtkinter as ctk
+from app.branch_matrix import branch_matrix
+from app.cancellation import CancellationToken, OperationCancelled
 from app.logger import logger
-from app.utils import commit_push, get_json_data
+from app.utils import (
+    COMMITTED,
+    FAILED,
+    PUSHED,
+    SKIPPED,
+    commit_push,
+    get_json_data,
+)
 
 script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..\..")
 
@@ -32,6 +41,11 @@ class CommitRepository(ctk.CTkToplevel):
         self.labled_add_commit = ctk.CTkLabel(self, text="Commit all branches")
         self.progress_bar_add_commit = ctk.CTkProgressBar(self, width=250)
 
+        self.cancel_token = CancellationToken()
+        self.cancel_button = ctk.CTkButton(
+            self, width=100, height=25, text="Cancel", command=self.cancel_operation
+        )
+
         thread_commit_to_all_repo = threading.Thread(target=self.commit_to_all_repo)
         self.add_button = ctk.CTkButton(
             self,
@@ -42,10 +56,24 @@ class CommitRepository(ctk.CTkToplevel):
         self.add_button.pack(pady=5)
 
     def close_popup(self):
+        self.cancel_token.cancel()
         self.root.deiconify()
         self.destroy()
         logger("Commit manager Destroyed")
 
+    def cancel_operation(self) -> None:
+        """
+        This method is used to stop the commits and pushes, the running git \
+            commands are terminated
+
+        :param: None
+
+        :returns: None
+        """
+        logger("Cancelling the commits", "warn")
+        self.cancel_button.configure(state="disabled")
+        self.cancel_token.cancel()
+
     def commit_to_all_repo(self) -> None:
         """
         This method is used to create a new branch in all local repositories
@@ -54,21 +82,25 @@ class CommitRepository(ctk.CTkToplevel):
 
         :returns: None
         """
+        # This method runs in a worker thread, the widgets are updated
+        # through the bus of the main window
+        bus = self.root.ui_bus
         commit_message_name = self.commit_message.get()
         branch_for_commit_name = self.branch_for_commit.get()
         if not commit_message_name:
-            self.root.show_alert("Please enter a commit message!")
-            self.close_popup()
+            bus.call(self.root.show_alert, "Please enter a commit message!")
+            bus.call(self.close_popup)
             return
         if not branch_for_commit_name:
-            self.root.show_alert("Please enter a branch name!")
-            self.close_popup()
+            bus.call(self.root.show_alert, "Please enter a branch name!")
+            bus.call(self.close_popup)
             return
         if commit_message_name == branch_for_commit_name:
-            self.root.show_alert(
-                "Please enter a different commit message and branch name!"
+            bus.call(
+                self.root.show_alert,
+                "Please enter a different commit message and branch name!",
             )
-            self.close_popup()
+            bus.call(self.close_popup)
             return
 
         logger(
@@ -77,39 +109,57 @@ class CommitRepository(ctk.CTkToplevel):
         )
         if branch_for_commit_name and commit_message_name:
 
-            self.geometry("300x270")
-            self.labled_add_commit.pack(pady=5)
-            self.progress_bar_add_commit.pack(pady=5)
-            self.progress_bar_add_commit.set(0)
+            bus.call(self.geometry, "300x310")
+            bus.call(self.labled_add_commit.pack, pady=5)
+            bus.call(self.progress_bar_add_commit.pack, pady=5)
+            bus.call(self.cancel_button.pack, pady=5)
+            bus.set(self.progress_bar_add_commit, 0)
 
             repos_data, _ = get_json_data()
 
             if repos_data:
-                self.add_button.configure(
-                    width=100, height=25,
-                    state="disabled",
-                )
-                self.commit_message.configure(state="disabled")
-                self.branch_for_commit.configure(state="disabled")
+                bus.configure(self.add_button, width=100, height=25, state="disabled")
+                bus.configure(self.commit_message, state="disabled")
+                bus.configure(self.branch_for_commit, state="disabled")
 
                 all_repositories = repos_data.keys()
+                existing = branch_matrix.repositories_with(
+                    branch_for_commit_name, all_repositories
+                )
+                for repo in sorted(set(all_repositories) - set(existing)):
+                    logger(f"{repo} has no branch {branch_for_commit_name}", "warn")
 
+                results = {}
                 try:
-                    commit_push(
-                        all_repositories,
-                        branch_for_commit_name,
-                        commit_message_name,
-                        self.progress_bar_add_commit,
-                    )
+                    with self.root.prefetcher.interactive():
+                        results = commit_push(
+                            all_repositories,
+                            branch_for_commit_name,
+                            commit_message_name,
+                            bus.proxy(self.progress_bar_add_commit),
+                            cancel_token=self.cancel_token,
+                        )
                     logger(
                         f"All repositories have been updated with the new branch "
                         f"{branch_for_commit_name}! with the commit message "
                         f"{commit_message_name}"
                     )
+                except OperationCancelled:
+                    logger("The commits have been cancelled", "warn")
+                    bus.call(self.close_popup)
+                    bus.call(self.root.show_alert, "Operation cancelled!")
+                    return
                 except Exception as e:
                     logger("Failed to commit to all repositories!", "error")
                     logger(e, "critical")
 
-                self.progress_bar_add_commit.configure(progress_color="green")
-                self.close_popup()
-                self.root.show_alert("A new commit has been created in all repositories!")
+                bus.configure(self.progress_bar_add_commit, progress_color="green")
+                bus.call(self.close_popup)
+                statuses = list(results.values())
+                bus.call(
+                    self.root.show_alert,
+                    f"{statuses.count(COMMITTED)} repositories committed, "
+                    f"{statuses.count(PUSHED)} only pushed, "
+                    f"{statuses.count(SKIPPED)} clean (skipped), "
+                    f"{statuses.count(FAILED)} failed",
+                )
@@ -2,8 +2,17 @@ import os
 import threading
 
 import customtkinter as ctk
+from app.branch_matrix import branch_matrix
+from app.cancellation import CancellationToken, OperationCancelled
 from app.logger import logger
-from app.utils import create_branch_if_not_exist, get_json_data
+from app.utils import (
+    CREATED,
+    EXISTING,
+    FAILED,
+    create_branch_if_not_exist,
+    create_branch_without_checkout,
+    get_json_data,
+)
 
 script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..\..")
 
@@ -15,7 +24,7 @@ class AddBranchToAllRepositories(ctk.CTkToplevel):
         self.root = root
         self.after(100, self.lift)
         self.title("Branch creator")
-        self.geometry("300x220")
+        self.geometry("300x290")
         self.protocol("WM_DELETE_WINDOW", self.close_popup)
 
         ctk.CTkLabel(self, text="Enter The base branch (from):").pack(pady=5)
@@ -28,6 +37,28 @@ class AddBranchToAllRepositories(ctk.CTkToplevel):
         self.new_branch = ctk.CTkEntry(self, width=250, height=30)
         self.new_branch.pack(pady=5)
 
+        self.no_checkout = ctk.CTkCheckBox(
+            self, text="Create without checkout", command=self.toggle_no_checkout
+        )
+        self.no_checkout.pack(pady=5)
+
+        # Only used without checkout, a checkout always switches to the branch
+        self.switch_branch = ctk.CTkCheckBox(
+            self, text="Switch to the new branch", state="disabled"
+        )
+        self.switch_branch.pack(pady=5)
+
+        self.labled_add_progress = ctk.CTkLabel(self, text="Adding branch to all repos")
+        self.progress_bar_adding_to_all = ctk.CTkProgressBar(
+            self,
+            width=250,
+        )
+
+        self.cancel_token = CancellationToken()
+        self.cancel_button = ctk.CTkButton(
+            self, width=100, height=25, text="Cancel", command=self.cancel_operation
+        )
+
         self.thread_add_repo = threading.Thread(target=self.add_to_all_repos)
         self.add_button = ctk.CTkButton(
             self,
@@ -47,9 +78,38 @@ class AddBranchToAllRepositories(ctk.CTkToplevel):
 
         :returns: None
         """
+        self.cancel_token.cancel()
         self.destroy()
         self.root.deiconify()
 
+    def toggle_no_checkout(self) -> None:
+        """
+        This method is used to enable the switch to the new branch only \
+            when the branch is created without checkout
+
+        :param: None
+
+        :returns: None
+        """
+        if self.no_checkout.get():
+            self.switch_branch.configure(state="normal")
+        else:
+            self.switch_branch.deselect()
+            self.switch_branch.configure(state="disabled")
+
+    def cancel_operation(self) -> None:
+        """
+        This method is used to stop the creation of the branch, between two \
+            repositories, the running git commands are terminated
+
+        :param: None
+
+        :returns: None
+        """
+        logger("Cancelling the creation of the branch", "warn")
+        self.cancel_button.configure(state="disabled")
+        self.cancel_token.cancel()
+
     def add_to_all_repos(self) -> None:
         """
         This method is used to create a new branch in all local repositories
@@ -58,19 +118,25 @@ class AddBranchToAllRepositories(ctk.CTkToplevel):
 
         :returns: None
         """
+        # This method runs in a worker thread, the widgets are updated
+        # through the bus of the main window
+        bus = self.root.ui_bus
         from_branch_name = self.from_branch.get()
         new_branch_name = self.new_branch.get()
         if not from_branch_name:
-            self.close_popup()
-            self.root.show_alert("Please enter a name of a base branch!")
+            bus.call(self.close_popup)
+            bus.call(self.root.show_alert, "Please enter a name of a base branch!")
             return
         if not new_branch_name:
-            self.close_popup()
-            self.root.show_alert("Please enter a name of a new branch!")
+            bus.call(self.close_popup)
+            bus.call(self.root.show_alert, "Please enter a name of a new branch!")
             return
         if new_branch_name == from_branch_name:
-            self.close_popup()
-            self.root.show_alert("Please enter a different name for the new branch!")
+            bus.call(self.close_popup)
+            bus.call(
+                self.root.show_alert,
+                "Please enter a different name for the new branch!",
+            )
             return
         logger(
             f"Create branch {new_branch_name} in all local repositories \
@@ -79,39 +145,64 @@ class AddBranchToAllRepositories(ctk.CTkToplevel):
         repos_data, _ = get_json_data()
 
         if repos_data:
-            self.add_button.configure(
-                width=100, height=25,
-                state="disabled"
-            )
-            self.from_branch.configure(state="disabled")
-            self.new_branch.configure(state="disabled")
+            bus.configure(self.add_button, width=100, height=25, state="disabled")
+            bus.configure(self.from_branch, state="disabled")
+            bus.configure(self.new_branch, state="disabled")
+            bus.configure(self.no_checkout, state="disabled")
+            bus.configure(self.switch_branch, state="disabled")
 
             all_repositories = list(repos_data.keys())
             root_directory = os.path.join(script_path, "remote_repositories")
-
-            # Create a progress bar
-            self.geometry("300x270")
-            self.labled_add_progress = ctk.CTkLabel(self, text="Adding branch to all repos")
-            self.progress_bar_adding_to_all = ctk.CTkProgressBar(
-                self,
-                width=250,
+            existing = branch_matrix.repositories_with(
+                new_branch_name, all_repositories
             )
-            self.labled_add_progress.pack(pady=5)
-            self.progress_bar_adding_to_all.pack(pady=5)
-            self.progress_bar_adding_to_all.set(0)
+            logger(
+                f"{len(existing)}/{len(all_repositories)} repositories already "
+                f"have the branch {new_branch_name}"
+            )
+
+            # Show the progress bar
+            bus.call(self.geometry, "300x380")
+            bus.call(self.labled_add_progress.pack, pady=5)
+            bus.call(self.progress_bar_adding_to_all.pack, pady=5)
+            bus.call(self.cancel_button.pack, pady=5)
+            bus.set(self.progress_bar_adding_to_all, 0)
+            progress_bar = bus.proxy(self.progress_bar_adding_to_all)
 
+            results = None
             try:
-                create_branch_if_not_exist(
-                    root_directory,
-                    all_repositories,
-                    new_branch_name,
-                    from_branch_name,  # Base branch example "dev"
-                    self.progress_bar_adding_to_all,
-                )
+                with self.root.prefetcher.interactive():
+                    if self.no_checkout.get():
+                        results = create_branch_without_checkout(
+                            root_directory,
+                            all_repositories,
+                            new_branch_name,
+                            from_branch_name,  # Base branch example "dev"
+                            progress_bar,
+                            switch=bool(self.switch_branch.get()),
+                            # The new branch is pushed, its base is always
+                            # fetched instead of trusting the prefetch
+                            max_age=0,
+                            cancel_token=self.cancel_token,
+                        )
+                    else:
+                        create_branch_if_not_exist(
+                            root_directory,
+                            all_repositories,
+                            new_branch_name,
+                            from_branch_name,  # Base branch example "dev"
+                            progress_bar,
+                            cancel_token=self.cancel_token,
+                        )
                 logger(
                     f"All repositories have been updated with \
                         the new branch {new_branch_name}!"
                 )
+            except OperationCancelled:
+                logger(f"The creation of {new_branch_name} has been cancelled", "warn")
+                bus.call(self.close_popup)
+                bus.call(self.root.show_alert, "Operation cancelled!")
+                return
             except Exception as e:
                 logger(
                     f"Failed to create new branch {new_branch_name} \
@@ -120,6 +211,18 @@ class AddBranchToAllRepositories(ctk.CTkToplevel):
                 )
                 logger(e, "critical")
 
-            self.progress_bar_adding_to_all.configure(progress_color="green")
-            self.close_popup()
-            self.root.show_alert("A new branch has been created in all repositories!")
+            bus.configure(self.progress_bar_adding_to_all, progress_color="green")
+            bus.call(self.close_popup)
+            if results is None:
+                bus.call(
+                    self.root.show_alert,
+                    "A new branch has been created in all repositories!",
+                )
+            else:
+                statuses = list(results.values())
+                bus.call(
+                    self.root.show_alert,
+                    f"{statuses.count(CREATED)} branches created and pushed, "
+                    f"{statuses.count(EXISTING)} already existing, "
+                    f"{statuses.count(FAILED)} failed",
+                )
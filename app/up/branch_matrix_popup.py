@@ -0,0 +1,117 @@
+import os
+import threading
+
+import customtkinter as ctk
+from app.branch_matrix import BOTH, LOCAL, REMOTE, branch_matrix
+from app.logger import logger
+from app.utils import get_json_data
+
+script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..\..")
+
+
+class BranchMatrixPopup(ctk.CTkToplevel):
+    def __init__(self, root):
+        super().__init__(master=root)
+        logger("Branch matrix")
+        self.root = root
+        self.after(100, self.lift)
+        self.title("Branch matrix")
+        self.geometry("500x420")
+        self.protocol("WM_DELETE_WINDOW", self.close_popup)
+
+        ctk.CTkLabel(self, text="Enter a branch name (empty for all branches):").pack(
+            pady=5
+        )
+
+        self.branch_entry = ctk.CTkEntry(self, width=250, height=30)
+        self.branch_entry.pack(pady=5)
+
+        self.search_button = ctk.CTkButton(
+            self,
+            text="Search",
+            command=self.start_matrix,
+        )
+        self.search_button.pack(pady=5)
+
+        self.matrix_text = ctk.CTkTextbox(self, width=470, height=280)
+        self.matrix_text.pack(pady=5)
+
+    def close_popup(self):
+        """
+        This method is used to close the pop-up dialog
+
+        :param: None
+
+        :returns: None
+        """
+        self.root.deiconify()
+        self.destroy()
+
+    def start_matrix(self) -> None:
+        """
+        This method is used to read the branch in the main loop, then to \
+            compute the matrix in a worker thread
+
+        :param: None
+
+        :returns: None
+        """
+        branch = self.branch_entry.get().strip()
+        self.search_button.configure(state="disabled")
+        threading.Thread(target=self.show_matrix, args=(branch,)).start()
+
+    def show_matrix(self, branch) -> None:
+        """
+        This method is used to show which repositories have a branch, \
+            or how many repositories have each branch
+
+        :param branch: The branch to look for, empty for all branches
+
+        :returns: None
+        """
+        # This method runs in a worker thread, the widgets are updated
+        # through the bus of the main window
+        repos_data, _ = get_json_data()
+        all_repositories = list(repos_data.keys())
+
+        matrix = branch_matrix.matrix(all_repositories)
+        if branch:
+            repositories = matrix.get(branch, {})
+            lines = [f"{branch}: {len(repositories)}/{len(all_repositories)}"]
+            for title, where in (
+                ("Local and remote", BOTH),
+                ("Local only", LOCAL),
+                ("Remote only", REMOTE),
+            ):
+                repos = sorted(
+                    repo for repo in repositories if repositories[repo] == where
+                )
+                lines.append(f"\n{title} ({len(repos)}):")
+                lines.extend(f"  {repo}" for repo in repos)
+            missing = sorted(
+                repo for repo in all_repositories if repo not in repositories
+            )
+            lines.append(f"\nMissing ({len(missing)}):")
+            lines.extend(f"  {repo}" for repo in missing)
+        else:
+            lines = [
+                f"{branch_name}: {len(repositories)}/{len(all_repositories)} "
+                f"repositories"
+                for branch_name, repositories in matrix.items()
+            ]
+
+        self.root.ui_bus.call(self.update_matrix_text, "\n".join(lines))
+
+    def update_matrix_text(self, text) -> None:
+        """
+        This method is used to replace the matrix shown, in the main loop
+
+        :param text: The text of the matrix
+
+        :returns: None
+        """
+        self.matrix_text.configure(state="normal")
+        self.matrix_text.delete("1.0", "end")
+        self.matrix_text.insert("end", text)
+        self.matrix_text.configure(state="disabled")
+        self.search_button.configure(state="normal")
@@ -0,0 +1,159 @@
+import os
+import queue
+import time
+from tkinter import ttk
+
+import customtkinter as ctk
+from app import repo_events
+from app.logger import logger
+from app.utils import get_json_data
+
+script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..\..")
+
+# Number of milliseconds between two redraws of the dashboard
+REFRESH_INTERVAL_MS = 200
+
+# Maximum number of events handled by a redraw, the rest waits for the next one
+MAX_EVENTS_PER_REFRESH = 5000
+
+# Maximum number of characters shown of the last output line
+MAX_LINE_LENGTH = 120
+
+
+class Dashboard(ctk.CTkToplevel):
+    def __init__(self, root):
+        super().__init__(master=root)
+        logger("Dashboard")
+        self.root = root
+        self.after(100, self.lift)
+        self.title("Dashboard")
+        self.geometry("900x500")
+        self.protocol("WM_DELETE_WINDOW", self.close_popup)
+
+        # Subscribe before listing the repositories, so no event is missed
+        self.events = repo_events.subscribe()
+        # Repository -> [status, start, end, last line]
+        self.repositories = {}
+
+        self.summary = ctk.CTkLabel(self, text="")
+        self.summary.pack(pady=5)
+
+        frame = ctk.CTkFrame(self)
+        frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.table = ttk.Treeview(
+            frame,
+            columns=("status", "elapsed", "output"),
+            show="tree headings",
+        )
+        self.table.heading("#0", text="Repository")
+        self.table.heading("status", text="Status")
+        self.table.heading("elapsed", text="Elapsed")
+        self.table.heading("output", text="Last output")
+        self.table.column("#0", width=180, stretch=False)
+        self.table.column("status", width=80, stretch=False)
+        self.table.column("elapsed", width=70, stretch=False, anchor="e")
+        self.table.column("output", width=520)
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.table.yview)
+        self.table.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.table.pack(side="left", fill="both", expand=True)
+        self.table.tag_configure(repo_events.DONE, foreground="green")
+        self.table.tag_configure(repo_events.FAILED, foreground="red")
+        self.table.tag_configure(repo_events.CANCELLED, foreground="orange")
+
+        repos_data, _ = get_json_data()
+        for repo_name in repos_data:
+            self.add_repository(repo_name)
+        self.update_summary()
+        self.refresh_job = self.after(REFRESH_INTERVAL_MS, self.refresh)
+
+    def close_popup(self):
+        """
+        This method is used to close the dashboard, the main window \
+            stays as it is
+
+        :param: None
+
+        :returns: None
+        """
+        repo_events.unsubscribe(self.events)
+        self.after_cancel(self.refresh_job)
+        self.destroy()
+
+    def add_repository(self, repo_name):
+        """
+        This method is used to add the row of a repository
+
+        :param repo_name: The name of the repository
+
+        :returns: None
+        """
+        self.repositories[repo_name] = ["", None, None, ""]
+        self.table.insert("", "end", iid=repo_name, text=repo_name)
+
+    def refresh(self) -> None:
+        """
+        This method is used to apply the events received since the last \
+            refresh, redrawing only the rows that changed
+
+        :param: None
+
+        :returns: None
+        """
+        changed = set()
+        for _ in range(MAX_EVENTS_PER_REFRESH):
+            try:
+                repo_name, status, line, timestamp = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if repo_name not in self.repositories:
+                self.add_repository(repo_name)
+            repository = self.repositories[repo_name]
+            if status is not None:
+                repository[0] = status
+                if status == repo_events.QUEUED:
+                    repository[1:] = [None, None, ""]
+                elif status == repo_events.RUNNING:
+                    repository[1] = timestamp
+                else:
+                    repository[2] = timestamp
+            if line is not None:
+                repository[3] = line.strip()[:MAX_LINE_LENGTH]
+            changed.add(repo_name)
+
+        # The elapsed time of the running repositories changes at each refresh
+        now = time.monotonic()
+        for repo_name, (status, start, end, line) in self.repositories.items():
+            if repo_name in changed or status == repo_events.RUNNING:
+                elapsed = f"{(end or now) - start:.1f}s" if start is not None else ""
+                self.table.item(
+                    repo_name,
+                    values=(status, elapsed, line),
+                    tags=(status,),
+                )
+        if changed:
+            self.update_summary()
+        self.refresh_job = self.after(REFRESH_INTERVAL_MS, self.refresh)
+
+    def update_summary(self):
+        """
+        This method is used to show the number of repositories per status
+
+        :param: None
+
+        :returns: None
+        """
+        statuses = [repository[0] for repository in self.repositories.values()]
+        self.summary.configure(
+            text=", ".join(
+                f"{statuses.count(status)} {status}"
+                for status in (
+                    repo_events.QUEUED,
+                    repo_events.RUNNING,
+                    repo_events.DONE,
+                    repo_events.FAILED,
+                    repo_events.CANCELLED,
+                )
+            )
+            + f" / {len(statuses)} repositories"
+        )
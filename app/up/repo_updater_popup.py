@@ -2,8 +2,15 @@ import os
 import threading
 
 import customtkinter as ctk
+from app.cancellation import CancellationToken, OperationCancelled
 from app.logger import logger
-from app.utils import get_json_data, update_all_local_repositories
+from app.utils import (
+    FAILED,
+    UNCHANGED,
+    UPDATED,
+    get_json_data,
+    update_all_local_repositories,
+)
 
 script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..\..")
 
@@ -15,7 +22,7 @@ class UpdateRepositories(ctk.CTkToplevel):
         self.root = root
         self.after(100, self.lift)
         self.title("Update repositories")
-        self.geometry("300x150")
+        self.geometry("300x190")
         self.protocol("WM_DELETE_WINDOW", self.close_popup)
 
         # Create and pack widgets in the pop-up dialog
@@ -24,9 +31,17 @@ class UpdateRepositories(ctk.CTkToplevel):
         self.branch_entry = ctk.CTkEntry(self, width=250, height=30)
         self.branch_entry.pack(pady=5)
 
+        self.no_checkout = ctk.CTkCheckBox(self, text="Fast-forward without checkout")
+        self.no_checkout.pack(pady=5)
+
         self.labled_update = ctk.CTkLabel(self, text="Updating all repositories")
         self.progress_bar_update = ctk.CTkProgressBar(self, width=250)
 
+        self.cancel_token = CancellationToken()
+        self.cancel_button = ctk.CTkButton(
+            self, text="Cancel", command=self.cancel_operation
+        )
+
         thread_perform_update = threading.Thread(target=self.perform_update)
         self.add_button = ctk.CTkButton(
             self,
@@ -43,9 +58,23 @@ class UpdateRepositories(ctk.CTkToplevel):
 
         :returns: None
         """
+        self.cancel_token.cancel()
         self.root.deiconify()
         self.destroy()
 
+    def cancel_operation(self) -> None:
+        """
+        This method is used to stop the update, the running git commands \
+            are terminated
+
+        :param: None
+
+        :returns: None
+        """
+        logger("Cancelling the update", "warn")
+        self.cancel_button.configure(state="disabled")
+        self.cancel_token.cancel()
+
     def perform_update(self) -> None:
         """
         This method is used to update all local repositories
@@ -54,39 +83,62 @@ class UpdateRepositories(ctk.CTkToplevel):
 
         :returns: None
         """
+        # This method runs in a worker thread, the widgets are updated
+        # through the bus of the main window
+        bus = self.root.ui_bus
         if repo_branch := self.branch_entry.get():
             logger(f"Update all local repositories to {repo_branch}")
             repos_data, _ = get_json_data()
 
             if repos_data:
-                self.add_button.configure(state="disabled")
-                self.branch_entry.configure(state="disabled")
+                bus.configure(self.add_button, state="disabled")
+                bus.configure(self.branch_entry, state="disabled")
+                bus.configure(self.no_checkout, state="disabled")
 
                 all_repositories = list(repos_data.keys())
                 root_directory = os.path.join(script_path, "remote_repositories")
 
                 # Create a progress bar
-                self.geometry("300x200")
-                self.labled_update.pack(pady=5)
-                self.progress_bar_update.pack(pady=5)
-                self.progress_bar_update.set(0)
+                bus.call(self.geometry, "300x280")
+                bus.call(self.labled_update.pack, pady=5)
+                bus.call(self.progress_bar_update.pack, pady=5)
+                bus.call(self.cancel_button.pack, pady=5)
+                bus.set(self.progress_bar_update, 0)
 
+                results = {}
                 try:
-                    update_all_local_repositories(
-                        root_directory,
-                        all_repositories,
-                        repo_branch,
-                        self.progress_bar_update,
-                    )
+                    with self.root.prefetcher.interactive():
+                        results = update_all_local_repositories(
+                            root_directory,
+                            all_repositories,
+                            repo_branch,
+                            bus.proxy(self.progress_bar_update),
+                            max_age=self.root.prefetcher.max_age(),
+                            skip_unchanged=True,
+                            checkout=not self.no_checkout.get(),
+                            cancel_token=self.cancel_token,
+                        )
                     logger("All repositories have been updated!")
+                except OperationCancelled:
+                    logger("The update has been cancelled", "warn")
+                    bus.call(self.close_popup)
+                    bus.call(self.root.show_alert, "Operation cancelled!")
+                    return
                 except Exception as e:
                     logger("Failed to update all repositories!", "error")
                     logger(e, "critical")
 
-                self.progress_bar_update.configure(progress_color="green")
-                self.close_popup()
-                self.root.show_alert("All repositories have been updated!")
+                statuses = list(results.values())
+                bus.configure(self.progress_bar_update, progress_color="green")
+                bus.call(self.close_popup)
+                bus.call(
+                    self.root.show_alert,
+                    f"All repositories have been updated!\n"
+                    f"{statuses.count(UPDATED)} fetched, "
+                    f"{statuses.count(UNCHANGED)} unchanged (skipped), "
+                    f"{statuses.count(FAILED)} failed",
+                )
         else:
-            self.close_popup()
-            self.root.show_alert("Please enter a name of a branch!")
+            bus.call(self.close_popup)
+            bus.call(self.root.show_alert, "Please enter a name of a branch!")
             return
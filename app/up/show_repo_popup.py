@@ -1,8 +1,10 @@
 import json
 import os
+import threading
 
 import customtkinter as ctk
 from app.logger import logger
+from app.repo_state import repository_states
 from app.utils import get_json_data, remove_directory_if_exists
 
 script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..\..")
@@ -33,6 +35,8 @@ class ShowActifRepositories(ctk.CTkToplevel):
         remove_directory_if_exists(
             os.path.join(script_path, "local_modules", repo_name)
         )
+        # The mirror of the repository is kept, so adding it again
+        # clones the working copy without any network
         remove_directory_if_exists(
             os.path.join(script_path, "remote_repositories", repo_name)
         )
@@ -65,19 +69,65 @@ class ShowActifRepositories(ctk.CTkToplevel):
         self.frame_repos.columnconfigure(1, weight=3)
         repos_data, f_repo_json = get_json_data()
 
+        self.repo_labels = {}
         if repos_data:
             for i, repo_name in enumerate(repos_data.keys()):
                 ctk.CTkButton(
                     self.frame_repos,
                     text="Remove",
-                    command=lambda: self.remove_selected(
+                    command=lambda repo_name=repo_name: self.remove_selected(
                         repo_name, repos_data, f_repo_json
                     ),
                     width=14,
                 ).grid(row=i, column=0, padx=20, sticky="e", pady=5)
-                ctk.CTkLabel(
-                    self.frame_repos, anchor="w", text=repo_name, wraplength=120
-                ).grid(row=i, column=1, padx=20, sticky="w", pady=5)
+                # The cached state is shown until the refresh is done
+                self.repo_labels[repo_name] = ctk.CTkLabel(
+                    self.frame_repos,
+                    anchor="w",
+                    text=self.describe_repository(
+                        repo_name, repository_states.get(repo_name)
+                    ),
+                    wraplength=120,
+                )
+                self.repo_labels[repo_name].grid(
+                    row=i, column=1, padx=20, sticky="w", pady=5
+                )
+            threading.Thread(
+                target=self.refresh_states, args=(dict(self.repo_labels),), daemon=True
+            ).start()
+
+    @staticmethod
+    def describe_repository(repo_name, repo_state):
+        """
+        This method is used to build the text of a repository
+
+        :param repo_name: The name of the repository
+
+        :param repo_state: The RepositoryState of the repository, or None
+
+        :returns: The text of the label
+        """
+        if repo_state is None:
+            return repo_name
+        return f"{repo_name} ({repo_state.describe()})"
+
+    def refresh_states(self, repo_labels) -> None:
+        """
+        This method is used to read the state of the repositories in a \
+            worker thread, the labels are updated through the UI bus
+
+        :param repo_labels: The dict mapping each repository to its label
+
+        :returns: None
+        """
+        # Only the repositories whose .git changed are read again
+        repos_state = repository_states.refresh(list(repo_labels))
+        bus = self.root.ui_bus
+        for repo_name, label in repo_labels.items():
+            bus.configure(
+                label,
+                text=self.describe_repository(repo_name, repos_state.get(repo_name)),
+            )
 
     def close_popup(self):
         """
@@ -1,14 +1,15 @@
 import os
 import platform
-import shutil
 import threading
 
 import customtkinter as ctk
+from app.cancellation import CancellationToken, OperationCancelled
 from app.generate_documentation import (create_zip_file_sphinx_build,
                                         launch_sphinx_api,
-                                        preparing_files_and_folders_sphinx)
+                                        preparing_files_and_folders_sphinx,
+                                        warm_up_sphinx)
 from app.logger import logger
-from app.utils import count_files, get_json_data, thread_with_trace
+from app.utils import get_json_data
 
 script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..\..")
 
@@ -20,8 +21,10 @@ class SphinxCreatorPopup(ctk.CTkToplevel):
         self.root = root
         self.after(100, self.lift)
         self.title("Create sphinx documentation")
-        self.geometry("300x220")
+        self.geometry("300x360")
         self.protocol("WM_DELETE_WINDOW", self.close_popup)
+        # Sphinx is imported while the user fills the popup, once per process
+        threading.Thread(target=warm_up_sphinx, daemon=True).start()
 
         # Create and pack widgets in the pop-up dialog
         ctk.CTkLabel(self, text="Enter the MIP Version").pack(pady=5)
@@ -33,21 +36,62 @@ class SphinxCreatorPopup(ctk.CTkToplevel):
         self.zip_file_password = ctk.CTkEntry(self, width=250, height=30)
         self.zip_file_password.pack(pady=5)
 
-        thread_sphinx_doc = threading.Thread(target=self.create_sphinx_doc)
+        ctk.CTkLabel(self, text="Branch or tag (empty for the working copies)").pack(
+            pady=5
+        )
+        self.git_ref = ctk.CTkEntry(self, width=250, height=30)
+        self.git_ref.pack(pady=5)
+
+        self.force_rebuild = ctk.CTkCheckBox(self, text="Force full rebuild")
+        self.force_rebuild.pack(pady=5)
+
+        self.sharded_build = ctk.CTkCheckBox(self, text="Build each repository apart")
+        self.sharded_build.pack(pady=5)
+
+        self.thread_sphinx_doc = threading.Thread(target=self.create_sphinx_doc)
         self.add_button = ctk.CTkButton(
             self,
             text="Create documentation",
-            command=lambda: thread_sphinx_doc.start(),
+            command=self.start_sphinx_doc,
         )
         self.add_button.pack(pady=5)
-        
-        
+
+        self.cancel_token = CancellationToken()
+        self.cancel_button = ctk.CTkButton(
+            self, text="Cancel", command=self.cancel_operation
+        )
 
     def close_popup(self):
+        self.cancel_token.cancel()
         self.root.deiconify()
         self.destroy()
         logger("Add repository Destroyed")
 
+    def cancel_operation(self) -> None:
+        """
+        This method is used to stop the documentation, between two steps \
+            or two documents of the Sphinx build
+
+        :param: None
+
+        :returns: None
+        """
+        logger("Cancelling the documentation", "warn")
+        self.cancel_button.configure(state="disabled")
+        self.cancel_token.cancel()
+
+    def start_sphinx_doc(self) -> None:
+        """
+        This method is used to create the progress bars in the main loop, \
+            then the documentation in a worker thread
+
+        :param: None
+
+        :returns: None
+        """
+        self.create_progress_bar()
+        self.thread_sphinx_doc.start()
+
     def create_progress_bar(self) -> None:
         """
         THis method is used to create the progress bar
@@ -56,7 +100,7 @@ class SphinxCreatorPopup(ctk.CTkToplevel):
 
         :returns: None
         """
-        self.geometry("300x330")
+        self.geometry("300x510")
         self.progress_frame = ctk.CTkFrame(self, width=250)
         self.progress_frame.pack(pady=10)
         self.progress_frame.pack_propagate(False)
@@ -80,6 +124,7 @@ class SphinxCreatorPopup(ctk.CTkToplevel):
         self.label_progress_bar_zip.grid(row=2, column=0, padx=5, pady=5)
         self.zip_progress_bar.set(0)
         self.zip_progress_bar.grid(row=2, column=1, padx=5, pady=5)
+        self.cancel_button.pack(pady=5)
 
     def create_sphinx_doc(self) -> None:
         """
@@ -89,66 +134,74 @@ class SphinxCreatorPopup(ctk.CTkToplevel):
 
         :returns: None
         """
-        self.create_progress_bar()
-        self.model_progress_bar.set(0.05)
+        # This method runs in a worker thread, the widgets are updated
+        # through the bus of the main window
+        bus = self.root.ui_bus
+        model_progress_bar = bus.proxy(self.model_progress_bar)
+        model_progress_bar.set(0.05)
         mip_version_name = self.mip_version.get()
-        self.model_progress_bar.set(0.1)
+        model_progress_bar.set(0.1)
         zip_file_password_name = self.zip_file_password.get()
-        self.model_progress_bar.set(0.15)
+        git_ref_name = self.git_ref.get().strip()
+        model_progress_bar.set(0.15)
         if not mip_version_name:
-            self.root.show_alert("Please enter a name of a MIP version!")
-            self.close_popup()
+            bus.call(self.root.show_alert, "Please enter a name of a MIP version!")
+            bus.call(self.close_popup)
             return
         if not zip_file_password_name:
-            self.root.show_alert("Please enter a name of a Zip file password!")
-            self.close_popup()
+            bus.call(
+                self.root.show_alert, "Please enter a name of a Zip file password!"
+            )
+            bus.call(self.close_popup)
             return
         if mip_version_name == zip_file_password_name:
-            self.root.show_alert(
+            bus.call(
+                self.root.show_alert,
                 "Please enter a different name for the MIP version "
-                "and Zip file password!"
+                "and Zip file password!",
             )
-            self.close_popup()
+            bus.call(self.close_popup)
             return
         logger(f"Create processing create sphinx documentation with {mip_version_name}")
 
         repos_data, _ = get_json_data()
-        self.model_progress_bar.set(0.2)
+        model_progress_bar.set(0.2)
 
         if repos_data:
-            self.add_button.configure(state="disabled")
-            self.mip_version.configure(state="disabled")
-            self.zip_file_password.configure(state="disabled")
+            bus.configure(self.add_button, state="disabled")
+            bus.configure(self.mip_version, state="disabled")
+            bus.configure(self.zip_file_password, state="disabled")
+            bus.configure(self.git_ref, state="disabled")
+            bus.configure(self.force_rebuild, state="disabled")
+            bus.configure(self.sharded_build, state="disabled")
 
             all_repositories = repos_data.keys()
 
             try:
-                path_local_modules = os.path.join(script_path, "local_modules")
-                if os.path.exists(path_local_modules):
-                    shutil.rmtree(path_local_modules)
-                os.mkdir(path_local_modules)
-
                 preparing_files_and_folders_sphinx(
-                    all_repositories, self.model_progress_bar
+                    all_repositories,
+                    model_progress_bar,
+                    self.cancel_token,
+                    force=bool(self.force_rebuild.get()),
+                    ref=git_ref_name or None,
                 )
-                self.model_progress_bar.set(2)
-                self.model_progress_bar.configure(progress_color="green")
-
-                update_progress_bar_sphinx = thread_with_trace(
-                    target=self.update_sphinx_progress_bar
+                model_progress_bar.set(2)
+                model_progress_bar.configure(progress_color="green")
+
+                launch_sphinx_api(
+                    mip_version_name,
+                    self.cancel_token,
+                    bus.proxy(self.sphinx_progress_bar),
+                    sharded=bool(self.sharded_build.get()),
                 )
-                update_progress_bar_sphinx.start()
-
-                launch_sphinx_api(mip_version_name)
-                update_progress_bar_sphinx.kill()
-                self.sphinx_progress_bar.set(0.99)
-                self.sphinx_progress_bar.configure(progress_color="green")
-                self.sphinx_progress_bar.set(1.0)
+                bus.configure(self.sphinx_progress_bar, progress_color="green")
+                bus.set(self.sphinx_progress_bar, 1.0)
+                zip_progress_bar = bus.proxy(self.zip_progress_bar)
                 file_zip, folder_path = create_zip_file_sphinx_build(
-                    zip_file_password_name, self.zip_progress_bar
+                    zip_file_password_name, zip_progress_bar, self.cancel_token
                 )
-                self.zip_progress_bar.set(1)
-                self.zip_progress_bar.configure(progress_color="green")
+                zip_progress_bar.set(1)
+                zip_progress_bar.configure(progress_color="green")
                 logger(f"The zip file has been created successfully! {file_zip}")
 
                 # Get the current system's platform
@@ -166,37 +219,16 @@ class SphinxCreatorPopup(ctk.CTkToplevel):
                         f"the {current_platform} platform."
                     )
 
+            except OperationCancelled:
+                logger("The documentation has been cancelled", "warn")
+                bus.call(self.close_popup)
+                bus.call(self.root.show_alert, "Operation cancelled!")
+                return
             except Exception as e:
                 logger("Failed to create the Zip file!", "error")
                 logger(e, "critical")
 
-            self.close_popup()
-            self.root.show_alert("The zip file has been created successfully!")
-
-    def update_sphinx_progress_bar(self):
-        """
-        This method is used to update the progress bar
-
-        :param: None
-
-        :returns: None
-        """
-        nb_files = count_files(os.path.join(script_path, "local_modules"), ".py") * 3
-        docs_folder_path = os.path.join(script_path, "docs")
-        rst_count = 0
-        html_count = 0
-        doctree_files = 0
-        while (doctree_files + html_count + rst_count) < nb_files:
-            # Count .rst files in docs/source
-            rst_count = count_files(os.path.join(docs_folder_path, "source"), ".rst")
-
-            # Count .html files in docs/build
-            html_count = count_files(os.path.join(docs_folder_path, "build"), ".html")
-
-            doctree_files = count_files(
-                os.path.join(docs_folder_path, "build", "_doctrees"), ".doctree"
-            )
-            self.sphinx_progress_bar.set(
-                (html_count + rst_count + doctree_files + 9) / nb_files
+            bus.call(self.close_popup)
+            bus.call(
+                self.root.show_alert, "The zip file has been created successfully!"
             )
-        self.sphinx_progress_bar.set(2)
@@ -1,24 +1,92 @@
 """
 This module contains utility functions used by the main script.
 """
+import asyncio
+import copy
+import functools
+import hashlib
 import json
+import math
 import os
 import re
 import shutil
 import stat
-import subprocess
-import sys
-import threading
+import tarfile
+import tempfile
+import time
 import tkinter as tk
 from pathlib import Path
 
 from dotenv import load_dotenv, set_key
 
+from app.clone_strategy import (
+    clone_command,
+    describe_clone_options,
+    directory_size,
+    get_clone_options,
+    get_url,
+    record_clone_stats,
+)
+from app.build_cache import docs_settings_hash
+from app.cancellation import OperationCancelled
 from app.logger import logger
+from app.mirror_cache import (
+    MIRROR_MAX_AGE,
+    MIRRORS_FOLDER,
+    attaches_mirror,
+    get_mirror_age,
+    get_mirror_dir,
+    get_mirror_path,
+    get_mirror_source,
+    is_mirror_url,
+    uses_mirror,
+)
+from app.network_scheduler import network_scheduler
+from app.process_runner import (
+    as_completed_results,
+    run_command,
+    run_command_async,
+    runner,
+)
+from app.repo_state import read_current_branch
 
 script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
 print(script_path)
 
+# Number of repositories processed at the same time by the bulk operations.
+# Git network operations are mostly waiting on the server, so this can be
+# well above the number of CPU cores.
+DEFAULT_MAX_WORKERS = 8
+
+# Number of seconds after which a git command is considered hung and killed
+GIT_TIMEOUT = 600
+
+# One lock per mirror, so a mirror is never fetched twice at the same time
+_mirror_locks = {}
+
+# Last content of repos.json read by get_json_data
+_repos_data_cache = {}
+
+# Status of a repository after update_all_local_repositories
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+# Status of a repository after create_branch_without_checkout
+CREATED = "created"
+EXISTING = "existing"
+
+# Status of a repository after commit_push
+COMMITTED = "committed"
+PUSHED = "pushed"
+SKIPPED = "skipped"
+
+# Size of the chunks read when hashing a file
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Folders of the src folder of a repository that are not its package
+NOT_PACKAGE_FOLDERS = ["expectations", "test", ".ruff_cache", "__pycache__", "tests"]
+
 
 def print_centered_text(text):
     """
@@ -47,7 +115,14 @@ def print_centered_text(text):
     print(centered_text)
 
 
-def log_and_process(to_be_processed, log_type="info"):
+def log_and_process(
+    to_be_processed,
+    log_type="info",
+    cwd=None,
+    timeout=None,
+    cancel_token=None,
+    on_line=None,
+):
     """
     This function logs the command to be executed and then executes it.
 
@@ -55,42 +130,661 @@ def log_and_process(to_be_processed, log_type="info"):
 
     :param log_type: The type of log to be used. Default is 'info'
 
-    :return: None
+    :param cwd: The directory in which the command is executed. \
+        Default is the current working directory
+
+    :param timeout: The number of seconds after which the command is killed. \
+        Default is no timeout
+
+    :param cancel_token: The CancellationToken terminating the command. \
+        Default is None
+
+    :param on_line: A function called with each output line as soon as it \
+        is printed, e.g. to follow the progress of the command. Default is None
+
+    :return: The CommandResult of the command
     """
     if not isinstance(to_be_processed, list):
         raise TypeError("Invalid type for to_be_processed")
     if not isinstance(log_type, str):
         raise TypeError("Invalid type for log_type")
+    if cwd is not None and not isinstance(cwd, str):
+        raise TypeError("Invalid type for cwd")
     logger(" ".join(to_be_processed), log_type)
-    subprocess.run(to_be_processed, stdout=subprocess.DEVNULL)
+    result = run_command(
+        to_be_processed,
+        cwd=cwd,
+        timeout=timeout,
+        cancel_token=cancel_token,
+        on_line=on_line,
+    )
+    log_command_result(result)
+    return result
 
 
-def git_checkout_pull(directory, checkout_branch):
+async def log_and_process_async(
+    to_be_processed, log_type="info", cwd=None, timeout=None
+):
     """
-    This function performs a git checkout master and git pull in the specified directory
+    This function is the coroutine version of log_and_process, \
+        to be awaited from the command runner loop.
 
-    :param directory: The directory where the git checkout master and \
+    :param to_be_processed: The command to be executed
+
+    :param log_type: The type of log to be used. Default is 'info'
+
+    :param cwd: The directory in which the command is executed
+
+    :param timeout: The number of seconds after which the command is killed
+
+    :return: The CommandResult of the command
+    """
+    if not isinstance(to_be_processed, list):
+        raise TypeError("Invalid type for to_be_processed")
+    logger(" ".join(to_be_processed), log_type)
+    result = await run_command_async(to_be_processed, cwd=cwd, timeout=timeout)
+    log_command_result(result)
+    return result
+
+
+def log_command_result(result):
+    """
+    This function logs the failure of a command with the tail of its output.
+
+    :param result: The CommandResult to log
+
+    :return: None
+    """
+    if result.timed_out:
+        logger(
+            f"{' '.join(result.command)} timed out after {result.duration:.1f}s",
+            "error",
+        )
+    elif not result.ok:
+        logger(
+            f"{' '.join(result.command)} exited with code {result.returncode}"
+            f" in {result.cwd}:\n{result.output_tail}",
+            "warn",
+        )
+
+
+def get_repository_url(directory):
+    """
+    This function returns the URL stored in repos.json for a repository.
+
+    :param directory: The local path of the repository
+
+    :return: The URL of the repository, None if it is unknown
+    """
+    repos_data, _ = get_json_data()
+    return get_url(repos_data.get(os.path.basename(os.path.normpath(directory))))
+
+
+async def git_network_async(
+    command, directory, repo_url=None, log_type="info", low_priority=False
+):
+    """
+    This function runs a git network command (pull, push, clone, fetch) \
+        through the network scheduler, which limits the connections per \
+        host and retries the transient failures.
+
+    :param command: The git command to execute
+
+    :param directory: The directory in which the command is executed
+
+    :param repo_url: The URL of the remote repository. \
+        Default is the URL stored in repos.json for the directory
+
+    :param log_type: The type of log to be used. Default is 'info'
+
+    :param low_priority: True to run the command with the lowest priority. \
+        Default is False
+
+    :return: The CommandResult of the command
+    """
+    if not isinstance(command, list):
+        raise TypeError("Invalid type for command")
+    if not isinstance(directory, str):
+        raise TypeError("Invalid type for directory")
+    if repo_url is None:
+        repo_url = get_repository_url(directory)
+    logger(" ".join(command), log_type)
+    result = await network_scheduler.run(
+        command,
+        cwd=directory,
+        url=repo_url,
+        timeout=GIT_TIMEOUT,
+        low_priority=low_priority,
+    )
+    log_command_result(result)
+    return result
+
+
+def git_network(command, directory, repo_url=None, log_type="info", cancel_token=None):
+    """
+    This function runs a git network command through the network \
+        scheduler and waits for it.
+
+    :param command: The git command to execute
+
+    :param directory: The directory in which the command is executed
+
+    :param repo_url: The URL of the remote repository
+
+    :param log_type: The type of log to be used. Default is 'info'
+
+    :param cancel_token: The CancellationToken terminating the command. \
+        Default is None
+
+    :return: The CommandResult of the command
+    """
+    return runner.run(
+        git_network_async(command, directory, repo_url, log_type), cancel_token
+    )
+
+
+async def configure_mirror_async(mirror_path):
+    """
+    This function lets the partial clones of a mirror filter its objects: \
+        without uploadpack.allowFilter, git ignores --filter with a warning \
+        and makes a full clone.
+
+    :param mirror_path: The path of the mirror
+
+    :return: True if the mirror is configured
+    """
+    for option in ("uploadpack.allowFilter", "uploadpack.allowAnySHA1InWant"):
+        result = await run_command_async(
+            ["git", "config", option, "true"], cwd=mirror_path
+        )
+        if not result.ok:
+            logger(f"Could not set {option} in {mirror_path}", "warn")
+            return False
+    return True
+
+
+async def refresh_mirror_async(repo_name, repo_url, max_age=0, low_priority=False):
+    """
+    This function creates the bare mirror of a repository, or refreshes it \
+        with a single fetch if it is older than max_age.
+
+    :param repo_name: The name of the repository
+
+    :param repo_url: The URL of the repository on the server
+
+    :param max_age: The age in seconds under which the mirror is not fetched
+
+    :param low_priority: True to run the fetch with the lowest priority
+
+    :return: The CommandResult of the clone or fetch, \
+        None if the mirror was fresh enough
+    """
+    mirror_path = get_mirror_path(repo_name)
+    lock = _mirror_locks.setdefault(mirror_path, asyncio.Lock())
+    async with lock:
+        if not os.path.isdir(mirror_path):
+            os.makedirs(MIRRORS_FOLDER, exist_ok=True)
+            result = await git_network_async(
+                ["git", "clone", "--mirror", repo_url, mirror_path],
+                MIRRORS_FOLDER,
+                repo_url,
+                low_priority=low_priority,
+            )
+            if result.ok:
+                await configure_mirror_async(mirror_path)
+            return result
+        age = get_mirror_age(mirror_path)
+        if age is not None and age < max_age:
+            return None
+        # The mirrors created before their configuration was set get it now
+        await configure_mirror_async(mirror_path)
+        return await git_network_async(
+            ["git", "fetch", "--prune", "origin"],
+            mirror_path,
+            repo_url,
+            low_priority=low_priority,
+        )
+
+
+async def attach_mirror_async(directory, repo_name, repo_url):
+    """
+    This function makes an existing working copy fetch from its mirror, \
+        its pushes still going to the server.
+
+    :param directory: The path of the working copy
+
+    :param repo_name: The name of the repository
+
+    :param repo_url: The URL of the repository on the server
+
+    :return: True if the working copy now fetches from the mirror
+    """
+    result = await refresh_mirror_async(repo_name, repo_url)
+    if result is not None and not result.ok:
+        return False
+    mirror_path = get_mirror_path(repo_name)
+    logger(
+        f"{repo_name}: switching the origin remote of {directory} from "
+        f"{repo_url} to the mirror {mirror_path}, pushes still go to {repo_url}",
+        "warn",
+    )
+    for command in (
+        ["git", "remote", "set-url", "--push", "origin", repo_url],
+        ["git", "remote", "set-url", "origin", mirror_path],
+    ):
+        result = await log_and_process_async(command, cwd=directory)
+        if not result.ok:
+            return False
+    return True
+
+
+def get_fetch_age(directory):
+    """
+    This function returns the number of seconds since the last fetch of \
+        a working copy.
+
+    :param directory: The path of the working copy
+
+    :return: The age in seconds, None if the working copy was never fetched
+    """
+    try:
+        return time.time() - os.path.getmtime(
+            os.path.join(directory, ".git", "FETCH_HEAD")
+        )
+    except OSError:
+        return None
+
+
+async def get_fetch_source_async(directory):
+    """
+    This function finds where a working copy fetches from.
+
+    :param directory: The path of the working copy
+
+    :return: A tuple (repo_name, repo_entry, repo_url, fetch_url) where \
+        repo_entry and repo_url come from repos.json and fetch_url is the \
+        URL of the origin remote of the working copy
+    """
+    repo_name = os.path.basename(os.path.normpath(directory))
+    repos_data, _ = get_json_data()
+    repo_entry = repos_data.get(repo_name)
+    fetch_url = (
+        await run_command_async(
+            ["git", "config", "--get", "remote.origin.url"], cwd=directory
+        )
+    ).output_tail.strip()
+    return repo_name, repo_entry, get_url(repo_entry), fetch_url
+
+
+async def git_fetch_async(directory, low_priority=False):
+    """
+    This function fetches the remote of a working copy, which is its mirror \
+        for the repositories using the mirror cache.
+
+    :param directory: The path of the working copy
+
+    :param low_priority: True to run the fetch with the lowest priority
+
+    :return: The CommandResult of the fetch, None if there was nothing to fetch
+    """
+    repo_name, _, repo_url, fetch_url = await get_fetch_source_async(directory)
+    if is_mirror_url(fetch_url):
+        if not repo_url or is_mirror_url(repo_url):
+            return None
+        return await refresh_mirror_async(
+            repo_name, repo_url, low_priority=low_priority
+        )
+    return await git_network_async(
+        ["git", "fetch", "--prune", "origin"],
+        directory,
+        repo_url,
+        low_priority=low_priority,
+    )
+
+
+async def git_fetch_branch_async(directory, branch, max_age=0):
+    """
+    This function updates the remote-tracking branch origin/<branch> of \
+        a working copy, from its mirror for the repositories using the \
+        mirror cache.
+
+    :param directory: The path of the working copy
+
+    :param branch: The name of the branch to fetch
+
+    :param max_age: The age in seconds under which the last fetch is \
+        recent enough to skip the network. math.inf trusts the current \
+        remote-tracking branches. Default is 0, always fetch
+
+    :return: The CommandResult of the fetch, None if there was nothing to fetch
+    """
+    repo_name, _, repo_url, fetch_url = await get_fetch_source_async(directory)
+    refspec = f"+refs/heads/{branch}:refs/remotes/origin/{branch}"
+    if is_mirror_url(fetch_url):
+        if repo_url and not is_mirror_url(repo_url):
+            refresh = await refresh_mirror_async(repo_name, repo_url, max_age)
+            if refresh is not None and not refresh.ok:
+                return refresh
+        return await log_and_process_async(
+            ["git", "fetch", "origin", refspec], cwd=directory, timeout=GIT_TIMEOUT
+        )
+    fetch_age = get_fetch_age(directory)
+    if max_age == math.inf or (fetch_age is not None and fetch_age < max_age):
+        return None
+    return await git_network_async(
+        ["git", "fetch", "origin", refspec], directory, repo_url
+    )
+
+
+async def git_pull_async(directory, max_age=0):
+    """
+    This function performs a git pull in the specified directory.
+
+    A working copy fetching from the mirror cache gets its mirror refreshed \
+        first, unless it was fetched less than max_age seconds ago, then \
+        pulls from it without any network. A working copy still fetching \
+        from the server is attached to its mirror only if its entry in \
+        repos.json opts in with "attach_mirror". A working copy fetched \
+        less than max_age seconds ago is only fast-forwarded to its \
+        upstream branch.
+
+    :param directory: The directory where the git pull should be performed
+
+    :param max_age: The age in seconds under which the last fetch, \
+        for instance by the background prefetcher, is recent enough. \
+        math.inf trusts the current remote-tracking branches. \
+        Default is 0, always fetch
+
+    :return: The CommandResult of the git pull, \
+        or of the failed mirror refresh
+    """
+    repo_name, repo_entry, repo_url, fetch_url = await get_fetch_source_async(directory)
+
+    if not is_mirror_url(fetch_url):
+        if fetch_url == repo_url and attaches_mirror(repo_entry, repo_url):
+            if await attach_mirror_async(directory, repo_name, repo_url):
+                return await log_and_process_async(
+                    ["git", "pull"], cwd=directory, timeout=GIT_TIMEOUT
+                )
+            logger(f"Mirror of {repo_name} unavailable, pulling from the server")
+        fetch_age = get_fetch_age(directory)
+        if max_age == math.inf or (fetch_age is not None and fetch_age < max_age):
+            result = await log_and_process_async(
+                ["git", "merge", "--ff-only", "@{u}"], cwd=directory
+            )
+            if result.ok:
+                return result
+        return await git_network_async(["git", "pull"], directory, repo_url)
+
+    if repo_url and not is_mirror_url(repo_url):
+        result = await refresh_mirror_async(repo_name, repo_url, max_age)
+        if result is not None and not result.ok:
+            return result
+    return await log_and_process_async(
+        ["git", "pull"], cwd=directory, timeout=GIT_TIMEOUT
+    )
+
+
+def git_pull(directory, max_age=0, cancel_token=None):
+    """
+    This function performs a git pull in the specified directory and waits for it.
+
+    :param directory: The directory where the git pull should be performed
+
+    :param max_age: The age in seconds under which the last fetch is recent enough
+
+    :param cancel_token: The CancellationToken terminating the git pull. \
+        Default is None
+
+    :return: The CommandResult of the git pull
+    """
+    return runner.run(git_pull_async(directory, max_age), cancel_token)
+
+
+async def git_checkout_pull_async(directory, checkout_branch, max_age=0):
+    """
+    This function performs a git checkout and git pull in the specified \
+        directory, as a coroutine running on the command runner loop.
+
+    :param directory: The directory where the git checkout and \
         git pull should be performed
 
     :param checkout_branch: The branch to checkout
 
-    :return: None
+    :param max_age: The age in seconds under which the last fetch is \
+        recent enough to skip the network. Default is 0, always fetch
+
+    :return: True if both the checkout and the pull succeeded, False otherwise
     """
     if not isinstance(directory, str):
         raise TypeError("Invalid type for directory")
     if not isinstance(checkout_branch, str):
         raise TypeError("Invalid type for checkout_branch")
-    # Change the working directory to the directory we want to operate on
-    os.chdir(directory)
+    # The directory is given to each command instead of changing the working
+    # directory, so several repositories can be updated at the same time
 
-    # Run git checkout master
-    log_and_process(["git", "checkout", checkout_branch])
+    # Run git checkout master, unless the branch is already checked out
+    if read_current_branch(directory) != checkout_branch:
+        result = await log_and_process_async(
+            ["git", "checkout", checkout_branch], cwd=directory, timeout=GIT_TIMEOUT
+        )
+        if not result.ok:
+            return False
 
     # Run git pull
-    log_and_process(["git", "pull"])
+    result = await git_pull_async(directory, max_age)
+    return result.ok
+
+
+async def is_branch_unchanged_async(directory, branch, server_shas=None):
+    """
+    This function tells if a branch has no new commit on the server since \
+        the last fetch, comparing the SHA given by git ls-remote with the \
+        remote-tracking branch of the working copy, or with the branch of \
+        its mirror.
+
+    :param directory: The path of the working copy
+
+    :param branch: The name of the branch
+
+    :param server_shas: A dict shared by the repositories of a batch, \
+        mapping (URL, branch) to the task of its git ls-remote, so each \
+        remote is only asked once. Default is None
+
+    :return: True if the branch did not move on the server
+    """
+    _, _, repo_url, fetch_url = await get_fetch_source_async(directory)
+    if not repo_url or is_mirror_url(repo_url):
+        return False
+    if server_shas is None:
+        server_shas = {}
+    if (repo_url, branch) not in server_shas:
+        server_shas[repo_url, branch] = asyncio.ensure_future(
+            get_server_branch_sha_async(directory, branch, repo_url)
+        )
+    remote_sha = await server_shas[repo_url, branch]
+    if remote_sha is None:
+        return False
+
+    local = await get_remote_branch_sha_async(directory, branch, fetch_url)
+    return local == remote_sha
 
 
-def clone_repository_git(repo_url, clone_folder):
+async def get_server_branch_sha_async(directory, branch, repo_url):
+    """
+    This function asks the server the SHA of a branch with git ls-remote.
+
+    :param directory: The directory in which the command is executed
+
+    :param branch: The name of the branch
+
+    :param repo_url: The URL of the repository on the server
+
+    :return: The SHA of the branch, None if it is unknown
+    """
+    remote = await git_network_async(
+        ["git", "ls-remote", repo_url, f"refs/heads/{branch}"], directory, repo_url
+    )
+    if not remote.ok or not remote.output:
+        return None
+    return remote.output[-1].split()[0]
+
+
+async def get_remote_branch_sha_async(directory, branch, fetch_url):
+    """
+    This function returns the last fetched SHA of a remote branch: the \
+        branch of the mirror for a working copy fetching from the mirror \
+        cache, its remote-tracking branch otherwise. No network is used.
+
+    :param directory: The path of the working copy
+
+    :param branch: The name of the branch
+
+    :param fetch_url: The URL of the origin remote of the working copy
+
+    :return: The SHA of the branch, None if it is unknown
+    """
+    if is_mirror_url(fetch_url):
+        git_dir = ["--git-dir", get_mirror_dir(fetch_url)]
+        ref = f"refs/heads/{branch}"
+    else:
+        git_dir = []
+        ref = f"refs/remotes/origin/{branch}"
+    local = await run_command_async(
+        ["git", *git_dir, "rev-parse", "--verify", "--quiet", ref], cwd=directory
+    )
+    return local.output_tail.strip() if local.ok else None
+
+
+async def git_fast_forward_branch_async(directory, branch, max_age=0):
+    """
+    This function fetches a branch and fast-forwards its local ref without \
+        checking it out, so the working tree is not touched. A branch \
+        currently checked out is pulled instead.
+
+    :param directory: The path of the working copy
+
+    :param branch: The name of the branch
+
+    :param max_age: The age in seconds under which the last fetch is \
+        recent enough to skip the network. math.inf trusts the current \
+        remote-tracking branches. Default is 0, always fetch
+
+    :return: The CommandResult of the fetch, or of the git pull
+    """
+    if read_current_branch(directory) == branch:
+        return await git_pull_async(directory, max_age)
+
+    repo_name, _, repo_url, fetch_url = await get_fetch_source_async(directory)
+    existed = (
+        await run_command_async(
+            ["git", "show-ref", "--verify", "--quiet", f"refs/heads/{branch}"],
+            cwd=directory,
+        )
+    ).ok
+    # git fetch only updates a local branch if it is a fast-forward
+    refspec = f"refs/heads/{branch}:refs/heads/{branch}"
+    if is_mirror_url(fetch_url):
+        if repo_url and not is_mirror_url(repo_url):
+            refresh = await refresh_mirror_async(repo_name, repo_url, max_age)
+            if refresh is not None and not refresh.ok:
+                return refresh
+        result = await log_and_process_async(
+            ["git", "fetch", "origin", refspec], cwd=directory, timeout=GIT_TIMEOUT
+        )
+    else:
+        fetch_age = get_fetch_age(directory)
+        if max_age == math.inf or (fetch_age is not None and fetch_age < max_age):
+            local_refspec = f"refs/remotes/origin/{branch}:refs/heads/{branch}"
+            result = await log_and_process_async(
+                ["git", "fetch", ".", local_refspec], cwd=directory
+            )
+        else:
+            result = await git_network_async(
+                ["git", "fetch", "origin", refspec], directory, repo_url
+            )
+
+    if result.ok and not existed:
+        await log_and_process_async(
+            ["git", "branch", f"--set-upstream-to=origin/{branch}", branch],
+            cwd=directory,
+        )
+    return result
+
+
+async def git_update_branch_async(
+    directory,
+    checkout_branch,
+    max_age=0,
+    skip_unchanged=False,
+    checkout=True,
+    server_shas=None,
+):
+    """
+    This function brings a branch up to date, skipping the fetch if the \
+        branch did not move on the server.
+
+    :param directory: The path of the working copy
+
+    :param checkout_branch: The branch to update
+
+    :param max_age: The age in seconds under which the last fetch is \
+        recent enough to skip the network. Default is 0, always fetch
+
+    :param skip_unchanged: True to check the branch with git ls-remote first \
+        and skip the fetch when it did not move. Default is False
+
+    :param checkout: True to checkout the branch before pulling it, \
+        False to fast-forward its ref without touching the working tree. \
+        Default is True
+
+    :param server_shas: The dict of the git ls-remote tasks shared by the \
+        repositories of the batch (see is_branch_unchanged_async). \
+        Default is None
+
+    :return: UPDATED, UNCHANGED or FAILED
+    """
+    unchanged = skip_unchanged and await is_branch_unchanged_async(
+        directory, checkout_branch, server_shas
+    )
+    if unchanged:
+        # Nothing to download, the branch only has to catch up locally
+        # with its remote-tracking branch or with the mirror
+        max_age = math.inf
+    elif skip_unchanged:
+        # The branch moved, a recent fetch or mirror does not have it yet
+        max_age = 0
+
+    if checkout:
+        updated = await git_checkout_pull_async(directory, checkout_branch, max_age)
+    else:
+        updated = (
+            await git_fast_forward_branch_async(directory, checkout_branch, max_age)
+        ).ok
+
+    if not updated:
+        return FAILED
+    return UNCHANGED if unchanged else UPDATED
+
+
+def git_checkout_pull(directory, checkout_branch, max_age=0):
+    """
+    This function performs a git checkout master and git pull in the specified directory
+
+    :param directory: The directory where the git checkout master and \
+        git pull should be performed
+
+    :param checkout_branch: The branch to checkout
+
+    :param max_age: The age in seconds under which the last fetch is \
+        recent enough to skip the network. Default is 0, always fetch
+
+    :return: True if both the checkout and the pull succeeded, False otherwise
+    """
+    return runner.run(git_checkout_pull_async(directory, checkout_branch, max_age))
+
+
+def clone_repository_git(repo_url, clone_folder, clone_options=None, use_mirror=False):
     """
     This function clones a repository using git.
 
@@ -98,16 +792,228 @@ def clone_repository_git(repo_url, clone_folder):
 
     :param clone_folder: The folder where the repository should be cloned
 
-    :return: None
+    :param clone_options: The dict of clone options (see app.clone_strategy). \
+        Default is a full clone
+
+    :param use_mirror: True to clone from the local mirror of the repository. \
+        Default is False
+
+    :return: The CommandResult of git clone
+    """
+    return runner.run(
+        clone_repository_git_async(repo_url, clone_folder, clone_options, use_mirror)
+    )
+
+
+async def clone_repository_git_async(
+    repo_url, clone_folder, clone_options=None, use_mirror=False
+):
+    """
+    This function clones a repository using git, as a coroutine running \
+        on the command runner loop.
+
+    With use_mirror, the mirror of the repository is created or refreshed \
+        if it is older than MIRROR_MAX_AGE, then the working copy is cloned \
+        from it without any network. The working copy fetches from the \
+        mirror and pushes to the server.
+
+    :param repo_url: The URL of the repository to clone
+
+    :param clone_folder: The folder where the repository should be cloned
+
+    :param clone_options: The dict of clone options (see app.clone_strategy). \
+        Default is a full clone
+
+    :param use_mirror: True to clone from the local mirror of the repository. \
+        Default is False
+
+    :return: The CommandResult of git clone
     """
     if not isinstance(repo_url, str):
         raise TypeError("Invalid type for repo_url")
     if not isinstance(clone_folder, str):
         raise TypeError("Invalid type for clone_folder")
-    log_and_process(["git", "clone", repo_url])
+    clone_options = clone_options or {}
+    if not use_mirror:
+        return await git_network_async(
+            clone_command(repo_url, clone_options), clone_folder, repo_url
+        )
+
+    repo_name = repository_name_from_url(repo_url)
+    refresh = await refresh_mirror_async(repo_name, repo_url, MIRROR_MAX_AGE)
+    if refresh is not None and not refresh.ok:
+        logger(f"Mirror of {repo_name} unavailable, cloning from the server", "warn")
+        return await git_network_async(
+            clone_command(repo_url, clone_options), clone_folder, repo_url
+        )
+
+    # The mirror already shares its objects, a reference is useless
+    clone_options = {
+        option: value
+        for option, value in clone_options.items()
+        if option != "reference"
+    }
+    mirror_path = get_mirror_path(repo_name)
+    result = await log_and_process_async(
+        clone_command(get_mirror_source(mirror_path, clone_options), clone_options)
+        + [repo_name],
+        cwd=clone_folder,
+        timeout=GIT_TIMEOUT,
+    )
+    if result.ok:
+        for command in (
+            ["git", "remote", "set-url", "origin", mirror_path],
+            ["git", "remote", "set-url", "--push", "origin", repo_url],
+        ):
+            await log_and_process_async(
+                command, cwd=os.path.join(clone_folder, repo_name)
+            )
+    if refresh is not None:
+        result.duration += refresh.duration
+    return result
+
+
+def repository_name_from_url(repo_url):
+    """
+    This function extracts the repository name from its URL.
+
+    :param repo_url: The URL of the repository
+
+    :return: The name of the repository, without the .git suffix
+    """
+    if not isinstance(repo_url, str):
+        raise TypeError("Invalid type for repo_url")
+    repo_name = re.split(r"[/:\\]", repo_url.strip().rstrip("/"))[-1]
+    return repo_name.removesuffix(".git")
+
+
+def read_repository_urls(text):
+    """
+    This function reads the repository URLs pasted or loaded by the user, \
+        one URL per line. Empty lines, comments and duplicates are ignored.
+
+    :param text: The text containing the URLs
+
+    :return: The list of URLs in their original order
+    """
+    if not isinstance(text, str):
+        raise TypeError("Invalid type for text")
+    repo_urls = []
+    for line in text.splitlines():
+        repo_url = line.strip()
+        if repo_url and not repo_url.startswith("#") and repo_url not in repo_urls:
+            repo_urls.append(repo_url)
+    return repo_urls
+
+
+def clone_repositories(
+    repo_urls,
+    clone_folder,
+    progress_bar_add,
+    max_workers=DEFAULT_MAX_WORKERS,
+    cancel_token=None,
+):
+    """
+    This function clones several repositories concurrently.
+
+    Each repository is cloned with the strategy of its entry in repos.json, \
+        if it has one, from its local mirror unless it opted out of the \
+        mirror cache. The repositories already present in the clone folder \
+        are not cloned again.
+
+    :param repo_urls: The list of URLs to clone
+
+    :param clone_folder: The folder where the repositories should be cloned
+
+    :param progress_bar_add: The progress bar to update
+
+    :param max_workers: The maximum number of repositories cloned at the same time
 
+    :param cancel_token: The CancellationToken stopping the clones. \
+        Default is None
 
-def git_create_branch_if_not_exist(directory, new_branch, base_branch):
+    :return: A dict mapping the name of each available repository to its URL, \
+        also given as the partial_result of the OperationCancelled raised \
+        when the clones are cancelled
+    """
+    if not isinstance(repo_urls, list):
+        raise TypeError("Invalid type for repo_urls")
+    if not isinstance(clone_folder, str):
+        raise TypeError("Invalid type for clone_folder")
+    os.makedirs(clone_folder, exist_ok=True)
+    repos_data, _ = get_json_data()
+
+    added = {}
+    to_clone = {}
+    for repo_url in repo_urls:
+        repo_name = repository_name_from_url(repo_url)
+        if os.path.exists(os.path.join(clone_folder, repo_name, ".git")):
+            logger(f"Local repository {repo_name} already exists", "warn")
+            added[repo_name] = repo_url
+        else:
+            to_clone[repo_name] = (
+                repo_url,
+                get_clone_options(repos_data.get(repo_name)),
+                uses_mirror(repos_data.get(repo_name), repo_url),
+            )
+
+    progress_bar_add.set(0)
+    if not to_clone:
+        progress_bar_add.set(1)
+        return added
+
+    step = 1 / len(to_clone)
+    clone_results = {}
+    with network_scheduler.batch() as network_stats:
+        completed = as_completed_results(
+            {
+                repo_name: clone_repository_git_async(
+                    repo_url, clone_folder, clone_options, use_mirror
+                )
+                for repo_name, (repo_url, clone_options, use_mirror) in (
+                    to_clone.items()
+                )
+            },
+            limit=max_workers,
+            track=True,
+            cancel_token=cancel_token,
+        )
+        try:
+            for nb_completed, (repo_name, result, error) in enumerate(
+                completed, start=1
+            ):
+                repo_url, clone_options, use_mirror = to_clone[repo_name]
+                if error is None and result.ok:
+                    logger(
+                        f"[{nb_completed}/{len(to_clone)}] {repo_name} cloned "
+                        f"({describe_clone_options(clone_options)})"
+                    )
+                    added[repo_name] = repo_url
+                    clone_results[repo_name] = {
+                        "options": clone_options,
+                        "duration": result.duration,
+                        "size": directory_size(os.path.join(clone_folder, repo_name)),
+                        "mirror": use_mirror,
+                    }
+                else:
+                    logger(
+                        f"[{nb_completed}/{len(to_clone)}] Failed to clone {repo_name}"
+                        f"{f': {error}' if error else ''}",
+                        "error",
+                    )
+                progress_bar_add.set(nb_completed * step)
+        except OperationCancelled as cancelled:
+            # The completed clones are kept, the caller still registers them
+            raise OperationCancelled(added) from cancelled
+        finally:
+            logger(network_stats.report())
+            record_clone_stats(clone_results)
+    return added
+
+
+def git_create_branch_if_not_exist(
+    directory, new_branch, base_branch, cancel_token=None
+):
     """
     This function performs a git checkout -b to create a new branch \
         if it doesn't already exist.
@@ -118,6 +1024,9 @@ def git_create_branch_if_not_exist(directory, new_branch, base_branch):
 
     :param base_branch: The name of the base branch
 
+    :param cancel_token: The CancellationToken terminating the commands. \
+        Default is None
+
     :return: None
     """
     if not isinstance(directory, str):
@@ -126,41 +1035,200 @@ def git_create_branch_if_not_exist(directory, new_branch, base_branch):
         raise TypeError("Invalid type for new_branch")
     if not isinstance(base_branch, str):
         raise TypeError("Invalid type for base_branch")
-    # Change the working directory to the directory we want to operate on
-    os.chdir(directory)
+    # Check if the branch already exists
+    branch_exists = run_command(
+        ["git", "show-ref", "--quiet", "--heads", new_branch],
+        cwd=directory,
+        cancel_token=cancel_token,
+    ).ok
+
+    if not branch_exists:
+        log_and_process(
+            ["git", "checkout", base_branch], cwd=directory, cancel_token=cancel_token
+        )
+        git_pull(directory, cancel_token=cancel_token)
+
+        # Run git checkout -b to create the branch
+        log_and_process(
+            ["git", "checkout", "-b", new_branch, base_branch],
+            cwd=directory,
+            cancel_token=cancel_token,
+        )
+
+        git_network(
+            ["git", "push", "-u", "origin", new_branch],
+            directory,
+            cancel_token=cancel_token,
+        )
+
+        git_pull(directory, cancel_token=cancel_token)
+    else:
+        log_and_process(
+            ["git", "checkout", new_branch], cwd=directory, cancel_token=cancel_token
+        )
+        git_pull(directory, cancel_token=cancel_token)
+
+        logger(f"Branch '{new_branch}' already exists.")
+
+
+def create_branch_if_not_exist(
+    root_directory,
+    all_repositories,
+    new_branch,
+    base_branch,
+    progress_bar_adding_to_all,
+    cancel_token=None,
+):
+    """
+    This function creates a new branch in all repositories if it doesn't already exist.
+
+    :param root_directory: The root directory where the repositories are located
+
+    :param all_repositories: The list of all repositories
+
+    :param new_branch: The name of the new branch
+
+    :param base_branch: The name of the base branch
+
+    :param cancel_token: The CancellationToken stopping the loop between \
+        two repositories and terminating the running command. Default is None
+
+    :return: None
+    """
+    if not isinstance(root_directory, str):
+        raise TypeError("Invalid type for root_directory")
+    if not isinstance(all_repositories, list):
+        raise TypeError("Invalid type for all_repositories")
+    if not isinstance(new_branch, str):
+        raise TypeError("Invalid type for new_branch")
+    if not isinstance(base_branch, str):
+        raise TypeError("Invalid type for base_branch")
+    # Walk through all directories in the root_directory
+    step = 1 / len(all_repositories)
+    progress_bar_adding_to_all.set(0)
+    for index_r, repo in enumerate(all_repositories):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        print_centered_text(repo)
+        # Join the root and repo to get the complete repo path
+        current_repo = os.path.join(root_directory, repo)
+
+        # Check if the repo contains a .git subrepo (i.e., it's a Git repository)
+        if os.path.exists(os.path.join(current_repo, ".git")):
+            logger(f"Processing repository in {current_repo}")
+
+            # Perform git checkout master and git pull
+            try:
+                git_create_branch_if_not_exist(
+                    current_repo, new_branch, base_branch, cancel_token
+                )
+                progress_bar_adding_to_all.set((index_r + 1) * step)
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                logger(f"Failed to process repository in {current_repo}", "error")
+                logger(e, "critical")
+
+
+async def git_prepare_branch_async(directory, new_branch, base_branch, max_age=0):
+    """
+    This function creates a local branch from origin/<base_branch> \
+        without checking anything out, so the working tree is not touched.
+
+    :param directory: The path of the working copy
+
+    :param new_branch: The name of the new branch
+
+    :param base_branch: The name of the base branch
 
-    # Check if the branch already exists
+    :param max_age: The age in seconds under which the last fetch is \
+        recent enough to skip the network. Default is 0, always fetch
+
+    :return: CREATED if the branch has been created and has to be pushed, \
+        EXISTING if it already existed locally or on the remote, \
+        FAILED otherwise
+    """
     branch_exists = (
-        subprocess.run(["git", "show-ref", "--quiet", "--heads", new_branch]).returncode
-        == 0
+        await run_command_async(
+            ["git", "show-ref", "--verify", "--quiet", f"refs/heads/{new_branch}"],
+            cwd=directory,
+        )
+    ).ok
+    if branch_exists:
+        logger(f"Branch '{new_branch}' already exists in {directory}.")
+        return EXISTING
+
+    result = await git_fetch_branch_async(directory, base_branch, max_age)
+    if result is not None and not result.ok:
+        return FAILED
+
+    _, _, _, fetch_url = await get_fetch_source_async(directory)
+    if await get_remote_branch_sha_async(directory, new_branch, fetch_url):
+        # Already created on the server, only the local branch is missing
+        logger(f"Branch '{new_branch}' already exists on the remote of {directory}.")
+        result = await git_fetch_branch_async(directory, new_branch, math.inf)
+        if result is not None and not result.ok:
+            return FAILED
+        result = await log_and_process_async(
+            ["git", "branch", "--track", new_branch, f"origin/{new_branch}"],
+            cwd=directory,
+        )
+        return EXISTING if result.ok else FAILED
+
+    result = await log_and_process_async(
+        ["git", "branch", "--no-track", new_branch, f"origin/{base_branch}"],
+        cwd=directory,
     )
+    return CREATED if result.ok else FAILED
 
-    if not branch_exists:
-        log_and_process(["git", "checkout", base_branch])
-        log_and_process(["git", "pull"])
 
-        # Run git checkout -b to create the branch
-        log_and_process(["git", "checkout", "-b", new_branch, base_branch])
+async def git_push_new_branch_async(directory, new_branch):
+    """
+    This function pushes a branch created by git_prepare_branch_async and \
+        sets its upstream. The branch is also written to the mirror of the \
+        working copy, so fetching from the mirror does not prune it. \
+        If the push fails, the local branch is deleted so that a later \
+        run creates it again.
 
-        log_and_process(["git", "push", "-u", "origin", new_branch])
+    :param directory: The path of the working copy
 
-        log_and_process(["git", "pull"])
-    else:
-        log_and_process(["git", "checkout", new_branch])
-        log_and_process(["git", "pull"])
+    :param new_branch: The name of the new branch
 
-        logger(f"Branch '{new_branch}' already exists.")
+    :return: True if the branch has been pushed
+    """
+    refspec = f"refs/heads/{new_branch}:refs/heads/{new_branch}"
+    result = await git_network_async(
+        ["git", "push", "-u", "origin", refspec], directory
+    )
+    if not result.ok:
+        await log_and_process_async(["git", "branch", "-D", new_branch], cwd=directory)
+        return False
 
+    _, _, _, fetch_url = await get_fetch_source_async(directory)
+    if is_mirror_url(fetch_url):
+        await log_and_process_async(["git", "push", fetch_url, refspec], cwd=directory)
+    return True
 
-def create_branch_if_not_exist(
+
+def create_branch_without_checkout(
     root_directory,
     all_repositories,
     new_branch,
     base_branch,
     progress_bar_adding_to_all,
+    switch=False,
+    max_workers=DEFAULT_MAX_WORKERS,
+    max_age=0,
+    cancel_token=None,
 ):
     """
-    This function creates a new branch in all repositories if it doesn't already exist.
+    This function creates a new branch in all repositories from the \
+        remote-tracking branch of the base branch, without any checkout.
+
+    The local branches are first created concurrently, then all the new \
+        branches are pushed concurrently through the network scheduler. \
+        With switch, the working copies are checked out on the new branch \
+        once it has been pushed.
 
     :param root_directory: The root directory where the repositories are located
 
@@ -170,7 +1238,19 @@ def create_branch_if_not_exist(
 
     :param base_branch: The name of the base branch
 
-    :return: None
+    :param progress_bar_adding_to_all: The progress bar to update
+
+    :param switch: True to checkout the new branch at the end. Default is False
+
+    :param max_workers: The maximum number of repositories processed at the same time
+
+    :param max_age: The age in seconds under which the last fetch of a \
+        repository is recent enough to skip the network. Default is 0, always fetch
+
+    :param cancel_token: The CancellationToken stopping the operation. \
+        The branches already pushed stay on the remote. Default is None
+
+    :return: A dict mapping each repository to CREATED, EXISTING or FAILED
     """
     if not isinstance(root_directory, str):
         raise TypeError("Invalid type for root_directory")
@@ -180,33 +1260,113 @@ def create_branch_if_not_exist(
         raise TypeError("Invalid type for new_branch")
     if not isinstance(base_branch, str):
         raise TypeError("Invalid type for base_branch")
-    # Walk through all directories in the root_directory
-    step = 1 / len(all_repositories)
-    progress_bar_adding_to_all.set(0)
-    for index_r, repo in enumerate(all_repositories):
-        print_centered_text(repo)
-        # Join the root and repo to get the complete repo path
-        current_repo = os.path.join(root_directory, repo)
 
-        # Check if the repo contains a .git subrepo (i.e., it's a Git repository)
+    git_repositories = {}
+    for repo in all_repositories:
+        current_repo = os.path.join(root_directory, repo)
         if os.path.exists(os.path.join(current_repo, ".git")):
-            logger(f"Processing repository in {current_repo}")
+            git_repositories[repo] = current_repo
+        else:
+            logger(f"{current_repo} is not a git repository. Skipping...", "warn")
 
-            # Perform git checkout master and git pull
-            try:
-                git_create_branch_if_not_exist(current_repo, new_branch, base_branch)
-                progress_bar_adding_to_all.set((index_r + 1) * step)
-            except Exception as e:
-                logger(f"Failed to process repository in {current_repo}", "error")
-                logger(e, "critical")
+    results = {}
+    if not git_repositories:
+        return results
+
+    # Half of the progress bar for the local branches, half for the pushes
+    step = 1 / (2 * len(git_repositories))
+    progress_bar_adding_to_all.set(0)
+    with network_scheduler.batch() as network_stats:
+        completed = as_completed_results(
+            {
+                repo: git_prepare_branch_async(
+                    current_repo, new_branch, base_branch, max_age
+                )
+                for repo, current_repo in git_repositories.items()
+            },
+            limit=max_workers,
+            track=True,
+            cancel_token=cancel_token,
+        )
+        for nb_completed, (repo, status, error) in enumerate(completed, start=1):
+            if error is not None:
+                logger(f"{repo}: {error}", "error")
+            results[repo] = status or FAILED
+            if results[repo] == FAILED:
+                logger(f"Failed to create {new_branch} in {repo}", "error")
+            progress_bar_adding_to_all.set(nb_completed * step)
+
+        to_push = [repo for repo, status in results.items() if status == CREATED]
+        completed = as_completed_results(
+            {
+                repo: git_push_new_branch_async(git_repositories[repo], new_branch)
+                for repo in to_push
+            },
+            limit=max_workers,
+            track=True,
+            cancel_token=cancel_token,
+        )
+        for nb_completed, (repo, pushed, error) in enumerate(completed, start=1):
+            if error is not None:
+                logger(f"{repo}: {error}", "error")
+            if pushed:
+                logger(f"[{nb_completed}/{len(to_push)}] {new_branch} pushed in {repo}")
+            else:
+                results[repo] = FAILED
+                logger(
+                    f"[{nb_completed}/{len(to_push)}] "
+                    f"Failed to push {new_branch} in {repo}",
+                    "error",
+                )
+            progress_bar_adding_to_all.set(0.5 + nb_completed / (2 * len(to_push)))
+    logger(network_stats.report())
+
+    if switch:
+        for repo, result, error in as_completed_results(
+            {
+                repo: log_and_process_async(
+                    ["git", "checkout", new_branch], cwd=git_repositories[repo]
+                )
+                for repo, status in results.items()
+                if status != FAILED
+            },
+            limit=max_workers,
+            track=True,
+            cancel_token=cancel_token,
+        ):
+            if error is not None or not result.ok:
+                logger(f"{repo} could not be switched to {new_branch}", "warn")
+    progress_bar_adding_to_all.set(1)
+
+    statuses = list(results.values())
+    logger(
+        f"{statuses.count(CREATED)} repositories with the new branch {new_branch}, "
+        f"{statuses.count(EXISTING)} already had it, {statuses.count(FAILED)} failed"
+    )
+    return results
 
 
 def update_all_local_repositories(
-    root_directory, all_repositories, checkout_branch, progress_bar_update
+    root_directory,
+    all_repositories,
+    checkout_branch,
+    progress_bar_update,
+    max_workers=DEFAULT_MAX_WORKERS,
+    max_age=0,
+    skip_unchanged=False,
+    checkout=True,
+    cancel_token=None,
 ):
     """
     This function performs a git checkout and git pull in all repositories.
 
+    The repositories are updated concurrently on the command runner, \
+        at most max_workers at a time, and the result of each repository \
+        is logged as soon as it finishes. With skip_unchanged, a first \
+        git ls-remote tells which repositories have new commits on the \
+        branch, only those are fetched and merged. Each remote is only \
+        asked once, even if several working copies fetch from it.
+
     :param root_directory: The root directory where the repositories are located
 
     :param all_repositories: The list of all repositories
@@ -215,7 +1375,23 @@ def update_all_local_repositories(
 
     :param progress_bar_update: The progress bar to update
 
-    :return: None
+    :param max_workers: The maximum number of repositories updated at the same time
+
+    :param max_age: The age in seconds under which the last fetch of a \
+        repository is recent enough to update it without any network. \
+        Default is 0, always fetch
+
+    :param skip_unchanged: True to skip the fetch of the repositories whose \
+        branch did not move on the server. Default is False
+
+    :param checkout: False to fast-forward the branch without checking it \
+        out in the repositories where it is not the current branch, \
+        leaving their working tree untouched. Default is True
+
+    :param cancel_token: The CancellationToken stopping the updates. \
+        Default is None
+
+    :return: A dict mapping each repository to UPDATED, UNCHANGED or FAILED
     """
 
     if not isinstance(root_directory, str):
@@ -224,24 +1400,71 @@ def update_all_local_repositories(
         raise TypeError("Invalid type for all_repositories")
     if not isinstance(checkout_branch, str):
         raise TypeError("Invalid type for checkout_branch")
-    step = 1 / len(all_repositories)
-    # Walk through all directories in the root_directory
-    for index_r, repo in enumerate(all_repositories):
-        print_centered_text(repo)
+    if not isinstance(max_workers, int) or max_workers < 1:
+        raise ValueError("max_workers must be a positive integer")
+
+    # Keep only the directories that are Git repositories
+    git_repositories = {}
+    for repo in all_repositories:
         # Join the root and repo to get the complete repo path
         current_repo = os.path.join(root_directory, repo)
 
         # Check if the repo contains a .git subrepo (i.e., it's a Git repository)
         if os.path.exists(os.path.join(current_repo, ".git")):
-            logger(f"Processing repository in {current_repo}")
+            git_repositories[repo] = current_repo
+        else:
+            logger(f"{current_repo} is not a git repository. Skipping...", "warn")
+
+    results = {}
+    if not git_repositories:
+        return results
+
+    step = 1 / len(git_repositories)
+    progress_bar_update.set(0)
+    # Only used from the runner loop, so no lock is needed
+    server_shas = {}
+    with network_scheduler.batch() as network_stats:
+        completed = as_completed_results(
+            {
+                repo: git_update_branch_async(
+                    current_repo,
+                    checkout_branch,
+                    max_age,
+                    skip_unchanged,
+                    checkout,
+                    server_shas,
+                )
+                for repo, current_repo in git_repositories.items()
+            },
+            limit=max_workers,
+            track=True,
+            cancel_token=cancel_token,
+        )
+        for nb_completed, (repo, status, error) in enumerate(completed, start=1):
+            if error is not None:
+                logger(f"{repo}: {error}", "error")
+            results[repo] = status or FAILED
 
-            # Perform git checkout master and git pull
-            try:
-                git_checkout_pull(current_repo, checkout_branch)
-                progress_bar_update.set((index_r + 1) * step)
-            except Exception as e:
-                logger(f"Failed to process repository in {current_repo}", "error")
-                logger(e, "critical")
+            if results[repo] == FAILED:
+                logger(
+                    f"[{nb_completed}/{len(git_repositories)}] "
+                    f"Failed to update {repo}",
+                    "error",
+                )
+            else:
+                logger(
+                    f"[{nb_completed}/{len(git_repositories)}] {repo} {results[repo]}"
+                )
+            progress_bar_update.set(nb_completed * step)
+    logger(network_stats.report())
+
+    statuses = list(results.values())
+    logger(
+        f"{len(results) - statuses.count(FAILED)}/{len(results)} repositories "
+        f"updated to {checkout_branch}, "
+        f"{statuses.count(UNCHANGED)} unchanged and skipped"
+    )
+    return results
 
 
 def readonly_to_writable(foo, file, err):
@@ -274,13 +1497,122 @@ def remove_directory_if_exists(directory_path):
         logger(f"Directory not found: {directory_path}", "warn")
 
 
+def file_digest(file_path):
+    """
+    This function hashes the content of a file.
+
+    :param file_path: The path of the file
+
+    :return: The SHA-256 digest of the content of the file
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def is_same_file(source_file, destination_file, source_stat):
+    """
+    This function tells if a file already has the content of its source. \
+        The size and modification time are compared first, the content is \
+        only hashed when the sizes match but not the modification times.
+
+    :param source_file: The path of the source file
+
+    :param destination_file: The path of the copy
+
+    :param source_stat: The os.stat_result of the source file
+
+    :return: True if the copy does not have to be written again
+    """
+    try:
+        destination_stat = os.stat(destination_file)
+    except FileNotFoundError:
+        return False
+    if destination_stat.st_size != source_stat.st_size:
+        return False
+    if destination_stat.st_mtime_ns == source_stat.st_mtime_ns:
+        return True
+    if file_digest(source_file) != file_digest(destination_file):
+        return False
+    # Same content, align the modification time so the next sync skips the hash
+    os.utime(destination_file, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    return True
+
+
+def sync_directory(source_directory, destination_directory, exclude=()):
+    """
+    This function mirrors a directory: only the new and changed files are \
+        copied, with their modification time, and the files missing from \
+        the source are removed. The unchanged files are not touched.
+
+    :param source_directory: The directory to copy
+
+    :param destination_directory: The copy of the directory
+
+    :param exclude: The names of the files and folders not copied, \
+        removed from the copy if they are present
+
+    :return: A dict with the number of files "copied", "removed" and \
+        "unchanged", and the number of "bytes" copied
+    """
+    if not isinstance(source_directory, str):
+        raise TypeError("Invalid type for source_directory")
+    if not isinstance(destination_directory, str):
+        raise TypeError("Invalid type for destination_directory")
+    stats = {"copied": 0, "removed": 0, "unchanged": 0, "bytes": 0}
+    os.makedirs(destination_directory, exist_ok=True)
+    source_entries = {
+        entry.name: entry
+        for entry in os.scandir(source_directory)
+        if entry.name not in exclude
+    }
+
+    for entry in os.scandir(destination_directory):
+        source_entry = source_entries.get(entry.name)
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if source_entry is not None and source_entry.is_dir() == is_dir:
+            continue
+        if is_dir:
+            stats["removed"] += sum(len(files) for _, _, files in os.walk(entry.path))
+            shutil.rmtree(entry.path, onerror=readonly_to_writable)
+        else:
+            stats["removed"] += 1
+            os.remove(entry.path)
+
+    for name, entry in source_entries.items():
+        destination = os.path.join(destination_directory, name)
+        if entry.is_dir():
+            for key, value in sync_directory(entry.path, destination, exclude).items():
+                stats[key] += value
+        elif is_same_file(entry.path, destination, source_stat := entry.stat()):
+            stats["unchanged"] += 1
+        else:
+            shutil.copy2(entry.path, destination)
+            stats["copied"] += 1
+            stats["bytes"] += source_stat.st_size
+    return stats
+
+
 def copy_modules(
-    root_directory, all_repositories, destination_directory, model_progress_bar
+    root_directory,
+    all_repositories,
+    destination_directory,
+    model_progress_bar,
+    cancel_token=None,
+    exclude=("__pycache__",),
 ):
     """
     This function copies the folder_package from each repository \
         to the destination directory.
 
+    The copies are kept between two runs and synchronised incrementally: \
+        an unchanged repository costs a stat per file, and the copied files \
+        keep their modification time, so Sphinx only reads the changed \
+        modules again. The folders of the repositories no longer listed \
+        are removed.
+
     :param root_directory: The root directory where the repositories are located
 
     :param all_repositories: The list of all repositories
@@ -290,69 +1622,45 @@ def copy_modules(
         
     :param model_progress_bar: The progress bar to update
 
+    :param cancel_token: The CancellationToken stopping the copy between \
+        two repositories. Default is None
+
+    :param exclude: The names of the files and folders not copied. \
+        Default is the __pycache__ folders
+
     :return: None
     """
     # Destination directory where you want to copy the folder_package
     bar_step = 0.8 / len(all_repositories)
+    os.makedirs(destination_directory, exist_ok=True)
+    total_stats = {"copied": 0, "removed": 0, "unchanged": 0, "bytes": 0}
+    remove_unlisted_modules(destination_directory, all_repositories)
 
     # Loop through each repository
     for index_r, repo_name in enumerate(all_repositories):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
         print_centered_text(repo_name)
 
-        # Construct the source path for the folder_package
-        source_directory = os.path.join(root_directory, repo_name)
-
-        print(source_directory)
-
-        # Check if the directory "transforms-python" exists within source_directory
-        def exists_and_isdir(source_directory, folder):
-            return os.path.exists(
-                os.path.join(source_directory, folder)
-            ) and os.path.isdir(os.path.join(source_directory, folder))
-
-        # if exists_and_isdir(source_directory, "database"):
-        #     source_directory = os.path.join(source_directory, "database")
-        #     get_package = [""]
-        if exists_and_isdir(source_directory, "transforms-python"):
-            source_directory = os.path.join(source_directory, "transforms-python")
-
-        if exists_and_isdir(source_directory, "src"):
-            source_directory = os.path.join(source_directory, "src")
-
-            logger(f"Copying folder_package from {source_directory}")
-            # print(source_directory)
-            get_all_folders = [
-                folder
-                for folder in os.listdir(source_directory)
-                if os.path.isdir(os.path.join(source_directory, folder))
-            ]
-
-            get_package = [
-                folder
-                for folder in get_all_folders
-                if folder
-                not in ["expectations", "test", ".ruff_cache", "__pycache__", "tests"]
-            ]
-        source_directory = os.path.join(source_directory, rf"{get_package[0]}")
-        logger(f"Copying folder_package from {get_package[0]}")
-        logger(source_directory)
+        # Find the folder_package of the repository
+        source_directory = find_package_folder(os.path.join(root_directory, repo_name))
         # Check if the source directory exists
-        if os.path.exists(source_directory):
+        if source_directory is not None:
+            logger(f"Copying folder_package from {source_directory}")
             # Construct the destination path
 
             folder_destination = os.path.join(destination_directory, repo_name)
             logger(folder_destination)
 
-            if os.path.exists(folder_destination):
-                shutil.rmtree(folder_destination)
-            # Copy the folder_package to the destination directory
+            # Copy the changes of the folder_package to the destination directory
             try:
-                log_and_process(
-                    ["robocopy", source_directory, folder_destination, "/MIR"]
-                )
+                stats = sync_directory(source_directory, folder_destination, exclude)
+                for key, value in stats.items():
+                    total_stats[key] += value
                 logger(
-                    f"Successfully copied {repo_name}'s folder_package \
-                        to {destination_directory}"
+                    f"Synchronised {repo_name}'s folder_package: "
+                    f"{stats['copied']} files copied ({stats['bytes']} bytes), "
+                    f"{stats['removed']} removed, {stats['unchanged']} unchanged"
                 )
                 model_progress_bar.set(0.2 + ((index_r + 1) * bar_step))
             except Exception as e:
@@ -370,11 +1678,341 @@ def copy_modules(
                 "warn",
             )
 
+    logger(
+        f"Modules synchronised: {total_stats['copied']} files copied "
+        f"({total_stats['bytes']} bytes), {total_stats['removed']} removed, "
+        f"{total_stats['unchanged']} unchanged"
+    )
+    create_package_init(destination_directory)
+
+
+def find_package_folder(repo_directory):
+    """
+    This function finds the folder_package of a repository: the first \
+        folder of its transforms-python/src or src folder that is not in \
+        NOT_PACKAGE_FOLDERS.
+
+    :param repo_directory: The path of the working copy
+
+    :return: The path of the folder_package, None if there is none
+    """
+    for source_folder in ("transforms-python/src", "src"):
+        source_directory = os.path.join(repo_directory, source_folder)
+        if os.path.isdir(source_directory):
+            break
+    else:
+        return None
+    get_package = [
+        folder
+        for folder in sorted(os.listdir(source_directory))
+        if os.path.isdir(os.path.join(source_directory, folder))
+        and folder not in NOT_PACKAGE_FOLDERS
+    ]
+    if not get_package:
+        return None
+    return os.path.join(source_directory, get_package[0])
+
+
+def remove_unlisted_modules(destination_directory, all_repositories):
+    """
+    This function removes the copies of the repositories no longer listed.
+
+    :param destination_directory: The directory holding the folder_package \
+        of each repository
+
+    :param all_repositories: The list of all repositories
+
+    :return: None
+    """
+    for entry in os.scandir(destination_directory):
+        if entry.is_dir() and entry.name not in all_repositories:
+            logger(f"Removing the modules of {entry.name}, no longer listed")
+            remove_directory_if_exists(entry.path)
+
+
+def create_package_init(destination_directory):
+    """
+    This function creates the __init__.py file of the destination directory, \
+        once so its modification time does not change.
+
+    :param destination_directory: The directory holding the folder_package \
+        of each repository
+
+    :return: None
+    """
     init_file_path = os.path.join(destination_directory, "__init__.py")
+    if not os.path.exists(init_file_path):
+        with open(init_file_path, "w", encoding="utf-8"):
+            pass
+
+
+def sync_directory_from_archive(archive_path, destination_directory, exclude=()):
+    """
+    This function mirrors the content of a tar archive in a directory: only \
+        the files whose content differs are written, and the files missing \
+        from the archive are removed. The unchanged files are not touched.
+
+    :param archive_path: The path of the tar archive
+
+    :param destination_directory: The directory to update
+
+    :param exclude: The names of the files and folders not extracted, \
+        removed from the directory if they are present
+
+    :return: A dict with the number of files "copied", "removed" and \
+        "unchanged", and the number of "bytes" copied
+    """
+    stats = {"copied": 0, "removed": 0, "unchanged": 0, "bytes": 0}
+    destination_directory = os.path.normpath(destination_directory)
+    os.makedirs(destination_directory, exist_ok=True)
+    archived = set()
+    with tarfile.open(archive_path) as archive:
+        for member in archive:
+            parts = member.name.split("/")
+            if not member.isfile() or any(part in exclude for part in parts):
+                continue
+            destination = os.path.join(destination_directory, *parts)
+            archived.add(destination)
+            content = archive.extractfile(member).read()
+            if os.path.isfile(destination) and os.path.getsize(destination) == len(
+                content
+            ):
+                with open(destination, "rb") as file:
+                    if file.read() == content:
+                        stats["unchanged"] += 1
+                        continue
+            # Written now, so Sphinx sees the file as newer than its last read
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            with open(destination, "wb") as file:
+                file.write(content)
+            stats["copied"] += 1
+            stats["bytes"] += len(content)
+
+    for root, _, files in os.walk(destination_directory, topdown=False):
+        for file in files:
+            if (file_path := os.path.join(root, file)) not in archived:
+                os.remove(file_path)
+                stats["removed"] += 1
+        if root != destination_directory and not os.listdir(root):
+            os.rmdir(root)
+    return stats
+
+
+async def git_export_package_async(
+    directory, ref, destination_directory, exclude=(), is_cached=None
+):
+    """
+    This function writes the folder_package of a repository, as it is at a \
+        ref, straight from the object database with git archive. Nothing is \
+        checked out, the working copy is not touched.
+
+    :param directory: The path of the working copy
+
+    :param ref: The branch, tag or commit to export, the remote-tracking \
+        branch origin/<ref> is used when there is no local ref
+
+    :param destination_directory: The directory receiving the folder_package
+
+    :param exclude: The names of the files and folders not exported
+
+    :param is_cached: A function telling, from the SHA of the package tree, \
+        if the destination directory already holds it. Default is None
 
-    # Create the __init__.py file
-    with open(init_file_path, "w", encoding="utf-8"):
-        pass
+    :return: A (tree SHA, stats) tuple, stats being the dict returned by \
+        sync_directory_from_archive or None if the package was cached, \
+        FAILED if the ref or the package could not be found
+    """
+    for tree in (ref, f"origin/{ref}"):
+        result = await run_command_async(
+            ["git", "rev-parse", "--verify", "--quiet", f"{tree}^{{tree}}"],
+            cwd=directory,
+        )
+        if result.ok:
+            break
+    else:
+        logger(f"{ref} not found in {directory}", "error")
+        return FAILED
+
+    for source_folder in ("transforms-python/src", "src"):
+        result = await run_command_async(
+            ["git", "ls-tree", "-d", "--name-only", f"{tree}:{source_folder}"],
+            cwd=directory,
+            full_output=True,
+        )
+        if result.ok:
+            break
+    else:
+        logger(f"No src folder at {tree} in {directory}", "warn")
+        return FAILED
+    get_package = [
+        folder for folder in result.output if folder not in NOT_PACKAGE_FOLDERS
+    ]
+    if not get_package:
+        logger(f"No folder_package at {tree} in {directory}", "warn")
+        return FAILED
+    package = f"{tree}:{source_folder}/{get_package[0]}"
+
+    result = await run_command_async(["git", "rev-parse", package], cwd=directory)
+    if not result.ok or not result.output:
+        return FAILED
+    tree_sha = result.output[-1].strip()
+    if (
+        is_cached is not None
+        and is_cached(tree_sha)
+        and os.path.isdir(destination_directory)
+    ):
+        return tree_sha, None
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        archive_path = os.path.join(temporary_directory, "package.tar")
+        result = await log_and_process_async(
+            [
+                "git",
+                "archive",
+                "--format=tar",
+                f"--output={archive_path}",
+                package,
+            ],
+            cwd=directory,
+        )
+        if not result.ok:
+            return FAILED
+        # Off the runner loop, the other repositories keep running meanwhile
+        stats = await asyncio.to_thread(
+            sync_directory_from_archive, archive_path, destination_directory, exclude
+        )
+    return tree_sha, stats
+
+
+def export_modules(
+    root_directory,
+    all_repositories,
+    destination_directory,
+    ref,
+    model_progress_bar,
+    cancel_token=None,
+    exclude=("__pycache__",),
+    max_workers=DEFAULT_MAX_WORKERS,
+    build_cache=None,
+):
+    """
+    This function writes the folder_package of each repository, as it is at \
+        a ref, to the destination directory, without any checkout. The \
+        repositories are exported concurrently, from the commits already \
+        fetched: update them first to export the latest state of the ref.
+
+    With a build cache, the repositories whose package tree and \
+        documentation settings did not change since their last export are \
+        skipped, their files are not touched.
+
+    :param root_directory: The root directory where the repositories are located
+
+    :param all_repositories: The list of all repositories
+
+    :param destination_directory: The destination directory \
+        where the folder_package should be written
+
+    :param ref: The branch, tag or commit to export, e.g. a release branch
+
+    :param model_progress_bar: The progress bar to update
+
+    :param cancel_token: The CancellationToken stopping the export. \
+        Default is None
+
+    :param exclude: The names of the files and folders not exported. \
+        Default is the __pycache__ folders
+
+    :param max_workers: The maximum number of repositories exported at the same time
+
+    :param build_cache: The BuildCache of the modules in the destination \
+        directory, updated and saved at the end. Default is None
+
+    :return: None
+    """
+    if not isinstance(ref, str):
+        raise TypeError("Invalid type for ref")
+    bar_step = 0.8 / len(all_repositories)
+    os.makedirs(destination_directory, exist_ok=True)
+    total_stats = {"copied": 0, "removed": 0, "unchanged": 0, "bytes": 0}
+    remove_unlisted_modules(destination_directory, all_repositories)
+    settings_hash = docs_settings_hash() if build_cache is not None else None
+    nb_cached = 0
+
+    git_repositories = {}
+    for repo_name in all_repositories:
+        current_repo = os.path.join(root_directory, repo_name)
+        if os.path.exists(os.path.join(current_repo, ".git")):
+            git_repositories[repo_name] = current_repo
+        else:
+            logger(f"{current_repo} is not a git repository. Skipping...", "warn")
+
+    completed = as_completed_results(
+        {
+            repo_name: git_export_package_async(
+                current_repo,
+                ref,
+                os.path.join(destination_directory, repo_name),
+                exclude,
+                (
+                    functools.partial(
+                        build_cache.is_fresh, repo_name, settings_hash=settings_hash
+                    )
+                    if build_cache is not None
+                    else None
+                ),
+            )
+            for repo_name, current_repo in git_repositories.items()
+        },
+        limit=max_workers,
+        track=True,
+        cancel_token=cancel_token,
+    )
+    pending = set(git_repositories)
+    try:
+        for nb_completed, (repo_name, exported, error) in enumerate(completed, start=1):
+            pending.discard(repo_name)
+            if error is not None:
+                logger(f"{repo_name}: {error}", "error")
+            if error is not None or exported == FAILED:
+                logger(
+                    f"Failed to export {repo_name}'s folder_package at {ref}", "warn"
+                )
+                if build_cache is not None:
+                    build_cache.forget(repo_name)
+                model_progress_bar.set(0.2 + nb_completed * bar_step)
+                continue
+
+            tree_sha, stats = exported
+            if build_cache is not None:
+                build_cache.store(repo_name, tree_sha, settings_hash)
+            if stats is None:
+                nb_cached += 1
+                logger(f"{repo_name}'s folder_package at {ref} unchanged, cached")
+            else:
+                for key, value in stats.items():
+                    total_stats[key] += value
+                logger(
+                    f"Exported {repo_name}'s folder_package at {ref}: "
+                    f"{stats['copied']} files written ({stats['bytes']} bytes), "
+                    f"{stats['removed']} removed, {stats['unchanged']} unchanged"
+                )
+            model_progress_bar.set(0.2 + nb_completed * bar_step)
+    except BaseException:
+        # The repositories not finished may be half written
+        if build_cache is not None:
+            for repo_name in pending:
+                build_cache.forget(repo_name)
+            build_cache.save()
+        raise
+
+    logger(
+        f"Modules exported at {ref}: {total_stats['copied']} files written "
+        f"({total_stats['bytes']} bytes), {total_stats['removed']} removed, "
+        f"{total_stats['unchanged']} unchanged, {nb_cached} repositories cached"
+    )
+    create_package_init(destination_directory)
+    if build_cache is not None:
+        build_cache.save()
 
 
 def change_version(file_conf, new_version):
@@ -462,11 +2100,82 @@ def copy_file(source_file, destination_file):
         logger(f"An error occurred: {str(e)}", "critical")
 
 
-def commit_push(all_repositories, branch_name, commit_message, progress_bar_add_commit):
+async def git_status_async(directory, branch_name):
+    """
+    This function tells what commit_push has to do in a working copy, \
+        with a single git status.
+
+    :param directory: The path of the working copy
+
+    :param branch_name: The name of the branch to commit and push
+
+    :return: COMMITTED if the working copy has changes to commit, \
+        PUSHED if it has none but branch_name is checked out and ahead of \
+        its upstream, SKIPPED if there is nothing to do, FAILED otherwise
+    """
+    result = await run_command_async(
+        ["git", "status", "--porcelain", "--branch"], cwd=directory
+    )
+    if not result.ok:
+        log_command_result(result)
+        return FAILED
+    # Only the tail of the output is kept, the header may be missing
+    if any(not line.startswith("## ") for line in result.output):
+        return COMMITTED
+    # The header is "## branch...origin/branch [ahead 1]"
+    header = result.output_tail
+    current_branch = header[3:].split("...")[0].split(" ")[0]
+    if current_branch == branch_name and "[ahead " in header:
+        return PUSHED
+    return SKIPPED
+
+
+async def git_commit_push_async(directory, branch_name, commit_message, status):
+    """
+    This function commits all the changes of a working copy on a branch \
+        and pushes it, stopping at the first failing command.
+
+    :param directory: The path of the working copy
+
+    :param branch_name: The name of the branch to commit and push
+
+    :param commit_message: The commit message
+
+    :param status: The status given by git_status_async, COMMITTED or PUSHED
+
+    :return: status if the branch has been pushed, FAILED otherwise
+    """
+    if status == COMMITTED:
+        for command in (
+            ["git", "checkout", branch_name],
+            ["git", "add", "."],
+            ["git", "commit", "-m", commit_message],
+        ):
+            result = await log_and_process_async(command, cwd=directory)
+            if not result.ok:
+                return FAILED
+
+    result = await git_network_async(["git", "push", "origin", branch_name], directory)
+    return status if result.ok else FAILED
+
+
+def commit_push(
+    all_repositories,
+    branch_name,
+    commit_message,
+    progress_bar_add_commit,
+    max_workers=DEFAULT_MAX_WORKERS,
+    cancel_token=None,
+):
     """
     This function commits and pushes the changes to the remote repository.
 
-    :param repository_path: The path of the repository
+    A first git status, run in all the repositories concurrently, finds \
+        the repositories with changes. Only those are committed, then all \
+        the pushes run concurrently. The clean repositories are skipped, \
+        unless branch_name is checked out with commits not pushed yet.
+
+    :param all_repositories: The list of all repositories
 
     :param branch_name: The name of the branch to commit and push
 
@@ -474,38 +2183,88 @@ def commit_push(all_repositories, branch_name, commit_message, progress_bar_add_
 
     :param progress_bar_add_commit: The progress bar to update
 
-    :return: None
+    :param max_workers: The maximum number of repositories processed at the same time
+
+    :param cancel_token: The CancellationToken stopping the operation. \
+        Default is None
+
+    :return: A dict mapping each repository to COMMITTED, PUSHED, SKIPPED or FAILED
     """
-    step = 1 / (len(all_repositories) * 4)
-    actual_r = 1
+    if not isinstance(branch_name, str):
+        raise TypeError("Invalid type for branch_name")
+    if not isinstance(commit_message, str):
+        raise TypeError("Invalid type for commit_message")
+
+    git_repositories = {}
     for repo in all_repositories:
         # Join the root and repo to get the complete repo path
         current_repo = os.path.join(script_path, "remote_repositories", repo)
-
-        try:
-            # Change to the repository directory
-            os.chdir(current_repo)
-            # Checkout the branch
-            log_and_process(["git", "checkout", branch_name])
-            actual_r += 1
-            progress_bar_add_commit.set(actual_r * step)
-            # Stage all modifications
-            log_and_process(["git", "add", "."])
-            actual_r += 1
-            progress_bar_add_commit.set(actual_r * step)
-
-            # Commit all modifications
-            log_and_process(["git", "commit", "-m", commit_message])
-            actual_r += 1
-            progress_bar_add_commit.set(actual_r * step)
-
-            # Push the branch to the remote repository
-            log_and_process(["git", "push", "origin", branch_name])
-            actual_r += 1
-            progress_bar_add_commit.set(actual_r * step)
-
-        except subprocess.CalledProcessError as e:
-            logger(f"Error in repository {current_repo}: {e}", "critical")
+        if os.path.exists(os.path.join(current_repo, ".git")):
+            git_repositories[repo] = current_repo
+        else:
+            logger(f"{current_repo} is not a git repository. Skipping...", "warn")
+
+    results = {}
+    if not git_repositories:
+        return results
+
+    # Half of the progress bar for the scan, half for the commits and pushes
+    step = 1 / (2 * len(git_repositories))
+    progress_bar_add_commit.set(0)
+    completed = as_completed_results(
+        {
+            repo: git_status_async(current_repo, branch_name)
+            for repo, current_repo in git_repositories.items()
+        },
+        limit=max_workers,
+        track=True,
+        cancel_token=cancel_token,
+    )
+    for nb_completed, (repo, status, error) in enumerate(completed, start=1):
+        if error is not None:
+            logger(f"Error in repository {repo}: {error}", "error")
+        results[repo] = status or FAILED
+        progress_bar_add_commit.set(nb_completed * step)
+
+    to_push = [
+        repo for repo, status in results.items() if status in (COMMITTED, PUSHED)
+    ]
+    logger(f"{len(to_push)}/{len(results)} repositories have changes to commit or push")
+    with network_scheduler.batch() as network_stats:
+        completed = as_completed_results(
+            {
+                repo: git_commit_push_async(
+                    git_repositories[repo], branch_name, commit_message, results[repo]
+                )
+                for repo in to_push
+            },
+            limit=max_workers,
+            track=True,
+            cancel_token=cancel_token,
+        )
+        for nb_completed, (repo, status, error) in enumerate(completed, start=1):
+            if error is not None:
+                logger(f"Error in repository {repo}: {error}", "error")
+            results[repo] = status or FAILED
+            if results[repo] == FAILED:
+                logger(
+                    f"[{nb_completed}/{len(to_push)}] "
+                    f"Failed to commit and push {repo}",
+                    "error",
+                )
+            else:
+                logger(f"[{nb_completed}/{len(to_push)}] {repo} {results[repo]}")
+            progress_bar_add_commit.set(0.5 + nb_completed / (2 * len(to_push)))
+    logger(network_stats.report())
+    progress_bar_add_commit.set(1)
+
+    statuses = list(results.values())
+    logger(
+        f"{statuses.count(COMMITTED)} repositories committed and pushed, "
+        f"{statuses.count(PUSHED)} pushed, {statuses.count(SKIPPED)} clean "
+        f"and skipped, {statuses.count(FAILED)} failed"
+    )
+    return results
 
 
 def scan_all_repositories():
@@ -620,59 +2379,21 @@ def get_json_data():
     f_repo_json = os.path.join(script_path, "app/repos.json")
     repos_data = {}
     try:
-        with open(f_repo_json, "r") as json_file:
-            repos_data = json.load(json_file)
+        # repos.json is read by every git operation, it is only parsed
+        # again when it has been modified
+        repo_json_stat = os.stat(f_repo_json)
+        signature = (repo_json_stat.st_mtime_ns, repo_json_stat.st_size)
+        if _repos_data_cache.get("signature") != signature:
+            with open(f_repo_json, "r") as json_file:
+                _repos_data_cache["data"] = json.load(json_file)
+            _repos_data_cache["signature"] = signature
+        repos_data = copy.deepcopy(_repos_data_cache["data"])
     except FileNotFoundError:
         repos_data = {}
         logger("No repos.json file found, creating a new one", "warn")
     return repos_data, f_repo_json
 
 
-def count_files(directory, extension):
-    """
-    This function counts the number of files in the specified directory with 
-    the specified extension.
-
-    :param directory: The directory to count the files in
-
-    :param extension: The extension of the files to count
-    """
-    count = 0
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(extension):
-                count += 1
-    return count
-
-
-class thread_with_trace(threading.Thread):
-    def __init__(self, *args, **keywords):
-        threading.Thread.__init__(self, *args, **keywords)
-        self.killed = False
-
-    def start(self):
-        self.__run_backup = self.run
-        self.run = self.__run
-        threading.Thread.start(self)
-
-    def __run(self):
-        sys.settrace(self.globaltrace)
-        self.__run_backup()
-        self.run = self.__run_backup
-
-    def globaltrace(self, frame, event, arg):
-        return self.localtrace if event == "call" else None
-
-    def localtrace(self, frame, event, arg):
-        if self.killed:
-            if event == "line":
-                raise SystemExit()
-        return self.localtrace
-
-    def kill(self):
-        self.killed = True
-
-
 def func():
     while True:
         print("thread running")
@@ -97,3 +97,11 @@ def skip_util_classes(app, what, name, obj, skip, options):
 def setup(app):
     app.connect("autodoc-skip-member", skip_util_classes)
     app.add_css_file("my_theme.css")
+
+
+# The version is only shown in the pages: it is given to the HTML templates
+# instead of Sphinx, so a new version rewrites the pages without reading all
+# the modules again
+html_title = f"{project} {release} documentation"
+html_context = {"version": version, "release": release}
+version = release = ""
@@ -0,0 +1,77 @@
+"""
+This script times the Sphinx build of the modules in local_modules with \
+    several numbers of processes, from an empty build folder each time.
+
+Every number of processes is measured the same way, a sphinx-build -j \
+    process started cold, so the serial arm does not benefit from Sphinx \
+    being already imported. The default build of the application, serial \
+    in the warm Sphinx worker, is measured apart.
+
+Generate the documentation once from the application first, the script \
+    reuses its docs/source folder. Usage: python benchmark_docs.py [jobs ...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app.generate_documentation import (
+    run_sphinx_build,
+    script_path,
+    sphinx_build_command,
+    warm_up_sphinx,
+)
+from app.process_runner import run_command
+from app.sphinx_worker import sphinx_worker
+
+
+def benchmark_sphinx_build(jobs_counts, source_folder_path=None):
+    """
+    This function builds a copy of docs/source once per number of jobs, \
+        then once in the warm Sphinx worker.
+
+    :param jobs_counts: The numbers of processes to time
+
+    :param source_folder_path: The Sphinx project to build. \
+        Default is docs/source
+
+    :return: The dictionary number of processes -> seconds, \
+        "worker" for the serial build in the warm Sphinx worker
+    """
+    if source_folder_path is None:
+        source_folder_path = os.path.join(script_path, "docs", "source")
+    if not os.path.exists(os.path.join(source_folder_path, "conf.py")):
+        raise FileNotFoundError(f"No Sphinx project in {source_folder_path}")
+    timings = {}
+    with tempfile.TemporaryDirectory() as docs_folder_path:
+        shutil.copytree(source_folder_path, os.path.join(docs_folder_path, "source"))
+        for jobs in jobs_counts:
+            shutil.rmtree(os.path.join(docs_folder_path, "build"), ignore_errors=True)
+            start = time.perf_counter()
+            result = run_command(
+                sphinx_build_command(docs_folder_path, jobs), cwd=script_path
+            )
+            timings[jobs] = time.perf_counter() - start
+            if not result.ok:
+                raise RuntimeError(f"sphinx-build -j {jobs} failed")
+
+        # Started before the timing, as when the popup is opened
+        warm_up_sphinx()
+        shutil.rmtree(os.path.join(docs_folder_path, "build"), ignore_errors=True)
+        start = time.perf_counter()
+        if not run_sphinx_build(docs_folder_path):
+            raise RuntimeError("The build in the Sphinx worker failed")
+        timings["worker"] = time.perf_counter() - start
+        sphinx_worker.stop()
+    return timings
+
+
+if __name__ == "__main__":
+    jobs_counts = [int(jobs) for jobs in sys.argv[1:]] or [1, os.cpu_count() or 1]
+    timings = benchmark_sphinx_build(jobs_counts)
+    serial = timings.get(1)
+    for jobs, seconds in timings.items():
+        speedup = f", x{serial / seconds:.2f}" if serial else ""
+        label = "warm worker, serial" if jobs == "worker" else f"-j {jobs}"
+        print(f"{label}: {seconds:.1f}s{speedup}")
@@ -0,0 +1,65 @@
+import contextlib
+from types import SimpleNamespace
+
+from app import utils
+from app.cancellation import CancellationToken
+from app.up import add_repository_popup
+from app.up.add_repository_popup import AddRepository
+
+
+class RecordingBus:
+    """
+    A UI bus running the calls at once and recording them.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def configure(self, widget, **options):
+        self.calls.append(("configure", widget, options))
+
+    def call(self, function, *args, **kwargs):
+        self.calls.append(("call", function, args))
+
+    def proxy(self, widget):
+        return SimpleNamespace(set=lambda value: None)
+
+
+def test_an_invalid_clone_entry_closes_the_popup_with_an_alert(tmp_path, monkeypatch):
+    monkeypatch.setattr(add_repository_popup, "script_path", str(tmp_path))
+    monkeypatch.setattr(
+        utils,
+        "get_json_data",
+        lambda: ({"repo": {"url": "https://host/repo.git", "clone": "bogus"}}, ""),
+    )
+    bus = RecordingBus()
+    popup = SimpleNamespace(
+        repo_entry=SimpleNamespace(get=lambda start, end: "https://host/repo.git"),
+        cancel_token=CancellationToken(),
+        close_popup=object(),
+        root=SimpleNamespace(
+            ui_bus=bus,
+            show_alert=object(),
+            prefetcher=SimpleNamespace(interactive=contextlib.nullcontext),
+        ),
+        **{
+            name: SimpleNamespace(pack=object())
+            for name in (
+                "button_add",
+                "button_load",
+                "button_cancel",
+                "labled_add",
+                "progress_bar_add",
+                "geometry",
+            )
+        },
+    )
+
+    AddRepository.perform_add(popup)
+
+    functions = [function for kind, function, _ in bus.calls if kind == "call"]
+    assert popup.close_popup in functions
+    alert = next(
+        args for _, function, args in bus.calls if function is popup.root.show_alert
+    )
+    assert alert == ("Failed to add the repositories, check the log!",)
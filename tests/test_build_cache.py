@@ -0,0 +1,113 @@
+import subprocess
+
+from app import utils
+from app.build_cache import BuildCache, docs_settings_hash
+
+
+def git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+class ProgressBar:
+    def set(self, value):
+        pass
+
+
+def test_docs_settings_hash_follows_the_files(tmp_path):
+    settings = tmp_path / "source"
+    (settings / "__pycache__").mkdir(parents=True)
+    (settings / "conf.py").write_text("project = 'docs'")
+    first = docs_settings_hash([str(settings)])
+
+    (settings / "__pycache__" / "conf.pyc").write_text("compiled")
+    assert docs_settings_hash([str(settings)]) == first
+    (settings / "conf.py").write_text("project = 'other'")
+    changed = docs_settings_hash([str(settings)])
+    assert changed != first
+    (settings / "index.rst").write_text("")
+    assert docs_settings_hash([str(settings)]) != changed
+
+
+def test_export_skips_the_unchanged_trees(tmp_path, monkeypatch):
+    for variable in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{variable}_NAME", "test")
+        monkeypatch.setenv(f"GIT_{variable}_EMAIL", "test@test")
+    repository = tmp_path / "remote_repositories" / "repo"
+    (repository / "src" / "package").mkdir(parents=True)
+    (repository / "src" / "package" / "module.py").write_text("a = 1")
+    git("init", "-b", "main", cwd=repository)
+    git("add", ".", cwd=repository)
+    git("commit", "-m", "first", cwd=repository)
+    settings = tmp_path / "assets"
+    settings.mkdir()
+    (settings / "conf.py").write_text("project = 'docs'")
+    monkeypatch.setattr(
+        utils, "docs_settings_hash", lambda: docs_settings_hash([str(settings)])
+    )
+    cache = BuildCache(str(tmp_path / "build_cache.json"))
+    exported = []
+    sync_directory_from_archive = utils.sync_directory_from_archive
+
+    def record_exports(archive_path, destination_directory, exclude=()):
+        exported.append(destination_directory)
+        return sync_directory_from_archive(archive_path, destination_directory, exclude)
+
+    monkeypatch.setattr(utils, "sync_directory_from_archive", record_exports)
+    modules = tmp_path / "local_modules"
+
+    def export():
+        exported.clear()
+        utils.export_modules(
+            str(tmp_path / "remote_repositories"),
+            ["repo"],
+            str(modules),
+            "main",
+            ProgressBar(),
+            build_cache=cache,
+        )
+        return len(exported)
+
+    assert export() == 1
+    assert (modules / "repo" / "module.py").read_text() == "a = 1"
+    assert export() == 0
+    # The cache is saved and reloaded by the next run
+    cache = BuildCache(str(tmp_path / "build_cache.json"))
+    assert export() == 0
+
+    (settings / "conf.py").write_text("project = 'other'")
+    assert export() == 1
+    assert export() == 0
+
+    (repository / "src" / "package" / "module.py").write_text("a = 2")
+    git("commit", "-am", "second", cwd=repository)
+    assert export() == 1
+    assert (modules / "repo" / "module.py").read_text() == "a = 2"
+
+
+def test_sharded_build_removes_the_single_project_outputs(tmp_path):
+    from app.generate_documentation import remove_monolithic_build
+
+    build = tmp_path / "build"
+    for folder in ("_modules/local_modules/repo", "_sources", ".doctrees", "repo"):
+        (build / folder).mkdir(parents=True)
+    for page in (
+        "_modules/local_modules/repo/module.html",
+        "_sources/local_modules.repo.module.rst.txt",
+        "_sources/index.rst.txt",
+        ".doctrees/environment.pickle",
+        "local_modules.repo.module.html",
+        "index.html",
+        "repo/index.html",
+    ):
+        (build / page).write_text("")
+
+    remove_monolithic_build(str(tmp_path))
+    assert sorted(
+        str(path.relative_to(build)).replace("\\", "/")
+        for path in build.rglob("*")
+        if path.is_file()
+    ) == ["_sources/index.rst.txt", "index.html", "repo/index.html"]
+    # The environment of the index is kept once the outputs are gone
+    (build / ".doctrees").mkdir()
+    remove_monolithic_build(str(tmp_path))
+    assert (build / ".doctrees").exists()
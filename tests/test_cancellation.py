@@ -0,0 +1,35 @@
+import concurrent.futures
+
+import pytest
+from app.cancellation import CancellationToken, OperationCancelled
+
+
+def test_a_future_registered_after_the_cancel_is_cancelled():
+    cancel_token = CancellationToken()
+    cancel_token.cancel()
+    future = concurrent.futures.Future()
+
+    cancel_token.register(future)
+
+    assert future.cancelled()
+
+
+def test_cancel_cancels_the_registered_futures():
+    cancel_token = CancellationToken()
+    future = concurrent.futures.Future()
+    cancel_token.register(future)
+
+    cancel_token.cancel()
+
+    assert future.cancelled()
+    assert cancel_token.cancelled
+
+
+def test_raise_if_cancelled():
+    cancel_token = CancellationToken()
+    cancel_token.raise_if_cancelled()
+
+    cancel_token.cancel()
+
+    with pytest.raises(OperationCancelled):
+        cancel_token.raise_if_cancelled()
@@ -0,0 +1,22 @@
+import json
+
+from app import clone_strategy
+
+
+def clone(options, duration, size, mirror):
+    return {"options": options, "duration": duration, "size": size, "mirror": mirror}
+
+
+def test_mirror_clones_are_not_the_full_clone_baseline(tmp_path, monkeypatch):
+    stats_file = tmp_path / "clone_stats.json"
+    monkeypatch.setattr(clone_strategy, "CLONE_STATS_FILE", str(stats_file))
+
+    clone_strategy.record_clone_stats({"repo": clone({}, 30.0, 1000, False)})
+    clone_strategy.record_clone_stats({"repo": clone({}, 0.5, 1000, True)})
+    blobless = clone({"filter": "blob:none"}, 10.0, 400, False)
+    clone_strategy.record_clone_stats({"repo": blobless})
+
+    repo_stats = json.loads(stats_file.read_text())["repo"]
+    assert repo_stats["full"]["duration"] == 30.0
+    assert repo_stats["mirror_full"]["duration"] == 0.5
+    assert repo_stats["last"] == blobless
@@ -0,0 +1,42 @@
+import sys
+import threading
+
+from app.network_scheduler import network_scheduler
+from app.process_runner import runner
+
+SLOW_COMMAND = [sys.executable, "-c", "import time; time.sleep(0.2)"]
+
+
+def run_commands(count):
+    futures = [
+        runner.submit(network_scheduler.run(SLOW_COMMAND, url="https://host/repo"))
+        for _ in range(count)
+    ]
+    for future in futures:
+        assert future.result().ok
+
+
+def test_batches_only_count_their_own_commands():
+    stats = {}
+    barrier = threading.Barrier(3)
+
+    def measure(name, count):
+        with network_scheduler.batch() as batch_stats:
+            barrier.wait()
+            run_commands(count)
+        stats[name] = batch_stats
+
+    threads = [
+        threading.Thread(target=measure, args=("first", 2)),
+        threading.Thread(target=measure, args=("second", 3)),
+    ]
+    for thread in threads:
+        thread.start()
+    # A command outside of any batch, as the background prefetch
+    barrier.wait()
+    run_commands(1)
+    for thread in threads:
+        thread.join()
+
+    assert stats["first"].operations == 2
+    assert stats["second"].operations == 3
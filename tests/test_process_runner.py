@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+from app.cancellation import CancellationToken, OperationCancelled
+from app.process_runner import CommandRunner, as_completed_results, runner
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_a_command_is_killed_after_its_timeout():
+    start = time.perf_counter()
+    result = runner.run(
+        runner.run_async(python("import time; time.sleep(10)"), timeout=0.2)
+    )
+
+    assert result.timed_out
+    assert result.returncode == -1
+    assert not result.ok
+    assert time.perf_counter() - start < 5
+
+
+def test_only_the_tail_of_the_output_is_kept():
+    tail_runner = CommandRunner(tail_lines=3)
+
+    result = tail_runner.run(
+        tail_runner.run_async(python("for i in range(10): print(i)"))
+    )
+
+    assert result.ok
+    assert result.output == ["7", "8", "9"]
+
+
+def test_full_output_keeps_every_line():
+    tail_runner = CommandRunner(tail_lines=3)
+
+    result = tail_runner.run(
+        tail_runner.run_async(python("for i in range(10): print(i)"), full_output=True)
+    )
+
+    assert result.output == [str(i) for i in range(10)]
+
+
+def test_carriage_returns_end_the_lines():
+    lines = []
+    code = "import sys; sys.stdout.write('10%\\r50%\\r100%\\ndone')"
+
+    result = runner.run(runner.run_async(python(code), on_line=lines.append))
+
+    assert result.output == ["10%", "50%", "100%", "done"]
+    assert lines == result.output
+
+
+def test_a_cancelled_command_terminates_its_process():
+    started = threading.Event()
+    pids = []
+
+    def on_line(line):
+        pids.append(int(line))
+        started.set()
+
+    code = "import os, time; print(os.getpid(), flush=True); time.sleep(30)"
+    future = runner.submit(runner.run_async(python(code), on_line=on_line))
+    assert started.wait(10)
+
+    future.cancel()
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pids[0], 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("The cancelled process is still running")
+
+
+async def fail():
+    raise ValueError("broken")
+
+
+async def sleep_and_return(value, delay=0):
+    await asyncio.sleep(delay)
+    return value
+
+
+def test_as_completed_results_yields_the_errors():
+    results = {
+        key: (result, error)
+        for key, result, error in as_completed_results(
+            {"ok": sleep_and_return(1), "broken": fail()}
+        )
+    }
+
+    assert results["ok"] == (1, None)
+    result, error = results["broken"]
+    assert result is None
+    assert isinstance(error, ValueError)
+
+
+def test_as_completed_results_raises_once_cancelled():
+    cancel_token = CancellationToken()
+    completed = as_completed_results(
+        {"fast": sleep_and_return("fast"), "slow": sleep_and_return("slow", 30)},
+        cancel_token=cancel_token,
+    )
+    keys = []
+
+    with pytest.raises(OperationCancelled):
+        for key, _, _ in completed:
+            keys.append(key)
+            cancel_token.cancel()
+
+    assert keys == ["fast"]
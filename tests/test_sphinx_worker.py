@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+
+import pytest
+from app.cancellation import CancellationToken, OperationCancelled
+from app.sphinx_worker import SphinxWorker
+
+CONF = """
+import sys
+sys.path.insert(0, {modules!r})
+extensions = ["sphinx.ext.autodoc"]
+"""
+
+INDEX = """Index
+=====
+
+.. automodule:: documented
+   :members:
+"""
+
+# Module level code of a documented module, run by autodoc
+DOCUMENTED = """
+import os
+os.environ["DOCUMENTED_IMPORTED"] = "1"
+{extra}
+
+def function():
+    \"\"\"Documented function.\"\"\"
+"""
+
+
+@pytest.fixture
+def worker():
+    worker = SphinxWorker()
+    yield worker
+    worker.stop()
+
+
+def create_project(tmp_path, extra=""):
+    modules = tmp_path / "modules"
+    modules.mkdir()
+    (modules / "documented.py").write_text(DOCUMENTED.format(extra=extra))
+    source = tmp_path / "docs" / "source"
+    source.mkdir(parents=True)
+    (source / "conf.py").write_text(CONF.format(modules=str(modules)))
+    (source / "index.rst").write_text(INDEX)
+    return str(tmp_path / "docs")
+
+
+def test_the_build_leaves_the_application_untouched(tmp_path, worker):
+    docs_folder_path = create_project(tmp_path)
+    cwd = os.getcwd()
+    lines = []
+
+    success, _ = worker.run("build", (docs_folder_path,), on_line=lines.append)
+
+    assert success
+    page = (tmp_path / "docs" / "build" / "index.html").read_text()
+    assert "Documented function." in page
+    assert any(line.startswith("build succeeded") for line in lines)
+    assert os.getcwd() == cwd
+    assert "documented" not in sys.modules
+    assert "DOCUMENTED_IMPORTED" not in os.environ
+
+
+def test_the_worker_is_reused_between_builds(tmp_path, worker):
+    docs_folder_path = create_project(tmp_path)
+    worker.start()
+    process = worker._process
+
+    assert worker.run("build", (docs_folder_path,))[0]
+    assert worker.run("build", (docs_folder_path,))[0]
+    assert worker._process is process
+
+
+def test_a_cancelled_build_terminates_the_worker(tmp_path, worker):
+    docs_folder_path = create_project(tmp_path, "import time; time.sleep(60)")
+    cancel_token = CancellationToken()
+    threading.Timer(1, cancel_token.cancel).start()
+
+    with pytest.raises(OperationCancelled):
+        worker.run("build", (docs_folder_path,), cancel_token)
+
+    assert worker._process is None
+
+
+def test_a_worker_killed_by_a_module_is_replaced(tmp_path, worker):
+    docs_folder_path = create_project(tmp_path, "os._exit(3)")
+
+    success, output_tail = worker.run("build", (docs_folder_path,))
+
+    assert not success
+    assert "code 3" in output_tail
+    (tmp_path / "modules" / "documented.py").write_text(DOCUMENTED.format(extra=""))
+    assert worker.run("build", (docs_folder_path,))[0]
+
+
+def test_apidoc_writes_the_sources(tmp_path, worker):
+    package = tmp_path / "local_modules" / "package"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "module.py").write_text("")
+
+    success, _ = worker.run(
+        "apidoc", (str(tmp_path / "apidoc"), str(tmp_path / "local_modules"))
+    )
+
+    assert success
+    assert (tmp_path / "apidoc" / "package.module.rst").exists()
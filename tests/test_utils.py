@@ -0,0 +1,339 @@
+import os
+import subprocess
+
+import pytest
+from app import mirror_cache, utils
+from app.cancellation import CancellationToken, OperationCancelled
+from app.process_runner import runner
+
+
+def git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """
+    A bare repository with a branch b, the mirrors are kept in tmp_path.
+    """
+    for variable in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{variable}_NAME", "test")
+        monkeypatch.setenv(f"GIT_{variable}_EMAIL", "test@test")
+    monkeypatch.setattr(mirror_cache, "MIRRORS_FOLDER", str(tmp_path / "mirrors"))
+    monkeypatch.setattr(utils, "MIRRORS_FOLDER", str(tmp_path / "mirrors"))
+    server_path = tmp_path / "server.git"
+    git("init", "--bare", "-b", "b", str(server_path), cwd=tmp_path)
+    git("clone", str(server_path), "author", cwd=tmp_path)
+    for file_name in ("a.txt", "b.txt"):
+        (tmp_path / "author" / file_name).write_text(file_name * 1000)
+        git("add", file_name, cwd=tmp_path / "author")
+        git("commit", "-m", file_name, cwd=tmp_path / "author")
+    git("push", "origin", "b", cwd=tmp_path / "author")
+    return server_path
+
+
+def push_commit(tmp_path, message):
+    author = tmp_path / "author"
+    (author / "a.txt").write_text(message)
+    git("commit", "-am", message, cwd=author)
+    git("push", "origin", "b", cwd=author)
+    return git("rev-parse", "HEAD", cwd=author)
+
+
+def register(monkeypatch, repo_name, repo_entry):
+    monkeypatch.setattr(utils, "get_json_data", lambda: ({repo_name: repo_entry}, ""))
+
+
+def clone(tmp_path, server, monkeypatch, repo_entry, clone_options=None):
+    clone_folder = tmp_path / "remote_repositories"
+    clone_folder.mkdir()
+    register(monkeypatch, "server", repo_entry)
+    result = runner.run(
+        utils.clone_repository_git_async(
+            str(server),
+            str(clone_folder),
+            clone_options,
+            use_mirror=repo_entry["mirror"],
+        )
+    )
+    assert result.ok
+    return str(clone_folder / "server")
+
+
+@pytest.mark.parametrize("use_mirror", [False, True])
+def test_update_branch_fetches_a_branch_moved_after_a_prefetch(
+    tmp_path, server, monkeypatch, use_mirror
+):
+    directory = clone(
+        tmp_path, server, monkeypatch, {"url": str(server), "mirror": use_mirror}
+    )
+    # The prefetcher just fetched, then the branch moves on the server
+    runner.run(utils.git_fetch_async(directory))
+    new_sha = push_commit(tmp_path, "moved")
+
+    status = runner.run(
+        utils.git_update_branch_async(directory, "b", max_age=600, skip_unchanged=True)
+    )
+
+    assert status == utils.UPDATED
+    assert git("rev-parse", "b", cwd=directory) == new_sha
+
+
+def test_blobless_clone_from_the_mirror_is_partial(tmp_path, server, monkeypatch):
+    # The first version of a.txt is only in the history
+    push_commit(tmp_path, "second version")
+    directory = clone(
+        tmp_path,
+        server,
+        monkeypatch,
+        {"url": str(server), "mirror": True},
+        {"filter": "blob:none"},
+    )
+
+    assert git("config", "remote.origin.promisor", cwd=directory) == "true"
+    # git sets promisor even when the mirror ignores the filter
+    missing = git("rev-list", "--objects", "--all", "--missing=print", cwd=directory)
+    assert any(line.startswith("?") for line in missing.splitlines())
+
+
+@pytest.mark.parametrize("attach_mirror", [False, True])
+def test_pull_switches_a_server_clone_to_its_mirror_only_on_request(
+    tmp_path, server, monkeypatch, attach_mirror
+):
+    directory = clone(
+        tmp_path, server, monkeypatch, {"url": str(server), "mirror": False}
+    )
+    register(
+        monkeypatch,
+        "server",
+        {"url": str(server), "mirror": True, "attach_mirror": attach_mirror},
+    )
+
+    assert runner.run(utils.git_pull_async(directory)).ok
+
+    fetch_url = git("config", "remote.origin.url", cwd=directory)
+    if attach_mirror:
+        assert fetch_url == str(tmp_path / "mirrors" / "server.git")
+        assert git("config", "remote.origin.pushurl", cwd=directory) == str(server)
+    else:
+        assert fetch_url == str(server)
+
+
+class CancellingProgressBar:
+    """
+    A progress bar cancelling the clones once the first one is over.
+    """
+
+    def __init__(self, cancel_token):
+        self.cancel_token = cancel_token
+
+    def set(self, value):
+        if value:
+            self.cancel_token.cancel()
+
+
+def test_cancelled_clones_keep_the_completed_ones(tmp_path, server, monkeypatch):
+    other_server = tmp_path / "other.git"
+    git("clone", "--bare", str(server), str(other_server), cwd=tmp_path)
+    monkeypatch.setattr(utils, "get_json_data", lambda: ({}, ""))
+    monkeypatch.setattr(utils, "record_clone_stats", lambda clone_results: None)
+    cancel_token = CancellationToken()
+
+    with pytest.raises(OperationCancelled) as cancelled:
+        utils.clone_repositories(
+            [str(server), str(other_server)],
+            str(tmp_path / "remote_repositories"),
+            CancellingProgressBar(cancel_token),
+            max_workers=1,
+            cancel_token=cancel_token,
+        )
+
+    assert cancelled.value.partial_result
+    for repo_name in cancelled.value.partial_result:
+        assert (tmp_path / "remote_repositories" / repo_name / ".git").exists()
+
+
+class ProgressBar:
+    def set(self, value):
+        pass
+
+
+def test_update_asks_each_remote_once(tmp_path, server, monkeypatch):
+    root_directory = tmp_path / "remote_repositories"
+    for repo_name in ("a", "b"):
+        git("clone", str(server), str(root_directory / repo_name), cwd=tmp_path)
+    repo_entry = {"url": str(server), "mirror": False}
+    monkeypatch.setattr(
+        utils, "get_json_data", lambda: ({"a": repo_entry, "b": repo_entry}, "")
+    )
+    asked = []
+    get_server_branch_sha_async = utils.get_server_branch_sha_async
+
+    async def count_asks(directory, branch, repo_url):
+        asked.append(repo_url)
+        return await get_server_branch_sha_async(directory, branch, repo_url)
+
+    monkeypatch.setattr(utils, "get_server_branch_sha_async", count_asks)
+
+    results = utils.update_all_local_repositories(
+        str(root_directory), ["a", "b"], "b", ProgressBar(), skip_unchanged=True
+    )
+
+    assert results == {"a": utils.UNCHANGED, "b": utils.UNCHANGED}
+    assert asked == [str(server)]
+
+
+def test_git_status_tells_what_commit_push_has_to_do(tmp_path, server):
+    directory = tmp_path / "copy"
+    git("clone", str(server), str(directory), cwd=tmp_path)
+
+    def status(branch_name="b"):
+        return runner.run(utils.git_status_async(str(directory), branch_name))
+
+    assert status() == utils.SKIPPED
+    (directory / "a.txt").write_text("changed")
+    assert status() == utils.COMMITTED
+    git("commit", "-am", "local", cwd=directory)
+    assert status() == utils.PUSHED
+    # Only the checked out branch is pushed without changes
+    assert status("other") == utils.SKIPPED
+
+
+def test_commit_push_statuses(tmp_path, server, monkeypatch):
+    monkeypatch.setattr(utils, "script_path", str(tmp_path))
+    root_directory = tmp_path / "remote_repositories"
+    remotes = {
+        "clean": server,
+        "dirty": server,
+        # Its own server, the pushes of b would conflict on the same one
+        "ahead": tmp_path / "ahead.git",
+        "unreachable": tmp_path / "missing.git",
+    }
+    git("clone", "--bare", str(server), str(remotes["ahead"]), cwd=tmp_path)
+    for repo_name, remote in remotes.items():
+        git("clone", str(server), str(root_directory / repo_name), cwd=tmp_path)
+        git("remote", "set-url", "origin", str(remote), cwd=root_directory / repo_name)
+    (root_directory / "dirty" / "a.txt").write_text("dirty")
+    (root_directory / "ahead" / "b.txt").write_text("ahead")
+    git("commit", "-am", "ahead", cwd=root_directory / "ahead")
+    (root_directory / "unreachable" / "a.txt").write_text("unreachable")
+    monkeypatch.setattr(
+        utils,
+        "get_json_data",
+        lambda: ({name: str(remote) for name, remote in remotes.items()}, ""),
+    )
+
+    results = utils.commit_push(list(remotes), "b", "message", ProgressBar())
+
+    assert results == {
+        "clean": utils.SKIPPED,
+        "dirty": utils.COMMITTED,
+        "ahead": utils.PUSHED,
+        "unreachable": utils.FAILED,
+    }
+    assert git("log", "-1", "--format=%s", "b", cwd=server) == "message"
+    assert git("log", "-1", "--format=%s", "b", cwd=remotes["ahead"]) == "ahead"
+
+
+def test_update_skips_the_checkout_of_the_current_branch(tmp_path, server, monkeypatch):
+    root_directory = tmp_path / "remote_repositories"
+    for repo_name in ("current", "other"):
+        git("clone", str(server), str(root_directory / repo_name), cwd=tmp_path)
+    git("checkout", "-b", "other", cwd=root_directory / "other")
+    repo_entry = {"url": str(server), "mirror": False}
+    monkeypatch.setattr(
+        utils,
+        "get_json_data",
+        lambda: ({"current": repo_entry, "other": repo_entry}, ""),
+    )
+    checkouts = []
+    log_and_process_async = utils.log_and_process_async
+
+    async def record_checkouts(command, cwd=None, **kwargs):
+        if command[:2] == ["git", "checkout"]:
+            checkouts.append(os.path.basename(cwd))
+        return await log_and_process_async(command, cwd=cwd, **kwargs)
+
+    monkeypatch.setattr(utils, "log_and_process_async", record_checkouts)
+
+    results = utils.update_all_local_repositories(
+        str(root_directory), ["current", "other"], "b", ProgressBar()
+    )
+
+    assert results == {"current": utils.UPDATED, "other": utils.UPDATED}
+    assert checkouts == ["other"]
+    assert git("branch", "--show-current", cwd=root_directory / "other") == "b"
+
+
+def write(path, text, mtime_ns=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_sync_directory_only_writes_the_changes(tmp_path):
+    source = tmp_path / "source"
+    copy = tmp_path / "copy"
+    write(source / "same.py", "same")
+    write(source / "package" / "changed.py", "old")
+    write(source / "removed.py", "removed")
+    write(source / "__pycache__" / "cached.pyc", "cached")
+    assert utils.sync_directory(str(source), str(copy), ("__pycache__",)) == {
+        "copied": 3,
+        "removed": 0,
+        "unchanged": 0,
+        "bytes": 14,
+    }
+    same_mtime = os.stat(copy / "same.py").st_mtime_ns
+
+    write(source / "package" / "changed.py", "new content")
+    (source / "removed.py").unlink()
+    stats = utils.sync_directory(str(source), str(copy), ("__pycache__",))
+
+    assert stats == {"copied": 1, "removed": 1, "unchanged": 1, "bytes": 11}
+    assert (copy / "package" / "changed.py").read_text() == "new content"
+    assert not (copy / "removed.py").exists()
+    assert not (copy / "__pycache__").exists()
+    assert os.stat(copy / "same.py").st_mtime_ns == same_mtime
+
+
+def test_same_content_realigns_the_modification_time(tmp_path):
+    write(tmp_path / "source.py", "content", mtime_ns=2_000_000_000)
+    write(tmp_path / "copy.py", "content", mtime_ns=1_000_000_000)
+    source_stat = os.stat(tmp_path / "source.py")
+
+    assert utils.is_same_file(
+        str(tmp_path / "source.py"), str(tmp_path / "copy.py"), source_stat
+    )
+    assert os.stat(tmp_path / "copy.py").st_mtime_ns == 2_000_000_000
+
+    write(tmp_path / "copy.py", "CONTENT", mtime_ns=1_000_000_000)
+    assert not utils.is_same_file(
+        str(tmp_path / "source.py"), str(tmp_path / "copy.py"), source_stat
+    )
+
+
+def test_copy_modules_skips_the_repositories_without_package(tmp_path):
+    root_directory = tmp_path / "remote_repositories"
+    write(root_directory / "with_src" / "src" / "tests" / "test_a.py", "")
+    write(root_directory / "with_src" / "src" / "package" / "a.py", "a")
+    write(
+        root_directory / "transforms" / "transforms-python" / "src" / "pkg" / "b.py",
+        "b",
+    )
+    write(root_directory / "no_src" / "README.md", "")
+    modules = tmp_path / "local_modules"
+
+    utils.copy_modules(
+        str(root_directory),
+        ["with_src", "transforms", "no_src"],
+        str(modules),
+        ProgressBar(),
+    )
+
+    assert (modules / "with_src" / "a.py").read_text() == "a"
+    assert (modules / "transforms" / "b.py").read_text() == "b"
+    assert not (modules / "no_src").exists()